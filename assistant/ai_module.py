@@ -1,90 +1,252 @@
 import re
 import os
 import datetime
+import threading
 import logging
-from typing import Dict, Callable, Union, Optional
-
-# Optional imports
-try:
-    import requests
-    REQUESTS_AVAILABLE = True
-except ImportError:
-    REQUESTS_AVAILABLE = False
-
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
-
-# Context for conversation
-conversation_context: Dict[str, str] = {}
-
-# Enhanced offline responses with more intelligence
-OFFLINE_RESPONSES: Dict[re.Pattern, Union[str, Callable[[], str]]] = {
-    re.compile(r'.*\b(name|who are you|what are you)\b.*', re.IGNORECASE): "I am Mini AI Assistant, your intelligent offline helper.",
-    re.compile(r'.*\b(how are you|hello|hi|hey)\b.*', re.IGNORECASE): "Hello! I'm doing great, ready to assist you.",
-    re.compile(r'.*\b(time|what time|current time)\b.*', re.IGNORECASE): lambda: f"The current time is {datetime.datetime.now().strftime('%H:%M:%S')}.",
-    re.compile(r'.*\b(date|what date|today)\b.*', re.IGNORECASE): lambda: f"Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')}.",
-    re.compile(r'.*\b(weather|forecast)\b.*', re.IGNORECASE): "I'm offline; I can't check the weather. Try online mode for real-time data.",
-    re.compile(r'.*\b(joke|funny)\b.*', re.IGNORECASE): "Why don't scientists trust atoms? Because they make up everything!",
-    re.compile(r'.*\b(help|what can you do)\b.*', re.IGNORECASE): "I can help with reminders, notes, calculations, and Q&A. Use 'ask' command!",
-    re.compile(r'.*\b(thank|thanks)\b.*', re.IGNORECASE): "You're welcome! Happy to help.",
-    re.compile(r'.*\b(bye|goodbye|exit)\b.*', re.IGNORECASE): "Goodbye! Have a great day.",
-    re.compile(r'.*\b(calculate|math|compute)\b.*', re.IGNORECASE): "Use the 'calc' command for calculations.",
-    re.compile(r'.*\b(remind|reminder)\b.*', re.IGNORECASE): "Use 'remind' to schedule reminders.",
-    re.compile(r'.*\b(note|notes)\b.*', re.IGNORECASE): "Use 'note add' to save notes, 'note list' to view them.",
+from typing import Any, Dict, Callable, Iterator, List, Tuple, Union, Optional
+
+from assistant import metrics
+from assistant.cache import cache_key
+from assistant.providers import ProviderUnavailable, get_provider, module_available
+from assistant.router import ProviderRouter, DEFAULT_DEADLINE, DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_DELAY
+from assistant.sessions import (SessionContext, SessionStore, DEFAULT_SESSION, DEFAULT_TTL,
+                                DEFAULT_MAX_SESSIONS, DEFAULT_MAX_BYTES)
+from assistant.utils import get_response_cache, retrieve_notes
+
+logger = logging.getLogger(__name__)
+
+# Optional dependencies, imported only when an online query needs them
+REQUESTS_AVAILABLE = module_available('requests')
+OPENAI_AVAILABLE = module_available('openai')
+GENAI_AVAILABLE = module_available('google.generativeai')
+
+# Model and generation parameters per provider; part of the response cache key
+PROVIDER_MODELS: Dict[str, str] = {
+    'openai': 'gpt-4o-mini',  # Faster model
+    'gemini': 'gemini-1.5-flash',
+}
+ONLINE_PARAMS: Dict[str, Any] = {'max_tokens': 200, 'temperature': 0.7}
+
+# Providers get_answer may route a question to, in order of preference
+ONLINE_PROVIDERS: Tuple[str, ...] = tuple(
+    name.strip() for name in os.getenv('ASSISTANT_PROVIDERS', 'openai,gemini').split(',') if name.strip()
+)
+
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+# Notes quoted when an offline question matches no intent
+NOTE_ANSWER_LIMIT = 3
+
+# Conversation context per session. Limits come from ASSISTANT_MAX_SESSIONS,
+# ASSISTANT_SESSION_TTL (seconds) and ASSISTANT_SESSION_MAX_BYTES.
+sessions = SessionStore(
+    max_sessions=int(os.getenv('ASSISTANT_MAX_SESSIONS', DEFAULT_MAX_SESSIONS)),
+    ttl=float(os.getenv('ASSISTANT_SESSION_TTL', DEFAULT_TTL)),
+    max_bytes=int(os.getenv('ASSISTANT_SESSION_MAX_BYTES', DEFAULT_MAX_BYTES))
+)
+
+# Context of the default session, for callers that don't use session ids
+conversation_context = SessionContext(sessions, DEFAULT_SESSION)
+
+Response = Union[str, Callable[[], str]]
+
+# Offline intents in priority order: the first intent with a keyword in the question wins.
+OFFLINE_INTENTS: List[Tuple[Tuple[str, ...], Response]] = [
+    (('name', 'who are you', 'what are you'), "I am Mini AI Assistant, your intelligent offline helper."),
+    (('how are you', 'hello', 'hi', 'hey'), "Hello! I'm doing great, ready to assist you."),
+    (('time', 'what time', 'current time'), lambda: f"The current time is {datetime.datetime.now().strftime('%H:%M:%S')}."),
+    (('date', 'what date', 'today'), lambda: f"Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')}."),
+    (('weather', 'forecast'), "I'm offline; I can't check the weather. Try online mode for real-time data."),
+    (('joke', 'funny'), "Why don't scientists trust atoms? Because they make up everything!"),
+    (('help', 'what can you do'), "I can help with reminders, notes, calculations, and Q&A. Use 'ask' command!"),
+    (('thank', 'thanks'), "You're welcome! Happy to help."),
+    (('bye', 'goodbye', 'exit'), "Goodbye! Have a great day."),
+    (('calculate', 'math', 'compute'), "Use the 'calc' command for calculations."),
+    (('remind', 'reminder'), "Use 'remind' to schedule reminders."),
+    (('note', 'notes'), "Use 'note add' to save notes, 'note list' to view them."),
+]
+
+# Words that ask to expand on the previous topic
+FOLLOW_UP_KEYWORDS: Tuple[str, ...] = ('more', 'tell me', 'explain')
+
+# Regex view of OFFLINE_INTENTS, kept for callers that inspect the table directly.
+OFFLINE_RESPONSES: Dict[re.Pattern, Response] = {
+    re.compile(r'\b(' + '|'.join(map(re.escape, keywords)) + r')\b', re.IGNORECASE): response
+    for keywords, response in OFFLINE_INTENTS
 }
 
-def get_offline_answer(question: str) -> str:
+WORD_RE = re.compile(r'\w+')
+
+class IntentMatcher:
+    """
+    Keyword automaton that classifies a question in one pass over its words.
+
+    Keywords are indexed by their first word, so each word of the question
+    costs one dict lookup however many intents there are. Phrases match on
+    whole words, like the ``\\b(...)\\b`` regexes they replace.
+
+    Args:
+        intents (List[Tuple[Tuple[str, ...], Response]]): Intent table in priority order.
+        follow_up (Tuple[str, ...]): Follow-up keywords.
+    """
+
+    def __init__(self, intents: List[Tuple[Tuple[str, ...], Response]], follow_up: Tuple[str, ...] = ()):
+        # first word -> remaining words -> (intent index or None, is follow-up keyword)
+        self._by_first_word: Dict[str, Dict[Tuple[str, ...], Tuple[Optional[int], bool]]] = {}
+        for keyword in follow_up:
+            self._add(keyword, None)
+        for index, (keywords, _) in enumerate(intents):
+            for keyword in keywords:
+                self._add(keyword, index)
+
+    def _add(self, keyword: str, intent: Optional[int]) -> None:
+        first, *rest = WORD_RE.findall(keyword.lower())
+        phrases = self._by_first_word.setdefault(first, {})
+        current, is_follow_up = phrases.get(tuple(rest), (None, False))
+        if intent is None:
+            is_follow_up = True
+        elif current is None or intent < current:
+            current = intent
+        phrases[tuple(rest)] = (current, is_follow_up)
+
+    def classify(self, question: str) -> Tuple[Optional[int], bool]:
+        """
+        Find the highest-priority intent mentioned in a question.
+
+        Args:
+            question (str): The lowercased question.
+
+        Returns:
+            Tuple[Optional[int], bool]: Index of the matching intent (or None) and
+            whether a follow-up keyword was present.
+        """
+        words = WORD_RE.findall(question)
+        best: Optional[int] = None
+        follow_up = False
+        for i, word in enumerate(words):
+            phrases = self._by_first_word.get(word)
+            if phrases is None:
+                continue
+            for rest, (intent, is_follow_up) in phrases.items():
+                if rest and tuple(words[i + 1:i + 1 + len(rest)]) != rest:
+                    continue
+                follow_up = follow_up or is_follow_up
+                if intent is not None and (best is None or intent < best):
+                    best = intent
+        return best, follow_up
+
+_intent_matcher = IntentMatcher(OFFLINE_INTENTS, FOLLOW_UP_KEYWORDS)
+
+def rebuild_intent_matcher() -> None:
+    """Recompile the offline matcher after OFFLINE_INTENTS has been modified."""
+    global _intent_matcher
+    _intent_matcher = IntentMatcher(OFFLINE_INTENTS, FOLLOW_UP_KEYWORDS)
+
+def get_offline_answer(question: str, session_id: Optional[str] = None) -> str:
     """
     Get an intelligent answer using offline keyword-based logic with context.
 
+    Questions matching no intent are answered with the most relevant of the
+    user's notes, ranked by BM25, before giving up.
+
     Args:
         question (str): The user's question.
+        session_id (Optional[str]): Conversation whose context is used; None for the default one.
 
     Returns:
         str: The response.
     """
+    lowered = question.lower()
+    with metrics.timer('assistant_intent_match_seconds'):
+        intent, follow_up = _intent_matcher.classify(lowered)
+    session_id = session_id or DEFAULT_SESSION
+
     # Check for context (e.g., follow-up questions)
-    if 'last_topic' in conversation_context:
-        if re.search(r'\b(more|tell me|explain)\b', question, re.IGNORECASE):
-            topic = conversation_context['last_topic']
-            if topic == 'time':
-                return f"More precisely, it's {datetime.datetime.now().strftime('%H:%M:%S %Z')}."
-            elif topic == 'date':
-                return f"It's {datetime.datetime.now().strftime('%A, %B %d, %Y')}."
-
-    for pattern, response in OFFLINE_RESPONSES.items():
-        if pattern.search(question):
-            # Update context
-            if 'time' in question.lower():
-                conversation_context['last_topic'] = 'time'
-            elif 'date' in question.lower():
-                conversation_context['last_topic'] = 'date'
-            else:
-                conversation_context.pop('last_topic', None)
-
-            if callable(response):
-                return response()
-            return response
+    topic = sessions.get(session_id, 'last_topic') if follow_up else None
+    if topic is not None:
+        if topic == 'time':
+            return f"More precisely, it's {datetime.datetime.now().strftime('%H:%M:%S %Z')}."
+        elif topic == 'date':
+            return f"It's {datetime.datetime.now().strftime('%A, %B %d, %Y')}."
+
+    if intent is not None:
+        # Update context
+        if 'time' in lowered:
+            sessions.set(session_id, 'last_topic', 'time')
+        elif 'date' in lowered:
+            sessions.set(session_id, 'last_topic', 'date')
+        else:
+            sessions.discard(session_id, 'last_topic')
+
+        response = OFFLINE_INTENTS[intent][1]
+        if callable(response):
+            return response()
+        return response
+
+    # Answer from the user's own notes when any of them are relevant
+    try:
+        matches = retrieve_notes(question, limit=NOTE_ANSWER_LIMIT)
+    except Exception as e:
+        logger.warning("Note retrieval failed: %s", e)
+        matches = []
+    if matches:
+        sessions.discard(session_id, 'last_topic')
+        return "From your notes:\n" + "\n".join(f"  {note_id}. {note}" for note_id, note, _ in matches)
 
     # Fallback with suggestions
     return "I'm sorry, I don't understand that. Try asking about time, date, reminders, or use online mode for advanced queries."
 
-def get_online_answer(question: str, provider: str = "openai") -> str:
+def get_router() -> ProviderRouter:
+    """
+    Get the process-wide router over ONLINE_PROVIDERS.
+
+    Settings come from ASSISTANT_ONLINE_DEADLINE (seconds),
+    ASSISTANT_HEDGE_PERCENTILE and ASSISTANT_HEDGE_DELAY (seconds).
+
+    Returns:
+        ProviderRouter: The shared router.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ProviderRouter(
+                    ONLINE_PROVIDERS,
+                    lambda name: get_provider(name, PROVIDER_MODELS.get(name, '')),
+                    deadline=float(os.getenv('ASSISTANT_ONLINE_DEADLINE', DEFAULT_DEADLINE)),
+                    hedge_percentile=float(os.getenv('ASSISTANT_HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE)),
+                    hedge_delay=float(os.getenv('ASSISTANT_HEDGE_DELAY', DEFAULT_HEDGE_DELAY))
+                )
+    return _router
+
+def reset_router() -> None:
+    """Forget provider latencies and circuit states; the router is rebuilt on next use."""
+    global _router
+    with _router_lock:
+        if _router is not None:
+            _router.close()
+        _router = None
+
+def _route() -> Tuple[str, str]:
+    """Providers and models a routed question may be answered by, as stored in the response cache."""
+    return ','.join(ONLINE_PROVIDERS), ','.join(PROVIDER_MODELS.get(name, '') for name in ONLINE_PROVIDERS)
+
+def online_cache_key(question: str) -> str:
+    """Response cache key for a routed online question."""
+    return cache_key(question, *_route(), ONLINE_PARAMS)
+
+def get_online_answer(question: str, provider: Optional[str] = None) -> str:
     """
     Get an answer using online API with improved error handling.
 
+    Provider clients are created once per process and reused, see
+    assistant.providers. Without a provider the question is routed to the
+    fastest healthy one of ONLINE_PROVIDERS, see assistant.router.
+
     Args:
         question (str): The user's question.
-        provider (str): 'openai' or 'gemini'.
+        provider (Optional[str]): 'openai' or 'gemini'; None to route.
 
     Returns:
         str: The response or error message.
@@ -92,52 +254,162 @@ def get_online_answer(question: str, provider: str = "openai") -> str:
     if not REQUESTS_AVAILABLE:
         return "Requests library not available for online queries."
 
-    if provider == "openai" and OPENAI_AVAILABLE:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            return "OpenAI API key not set. Set OPENAI_API_KEY environment variable."
+    if provider is None:
         try:
-            client = openai.OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Faster model
-                messages=[{"role": "user", "content": question}],
-                max_tokens=200,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+            return get_router().complete(question, ONLINE_PARAMS)[1]
+        except ProviderUnavailable as e:
+            return str(e)
         except Exception as e:
-            logging.error(f"OpenAI error: {e}")
-            return f"Error querying OpenAI: {str(e)}"
+            logger.error("Online providers failed: %s", e)
+            return f"Error querying online providers: {str(e)}"
 
-    elif provider == "gemini" and GENAI_AVAILABLE:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            return "Gemini API key not set. Set GEMINI_API_KEY environment variable."
-        try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content(question)
-            return response.text.strip()
-        except Exception as e:
-            logging.error(f"Gemini error: {e}")
-            return f"Error querying Gemini: {str(e)}"
+    try:
+        client = get_provider(provider, PROVIDER_MODELS.get(provider, ''))
+    except ProviderUnavailable as e:
+        return str(e)
+    try:
+        return client.complete(question, ONLINE_PARAMS)
+    except Exception as e:
+        logger.error("%s error: %s", client.label, e)
+        return f"Error querying {client.label}: {str(e)}"
+
+def _stream_online(question: str, provider: Optional[str] = None) -> Iterator[str]:
+    """Stream chunks from a provider (routed if None), raising ProviderUnavailable or the provider's error."""
+    if not REQUESTS_AVAILABLE:
+        raise ProviderUnavailable("Requests library not available for online queries.")
+    if provider is None:
+        yield from get_router().stream(question, ONLINE_PARAMS)
+        return
+    client = get_provider(provider, PROVIDER_MODELS.get(provider, ''))
+    try:
+        yield from client.stream(question, ONLINE_PARAMS)
+    except Exception as e:
+        logger.error("%s error: %s", client.label, e)
+        raise
+
+def stream_online_answer(question: str, provider: str = "openai") -> Iterator[str]:
+    """
+    Generator variant of get_online_answer that yields text as it arrives.
 
-    return "Online provider not available or not supported."
+    Args:
+        question (str): The user's question.
+        provider (str): 'openai' or 'gemini'.
+
+    Yields:
+        str: Response chunks, or a single error message.
+    """
+    try:
+        yield from _stream_online(question, provider)
+    except ProviderUnavailable as e:
+        yield str(e)
+    except Exception as e:
+        yield f"Error querying {provider}: {str(e)}"
 
-def get_answer(question: str, online: bool = False) -> str:
+# Prefixes of get_online_answer results that mean no answer was obtained
+ONLINE_FAILURE_PREFIXES = ("Error", "Online", "Requests library", "OpenAI API key", "Gemini API key")
+
+def _is_online_success(answer: str) -> bool:
+    return not answer.startswith(ONLINE_FAILURE_PREFIXES)
+
+def get_answer(question: str, online: bool = False, use_cache: bool = True,
+               session_id: Optional[str] = None) -> str:
     """
     Get an answer, preferring online if requested, with intelligent fallback.
 
+    Online answers are served from the response cache when possible, without
+    touching the provider SDK. Otherwise the question goes to the fastest
+    healthy provider, with a hedged request to another if it is slow.
+
     Args:
         question (str): The user's question.
         online (bool): Whether to use online APIs.
+        use_cache (bool): Whether to read and fill the response cache.
+        session_id (Optional[str]): Conversation the question belongs to; None for the default one.
 
     Returns:
         str: The response.
     """
     if online:
+        key = online_cache_key(question)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return f"[ONLINE] {cached}"
         answer = get_online_answer(question)
-        if not answer.startswith("Error") and not answer.startswith("Online"):
+        if _is_online_success(answer):
+            if cache is not None:
+                cache.put(key, answer, *_route(), question)
             return f"[ONLINE] {answer}"
-        logging.warning("Online query failed, falling back to offline.")
-    return f"[OFFLINE] {get_offline_answer(question)}"
\ No newline at end of file
+        logger.warning("Online query failed, falling back to offline.")
+    return f"[OFFLINE] {get_offline_answer(question, session_id)}"
+
+def stream_answer(question: str, online: bool = False, use_cache: bool = True,
+                  session_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Generator variant of get_answer that yields the answer as it is generated.
+
+    The first chunk is the '[ONLINE] ' or '[OFFLINE] ' tag. If the provider
+    fails before producing any text, the offline answer is streamed instead.
+    Completed online answers are stored in the response cache.
+
+    Args:
+        question (str): The user's question.
+        online (bool): Whether to use online APIs.
+        use_cache (bool): Whether to read and fill the response cache.
+        session_id (Optional[str]): Conversation the question belongs to; None for the default one.
+
+    Yields:
+        str: Answer chunks.
+    """
+    if online:
+        key = online_cache_key(question)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                yield f"[ONLINE] {cached}"
+                return
+        try:
+            chunks = _stream_online(question)
+            first = next(chunks, None)
+        except Exception as e:
+            first = None
+            logger.warning("Online query failed (%s), falling back to offline.", e)
+        if first is not None:
+            yield "[ONLINE] "
+            parts = [first]
+            yield first
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+            if cache is not None:
+                cache.put(key, ''.join(parts).strip(), *_route(), question)
+            return
+    yield f"[OFFLINE] {get_offline_answer(question, session_id)}"
+
+def get_answers(questions: List[str], online: bool = False, concurrency: int = 8,
+                rate: Optional[float] = None, use_cache: bool = True,
+                session_id: Optional[str] = None) -> List[str]:
+    """
+    Answer many questions concurrently, falling back offline per question.
+
+    Args:
+        questions (List[str]): The questions.
+        online (bool): Whether to use online APIs.
+        concurrency (int): Maximum questions in flight.
+        rate (Optional[float]): Maximum online requests started per second.
+        use_cache (bool): Whether to use the response cache.
+        session_id (Optional[str]): Conversation the questions belong to; None for the default one.
+
+    Returns:
+        List[str]: Answers in input order, formatted like get_answer.
+    """
+    import asyncio
+    from assistant.batch import ask_batch
+
+    async def collect() -> List[str]:
+        items = ({'question': q, 'session': session_id} for q in questions)
+        return [f"[{r['source'].upper()}] {r['answer']}"
+                async for r in ask_batch(items, online, concurrency, rate, True, use_cache)]
+    return asyncio.run(collect())
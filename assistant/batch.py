@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional
+
+from assistant.ai_module import get_answer, get_offline_answer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+class TokenBucket:
+    """
+    Asyncio token bucket limiting how often requests start.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (Optional[float]): Burst size; defaults to one second's worth of tokens.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available, then take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def read_questions(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Parse JSONL batch input.
+
+    Each line is either a JSON string or an object with a ``question`` key
+    and an optional ``id`` and ``session``. Lines that cannot be parsed are passed on with an
+    ``error`` so they still produce an output record.
+
+    Args:
+        lines (Iterable[str]): Input lines.
+
+    Yields:
+        Dict[str, Any]: Items with ``question`` and optionally ``id`` or ``error``.
+    """
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'question': None, 'error': f"line {lineno}: {e.msg}"}
+            continue
+        if isinstance(record, str):
+            yield {'question': record}
+        elif isinstance(record, dict) and isinstance(record.get('question'), str):
+            yield record
+        else:
+            yield {'question': None, 'id': record.get('id') if isinstance(record, dict) else None,
+                   'error': f"line {lineno}: expected a string or an object with a 'question'"}
+
+def _answer_one(question: str, online: bool, use_cache: bool, session_id: Optional[str] = None) -> str:
+    try:
+        return get_answer(question, online=online, use_cache=use_cache, session_id=session_id)
+    except Exception as e:
+        logger.error("Batch query failed for '%s': %s", question, e)
+        return f"[OFFLINE] {get_offline_answer(question, session_id)}"
+
+def _result(index: int, item: Dict[str, Any], answer: Optional[str]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {'index': index}
+    if 'id' in item:
+        result['id'] = item['id']
+    result['question'] = item.get('question')
+    if answer is None:
+        result['error'] = item.get('error')
+        return result
+    source, _, text = answer.partition('] ')
+    result['source'] = source.lstrip('[').lower()
+    result['answer'] = text
+    return result
+
+async def ask_batch(items: Iterable[Dict[str, Any]], online: bool = True, concurrency: int = DEFAULT_CONCURRENCY,
+                    rate: Optional[float] = None, ordered: bool = True,
+                    use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer many questions concurrently, yielding results as they are ready.
+
+    At most ``concurrency`` questions are in flight at once, and online
+    requests start no faster than ``rate`` per second. A question whose
+    provider fails is answered offline instead.
+
+    Args:
+        items (Iterable[Dict[str, Any]]): Items from ``read_questions``.
+        online (bool): Whether to use online APIs.
+        concurrency (int): Maximum questions in flight.
+        rate (Optional[float]): Maximum online requests started per second.
+        ordered (bool): Yield in input order (True) or completion order (False).
+        use_cache (bool): Whether to use the response cache.
+
+    Yields:
+        Dict[str, Any]: One result per input item, with ``index``, ``question``,
+        ``source`` and ``answer`` (or ``error``).
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be 1 or more, got {concurrency}")
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(rate) if rate is not None else None
+    slots = asyncio.Semaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+
+    async def worker(index: int, item: Dict[str, Any]) -> None:
+        try:
+            answer = None
+            if item.get('question') is not None:
+                if bucket is not None and online:
+                    await bucket.acquire()
+                answer = await loop.run_in_executor(executor, _answer_one, item['question'], online, use_cache,
+                                                    item.get('session'))
+            await results.put(_result(index, item, answer))
+        finally:
+            slots.release()
+
+    async def produce() -> int:
+        count = 0
+        for index, item in enumerate(items):
+            await slots.acquire()
+            task = asyncio.create_task(worker(index, item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            count += 1
+        return count
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ask-batch') as executor:
+        producer = asyncio.create_task(produce())
+        buffered: Dict[int, Dict[str, Any]] = {}
+        next_index = 0
+        received = 0
+        while True:
+            if producer.done():
+                if received >= producer.result():
+                    break
+                result = await results.get()
+            else:
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                result = getter.result()
+            received += 1
+            if not ordered:
+                yield result
+                continue
+            buffered[result['index']] = result
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+
+def run_batch(path: str, online: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+              rate: Optional[float] = None, ordered: bool = True, use_cache: bool = True) -> int:
+    """
+    Answer a JSONL file of questions and stream JSONL results to stdout.
+
+    Args:
+        path (str): Input file, or '-' for stdin.
+        online (bool): Whether to use online APIs.
+        concurrency (int): Maximum questions in flight.
+        rate (Optional[float]): Maximum online requests started per second.
+        ordered (bool): Write in input order (True) or completion order (False).
+        use_cache (bool): Whether to use the response cache.
+
+    Returns:
+        int: Number of results written.
+    """
+    async def stream(lines: Iterable[str]) -> int:
+        written = 0
+        async for result in ask_batch(read_questions(lines), online, concurrency, rate, ordered, use_cache):
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+            sys.stdout.flush()
+            written += 1
+        return written
+
+    if path == '-':
+        return asyncio.run(stream(sys.stdin))
+    with open(path, 'r', encoding='utf-8') as f:
+        return asyncio.run(stream(f))
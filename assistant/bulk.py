@@ -0,0 +1,250 @@
+import os
+import sys
+import csv
+import json
+import datetime
+import logging
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from assistant.fileio import atomic_write
+from assistant.notemeta import normalize_tag
+
+logger = logging.getLogger(__name__)
+
+# Records written to the store per batch on import
+IMPORT_BATCH = 10000
+
+FORMATS = ('jsonl', 'csv')
+
+# Fields of each kind of record, in CSV column order
+NOTE_FIELDS = ('id', 'note', 'tags', 'created')
+REMINDER_FIELDS = ('id', 'message', 'time', 'scheduled_at')
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Pick the file format: the one given, else 'csv' for ``.csv`` files and 'jsonl' otherwise.
+
+    Raises:
+        ValueError: If ``fmt`` is not a known format.
+    """
+    if fmt is None:
+        return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    return fmt
+
+def read_records(f: IO[str], fmt: str, field: str) -> Iterator[Dict[str, Any]]:
+    """
+    Parse records one at a time from a JSONL or CSV stream.
+
+    A JSONL line may be an object or a bare string, which is taken as the
+    value of ``field``. CSV needs a header row naming the columns.
+
+    Args:
+        f (IO[str]): The stream.
+        fmt (str): 'jsonl' or 'csv'.
+        field (str): Field a bare JSON string stands for, e.g. 'note'.
+
+    Yields:
+        Dict[str, Any]: Each record.
+
+    Raises:
+        ValueError: If a line is not valid JSON, or not an object or string.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(f)
+        return
+    for lineno, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {lineno}: invalid JSON ({e})") from e
+        if isinstance(record, str):
+            record = {field: record}
+        elif not isinstance(record, dict):
+            raise ValueError(f"Line {lineno}: expected an object or a string")
+        yield record
+
+class Checkpoint:
+    """
+    Progress of an import, saved after every batch so a failed import can resume.
+
+    The file records the source path and how many of its records are already
+    in the store. Resuming skips that many records, so it expects the same
+    source file. A batch that was written just before a crash, but not yet
+    checkpointed, is imported again.
+
+    Args:
+        path (str): Checkpoint file.
+        source (str): The file being imported.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self) -> int:
+        """
+        Number of records already imported, or 0 when starting fresh.
+
+        Raises:
+            ValueError: If the checkpoint belongs to a different source.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if state.get('source') != self.source:
+            raise ValueError(f"Checkpoint {self.path} is for {state.get('source')}; remove it to start over")
+        return state['records']
+
+    def save(self, records: int) -> None:
+        atomic_write(self.path, json.dumps({'source': self.source, 'records': records}))
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator[IO[str]]:
+    """Open a file as UTF-8 text with CSV-safe newlines, or stdin/stdout for '-'."""
+    if path == '-':
+        yield sys.stdin if 'r' in mode else sys.stdout
+        return
+    with open(path, mode, encoding='utf-8', newline='') as f:
+        yield f
+
+def import_records(source: str, convert: Callable[[Dict[str, Any]], Any], write: Callable[[List[Any]], Any],
+                   field: str, fmt: Optional[str] = None, batch_size: int = IMPORT_BATCH,
+                   checkpoint: Optional[str] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+    """
+    Stream records from a file into the store in batches.
+
+    Only one batch is held in memory at a time. After each batch is written
+    the checkpoint (if any) is updated; it is removed once the import
+    completes, and an existing one makes the import resume where it stopped.
+
+    Args:
+        source (str): JSONL or CSV file, or '-' for stdin.
+        convert (Callable): Turns a record into what ``write`` takes; raises ValueError for bad records.
+        write (Callable): Stores one batch.
+        field (str): Field a bare JSONL string stands for.
+        fmt (Optional[str]): 'jsonl' or 'csv'; detected from the file name if None.
+        batch_size (int): Records per batch.
+        checkpoint (Optional[str]): Checkpoint file; None to import without one.
+        progress (Optional[Callable]): Called with the records done so far after each batch.
+
+    Returns:
+        Dict[str, int]: ``imported`` in this run and ``skipped`` (already imported before a resume).
+
+    Raises:
+        ValueError: For unreadable records, reported with their number in the file.
+    """
+    fmt = detect_format(source, fmt)
+    state = Checkpoint(checkpoint, source) if checkpoint and source != '-' else None
+    skipped = state.load() if state else 0
+    if skipped:
+        logger.info("Resuming import of %s after %d records", source, skipped)
+    done = skipped
+    batch: List[Any] = []
+
+    def flush() -> None:
+        nonlocal done
+        write(batch)
+        done += len(batch)
+        batch.clear()
+        if state:
+            state.save(done)
+        if progress:
+            progress(done)
+
+    with _open(source, 'r') as f:
+        for number, record in enumerate(read_records(f, fmt, field), 1):
+            if number <= skipped:
+                continue
+            try:
+                batch.append(convert(record))
+            except (KeyError, TypeError, ValueError) as e:
+                detail = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+                raise ValueError(f"Record {number}: {detail}") from e
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    if state:
+        state.clear()
+    return {'imported': done - skipped, 'skipped': skipped}
+
+def export_records(records: Iterable[Dict[str, Any]], dest: str, fields: Iterable[str],
+                   fmt: Optional[str] = None) -> int:
+    """
+    Stream records to a JSONL or CSV file.
+
+    A file is written under a temporary name and renamed when complete, so
+    an interrupted export never looks finished.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): The records, consumed lazily.
+        dest (str): Output file, or '-' for stdout.
+        fields (Iterable[str]): Fields to write, in CSV column order. In CSV
+            a list value (e.g. tags) is one space-separated column.
+        fmt (Optional[str]): 'jsonl' or 'csv'; detected from the file name if None.
+
+    Returns:
+        int: Number of records written.
+    """
+    fmt = detect_format(dest, fmt)
+    fields = list(fields)
+    target = dest if dest == '-' else f"{dest}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with _open(target, 'w') as f:
+            if fmt == 'csv':
+                writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+                writer.writeheader()
+                for count, record in enumerate(records, 1):
+                    writer.writerow({k: ' '.join(v) if isinstance(v, list) else v for k, v in record.items()})
+            else:
+                for count, record in enumerate(records, 1):
+                    f.write(json.dumps({k: record.get(k) for k in fields}, ensure_ascii=False) + '\n')
+        if target != dest:
+            os.replace(target, dest)
+    except BaseException:
+        if target != dest and os.path.exists(target):
+            os.remove(target)
+        raise
+    return count
+
+def note_from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The note fields of an imported record, for ``utils.add_note_records``.
+
+    ``tags`` may be a list or a string of tags separated by spaces or commas,
+    and ``created`` an ISO datetime; both are optional.
+    """
+    note = record['note']
+    if not isinstance(note, str):
+        raise ValueError(f"note must be a string, got {type(note).__name__}")
+    tags = record.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.replace(',', ' ').split()
+    elif not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags must be a list of strings")
+    created = record.get('created') or None
+    return {'note': note, 'tags': sorted({normalize_tag(tag) for tag in tags}),
+            'created': datetime.datetime.fromisoformat(created).timestamp() if created is not None else None}
+
+def reminder_from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The reminder fields of an imported record, for ``utils.add_reminders``."""
+    if not record['message']:
+        raise ValueError("message is empty")
+    datetime.datetime.fromisoformat(record['scheduled_at'])
+    return {'message': record['message'], 'time': record.get('time') or None,
+            'scheduled_at': record['scheduled_at']}
@@ -0,0 +1,277 @@
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import weakref
+import threading
+import contextlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from assistant import metrics
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+# Hits whose access time and counters are held in memory before being written in one transaction
+TOUCH_BATCH = 64
+
+_open_caches: 'weakref.WeakSet[ResponseCache]' = weakref.WeakSet()
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookups: casefold and collapse whitespace.
+
+    Args:
+        question (str): The question.
+
+    Returns:
+        str: The normalized question.
+    """
+    return ' '.join(question.casefold().split())
+
+def cache_key(question: str, provider: str, model: str, params: Dict[str, Any]) -> str:
+    """
+    Build the cache key for an online query.
+
+    Args:
+        question (str): The question.
+        provider (str): Provider name.
+        model (str): Model name.
+        params (Dict[str, Any]): Generation parameters.
+
+    Returns:
+        str: A hex digest identifying the query.
+    """
+    payload = json.dumps([normalize_question(question), provider, model, params], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Persistent cache of online answers with TTL and LRU eviction.
+
+    Entries expire ``ttl`` seconds after they were stored. When the cache
+    holds more than ``max_entries`` entries or ``max_bytes`` of responses,
+    the least recently used ones are evicted.
+
+    A hit is a single read: its access time and the hit/miss counters are
+    kept in memory and written in one transaction every ``TOUCH_BATCH``
+    lookups, before any eviction, and on ``close`` or exit. Entry count and
+    total size are running totals in the ``stats`` table, updated in the
+    same transaction as each insert or delete.
+
+    Args:
+        path (str): Database file path.
+        ttl (float): Entry lifetime in seconds.
+        max_entries (int): Maximum number of entries.
+        max_bytes (int): Maximum total size of cached responses.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            question TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+        CREATE TABLE IF NOT EXISTS stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        self._touched: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._pending = 0
+        totals_query = "SELECT 1 FROM stats WHERE name = 'entries'"
+        if self._conn.execute(totals_query).fetchone() is None:
+            with self._lock, self._transaction():
+                # Caches from before the running totals: count once
+                entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+                self._conn.executemany('INSERT OR IGNORE INTO stats (name, value) VALUES (?, ?)',
+                                       (('entries', entries), ('bytes', size)))
+        _open_caches.add(self)
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """One write transaction, taken up front so concurrent writers queue instead of failing. Needs _lock."""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        self._conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?',
+            (name, amount, amount)
+        )
+
+    def _count(self, name: str) -> None:
+        """Record a lookup outcome in memory, writing the batch when it is full. Needs _lock."""
+        self._counts[name] = self._counts.get(name, 0) + 1
+        self._pending += 1
+        if self._pending >= TOUCH_BATCH:
+            with self._transaction():
+                self._write_pending()
+
+    def _write_pending(self) -> None:
+        """Write held access times and counters. Needs _lock and a transaction."""
+        if self._touched:
+            self._conn.executemany('UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?',
+                                   ((at, key) for key, at in self._touched.items()))
+        for name, amount in self._counts.items():
+            self._bump(name, amount)
+        self._touched.clear()
+        self._counts.clear()
+        self._pending = 0
+
+    def _delete(self, key: str) -> int:
+        """Delete one entry and update the totals, returning its size or -1 if absent. Needs _lock and a transaction."""
+        row = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return -1
+        self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+        self._bump('entries', -1)
+        self._bump('bytes', -row[0])
+        return row[0]
+
+    def flush(self) -> None:
+        """Write access times and counters still held in memory."""
+        with self._lock:
+            if self._pending and self._conn is not None:
+                with self._transaction():
+                    self._write_pending()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Key from ``cache_key``.
+
+        Returns:
+            Optional[str]: The response, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._count('misses')
+            elif now - row[1] > self.ttl:
+                with self._transaction():
+                    # Another process may have stored a fresh answer since the read
+                    if self._conn.execute('SELECT 1 FROM responses WHERE key = ? AND created_at = ?',
+                                          (key, row[1])).fetchone():
+                        self._delete(key)
+                    self._bump('expired')
+                    self._bump('misses')
+                self._touched.pop(key, None)
+                row = None
+            if row is None:
+                metrics.inc('assistant_response_cache_lookups_total', result='miss')
+                return None
+            self._touched[key] = now
+            self._count('hits')
+            metrics.inc('assistant_response_cache_lookups_total', result='hit')
+            return row[0]
+
+    def put(self, key: str, response: str, provider: str = '', model: str = '', question: str = '') -> None:
+        """
+        Store a response and evict least recently used entries over the limits.
+
+        Args:
+            key (str): Key from ``cache_key``.
+            response (str): The response to cache.
+            provider (str): Provider name, for inspection.
+            model (str): Model name, for inspection.
+            question (str): Original question, for inspection.
+        """
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock, self._transaction():
+            # Pending access times first, so eviction sees the true LRU order
+            self._write_pending()
+            old_size = self._delete(key)
+            self._conn.execute(
+                'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, provider, model, question, response, size, now, now)
+            )
+            self._bump('entries', 1)
+            self._bump('bytes', size)
+            count, total = self._totals()
+            evicted = 0
+            while count > self.max_entries or total > self.max_bytes:
+                oldest = self._conn.execute('SELECT key FROM responses ORDER BY accessed_at LIMIT 1').fetchone()
+                if oldest is None:
+                    break
+                total -= self._delete(oldest[0])
+                count -= 1
+                evicted += 1
+            if evicted:
+                self._bump('evictions', evicted)
+
+    def _totals(self) -> Tuple[int, int]:
+        """Entry count and total response size from the running totals. Needs _lock."""
+        totals = dict(self._conn.execute("SELECT name, value FROM stats WHERE name IN ('entries', 'bytes')"))
+        return totals.get('entries', 0), totals.get('bytes', 0)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report cache counters and current size.
+
+        Returns:
+            Dict[str, int]: hits, misses, expired, evictions, entries and bytes.
+        """
+        self.flush()
+        with self._lock:
+            counters = dict(self._conn.execute('SELECT name, value FROM stats'))
+        return {name: counters.get(name, 0) for name in ('hits', 'misses', 'expired', 'evictions', 'entries', 'bytes')}
+
+    def clear(self) -> int:
+        """
+        Remove every cached response and reset the counters.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock, self._transaction():
+            removed = self._conn.execute('DELETE FROM responses').rowcount
+            self._conn.execute("DELETE FROM stats")
+            self._conn.executemany('INSERT INTO stats (name, value) VALUES (?, 0)', (('entries',), ('bytes',)))
+            self._touched.clear()
+            self._counts.clear()
+            self._pending = 0
+        return removed
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        _open_caches.discard(self)
+
+@atexit.register
+def _flush_open_caches() -> None:
+    for cache in list(_open_caches):
+        cache.flush()
@@ -0,0 +1,240 @@
+import ast
+import math
+import types
+import importlib.util
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+# Largest integer result, in bits, that powers and factorials may produce, so
+# '9**9**9' or 'factorial(10**8)' fails fast instead of tying up a worker.
+MAX_INT_BITS = 1 << 20
+
+# Most points a range variable may take, so 'x=0:1e12' fails instead of exhausting memory
+MAX_RANGE_POINTS = 10_000_000
+
+MATH_NAMES = tuple(name for name in dir(math) if not name.startswith('_'))
+
+# math names available in range mode, with the NumPy function behind each
+VECTOR_MATH = {
+    'sqrt': 'sqrt', 'exp': 'exp', 'expm1': 'expm1', 'log2': 'log2', 'log10': 'log10', 'log1p': 'log1p',
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan', 'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan',
+    'atan2': 'arctan2', 'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh', 'asinh': 'arcsinh',
+    'acosh': 'arccosh', 'atanh': 'arctanh', 'hypot': 'hypot', 'degrees': 'degrees', 'radians': 'radians',
+    'fabs': 'fabs', 'floor': 'floor', 'ceil': 'ceil', 'trunc': 'trunc', 'copysign': 'copysign',
+    'fmod': 'fmod', 'pow': 'power', 'isnan': 'isnan', 'isinf': 'isinf', 'isfinite': 'isfinite',
+    'pi': 'pi', 'e': 'e', 'inf': 'inf', 'nan': 'nan',
+}
+VECTOR_MATH_NAMES = tuple(sorted({'log', 'tau', *VECTOR_MATH}))
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+    ast.Call, ast.Attribute,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub,
+)
+
+class CalcError(ValueError):
+    """Raised when an expression is not allowed or cannot be evaluated."""
+
+def _check_bits(bits: float) -> None:
+    if bits > MAX_INT_BITS:
+        raise CalcError(f"Result would have about {bits:.3g} bits; the limit is {MAX_INT_BITS}.")
+
+def _pow(base: Any, exponent: Any) -> Any:
+    if isinstance(exponent, int) and isinstance(base, int) and exponent > 0 and abs(base) > 1:
+        _check_bits(exponent * math.log2(abs(base)))
+    return base ** exponent
+
+def _log2_factorial(n: int) -> float:
+    return math.lgamma(n + 1) / math.log(2)
+
+def _factorial(n: Any) -> int:
+    if isinstance(n, int) and n > 0:
+        _check_bits(_log2_factorial(n))
+    return math.factorial(n)
+
+def _perm(n: Any, k: Any = None) -> int:
+    if isinstance(n, int) and n > 0:
+        rest = n - k if isinstance(k, int) and 0 <= k <= n else 0
+        _check_bits(_log2_factorial(n) - _log2_factorial(rest))
+    return math.perm(n, k)
+
+def _comb(n: Any, k: Any) -> int:
+    if isinstance(n, int) and isinstance(k, int) and 0 <= k <= n:
+        _check_bits(_log2_factorial(n) - _log2_factorial(k) - _log2_factorial(n - k))
+    return math.comb(n, k)
+
+# math functions whose integer results grow without bound, wrapped with a size check
+_LIMITED = {'factorial': _factorial, 'perm': _perm, 'comb': _comb}
+_MATH_FUNCTIONS = {name: _LIMITED.get(name, getattr(math, name)) for name in MATH_NAMES}
+
+class _Validator(ast.NodeTransformer):
+    """Reject anything outside the arithmetic whitelist and route ** through _pow."""
+
+    def __init__(self, names: frozenset, math_names: Tuple[str, ...]):
+        self.names = names
+        self.math_names = math_names
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, ALLOWED_NODES):
+            raise CalcError(f"Unsupported syntax: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalcError(f"Unsupported constant: {node.value!r}")
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id not in self.names:
+            raise CalcError(f"Name '{node.id}' is not allowed.")
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        if not (isinstance(node.value, ast.Name) and node.value.id == 'math' and node.attr in self.math_names):
+            raise CalcError("Only math.<function> attributes are allowed.")
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if node.keywords:
+            raise CalcError("Keyword arguments are not allowed.")
+        return self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        node = self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id='_pow', ctx=ast.Load()), args=[node.left, node.right], keywords=[]),
+                node
+            )
+        return node
+
+SCALAR_NAMESPACE: Dict[str, Any] = {
+    'abs': abs,
+    'round': round,
+    'min': min,
+    'max': max,
+    'math': types.SimpleNamespace(**_MATH_FUNCTIONS),
+    '_pow': _pow,
+    **_MATH_FUNCTIONS,
+}
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str, variables: Tuple[str, ...] = (), vector: bool = False) -> types.CodeType:
+    """
+    Parse, validate and compile an expression, caching the result by its text.
+
+    Args:
+        expression (str): The expression to compile.
+        variables (Tuple[str, ...]): Extra names the expression may reference.
+        vector (bool): Allow only the functions available in range mode.
+
+    Returns:
+        types.CodeType: Compiled code for eval.
+
+    Raises:
+        CalcError: If the expression uses anything outside the whitelist.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise CalcError(f"Invalid expression: {e.msg}") from None
+    math_names = VECTOR_MATH_NAMES if vector else MATH_NAMES
+    names = frozenset(('abs', 'round', 'min', 'max', 'math') + math_names + variables)
+    tree = ast.fix_missing_locations(_Validator(names, math_names).visit(tree))
+    return compile(tree, '<calc>', 'eval')
+
+def evaluate(expression: str) -> Any:
+    """
+    Evaluate a whitelisted arithmetic expression.
+
+    Args:
+        expression (str): The expression to evaluate.
+
+    Returns:
+        Any: The result.
+
+    Raises:
+        CalcError: If the expression is not allowed or the result is too large.
+    """
+    result = eval(compile_expression(expression), {'__builtins__': {}}, SCALAR_NAMESPACE)
+    if isinstance(result, int):
+        try:
+            str(result)
+        except ValueError:
+            # Python refuses to print integers past sys.get_int_max_str_digits()
+            raise CalcError(f"Result has too many digits to display ({result.bit_length()} bits).") from None
+    return result
+
+@lru_cache(maxsize=1)
+def _vector_namespace() -> Dict[str, Any]:
+    import numpy as np
+
+    def log(x: Any, base: Any = None) -> Any:
+        return np.log(x) if base is None else np.log(x) / np.log(base)
+
+    functions = {name: getattr(np, attr) for name, attr in VECTOR_MATH.items()}
+    functions.update({'log': log, 'tau': 2 * np.pi})
+    return {
+        'abs': np.abs,
+        'round': np.round,
+        'min': np.minimum,
+        'max': np.maximum,
+        'math': types.SimpleNamespace(**functions),
+        '_pow': np.power,
+        **functions,
+    }
+
+def parse_range(spec: str) -> Tuple[str, float, float, float]:
+    """
+    Parse a range variable of the form ``name=start:stop[:step]``.
+
+    Args:
+        spec (str): The range spec, e.g. ``x=0:1e6:1``.
+
+    Returns:
+        Tuple[str, float, float, float]: Name, start, stop and step.
+
+    Raises:
+        CalcError: If the spec is malformed.
+    """
+    name, sep, bounds = spec.partition('=')
+    parts = bounds.split(':')
+    if not sep or not name.isidentifier() or len(parts) not in (2, 3):
+        raise CalcError(f"Invalid range '{spec}'. Use name=start:stop[:step].")
+    try:
+        start, stop, step = (float(p) for p in parts + ['1'] * (3 - len(parts)))
+    except ValueError:
+        raise CalcError(f"Invalid range '{spec}'. Bounds must be numbers.") from None
+    if step == 0:
+        raise CalcError("Range step must not be zero.")
+    return name, start, stop, step
+
+def evaluate_range(expression: str, ranges: Dict[str, Tuple[float, float, float]]) -> Any:
+    """
+    Evaluate an expression over whole NumPy arrays at once.
+
+    Args:
+        expression (str): The expression to evaluate.
+        ranges (Dict[str, Tuple[float, float, float]]): Variable name -> (start, stop, step).
+
+    Returns:
+        numpy.ndarray: The result for every point of the range.
+
+    Raises:
+        CalcError: If NumPy is unavailable, the expression is not allowed or a range is too long.
+    """
+    if not NUMPY_AVAILABLE:
+        raise CalcError("NumPy is required for range evaluation. Install it with 'pip install numpy'.")
+    import numpy as np
+    code = compile_expression(expression, tuple(sorted(ranges)), vector=True)
+    namespace = dict(_vector_namespace())
+    for name, (start, stop, step) in ranges.items():
+        points = (stop - start) / step
+        if not math.isfinite(points) or points > MAX_RANGE_POINTS:
+            raise CalcError(f"Range '{name}' has too many points; the limit is {MAX_RANGE_POINTS}.")
+        namespace[name] = np.arange(start, stop, step)
+    result = eval(code, {'__builtins__': {}}, namespace)
+    return np.asarray(result, dtype=float)
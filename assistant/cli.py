@@ -1,61 +1,385 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import argparse
+import datetime
+import json
+import os
 import sys
-from typing import List
-from assistant.utils import add_note, list_notes, schedule_reminder, check_reminders, safe_calc
-from assistant.ai_module import get_answer
-
-# Optional UI
-try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich.text import Text
-    RICH_AVAILABLE = True
-    console = Console()
-except ImportError:
-    RICH_AVAILABLE = False
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from assistant.utils import add_note, add_note_records, add_reminders, iter_notes, iter_note_records, note_tags, search_notes, reindex_notes, compact_notes, schedule_reminder, check_reminders, run_scheduler, safe_calc, safe_calc_range, migrate_to_sqlite, convert_notes
+from assistant.utils import get_response_cache, get_storage, daemon_socket_path
+from assistant import metrics
+from assistant.logs import configure_logging, parse_levels
+
+_IMPORT_FINISHED = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+# Heavy optional modules that offline commands should never load; reported by --timings
+OPTIONAL_MODULES = ('rich', 'requests', 'openai', 'google.generativeai', 'numpy', 'assistant.ai_module',
+                    'assistant.daemon')
+
+@lru_cache(maxsize=None)
+def get_console() -> Any:
+    """Create the rich console on first output, or return None without rich."""
+    try:
+        from rich.console import Console
+    except ImportError:
+        return None
+    return Console()
+
+def get_answer(question: str, online: bool = False, use_cache: bool = True,
+               session_id: Optional[str] = None) -> str:
+    # The Q&A module and provider registry load only for 'ask'
+    from assistant.ai_module import get_answer
+    return get_answer(question, online=online, use_cache=use_cache, session_id=session_id)
+
+def stream_answer(question: str, online: bool = False, use_cache: bool = True,
+                  session_id: Optional[str] = None) -> Iterator[str]:
+    from assistant.ai_module import stream_answer
+    return stream_answer(question, online=online, use_cache=use_cache, session_id=session_id)
+
+def call(method: str, local: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a library call through the daemon when one serves DATA_DIR, else in this process.
+
+    Args:
+        method (str): Daemon method name.
+        local (Callable): The same call in-process.
+        *args, **kwargs: Arguments for the call.
+
+    Returns:
+        Any: The call's result.
+    """
+    path = daemon_socket_path()
+    if path is not None:
+        from assistant.daemon import DaemonClient, DaemonUnavailable
+        try:
+            with DaemonClient(path) as client, metrics.timer('assistant_daemon_call_seconds', method=method):
+                return client.call(method, *args, **kwargs)
+        except DaemonUnavailable as e:
+            logger.warning("%s; running in-process", e)
+    return local(*args, **kwargs)
+
+def call_stream(method: str, local: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any) -> Iterator[Any]:
+    """
+    Stream a library call's output through the daemon when one serves DATA_DIR, else from this process.
+
+    Args:
+        method (str): Daemon streaming method name.
+        local (Callable): The same call in-process, returning an iterator.
+        *args, **kwargs: Arguments for the call.
+
+    Returns:
+        Iterator[Any]: The call's chunks.
+    """
+    path = daemon_socket_path()
+    if path is not None:
+        from assistant.daemon import DaemonClient, DaemonUnavailable
+        try:
+            client = DaemonClient(path)
+        except DaemonUnavailable as e:
+            logger.warning("%s; running in-process", e)
+        else:
+            return _stream_from(client, method, args, kwargs)
+    return local(*args, **kwargs)
+
+def _stream_from(client: Any, method: str, args: Tuple[Any, ...], kwargs: Any) -> Iterator[Any]:
+    with client:
+        yield from client.stream(method, *args, **kwargs)
+
+# Notes fetched per daemon round trip when streaming a listing
+NOTES_PAGE_SIZE = 500
+
+def stream_notes(offset: int = 0, limit: Optional[int] = None, reverse: bool = False,
+                 tags: Optional[List[str]] = None, since: Optional[str] = None,
+                 records: bool = False) -> Iterator[Any]:
+    """
+    Stream numbered notes from the daemon a page at a time, or from the store in this process.
+
+    Args:
+        offset (int): Notes to skip from the start (or from the end, with ``reverse``).
+        limit (Optional[int]): Maximum number of notes; None for all.
+        reverse (bool): Newest first.
+        tags (Optional[List[str]]): Only notes carrying all of these tags.
+        since (Optional[str]): Only notes added on or after this ISO date.
+        records (bool): Yield full records with tags and creation times instead of pairs.
+
+    Yields:
+        Tuple[int, str]: (number, note) pairs, or with ``records`` dicts from
+        :func:`assistant.utils.iter_note_records`.
+    """
+    source = iter_note_records if records else iter_notes
+    if daemon_socket_path() is None:
+        yield from source(offset, limit, reverse, tags, since)
+        return
+    method = 'note_records_page' if records else 'notes_page'
+    while limit is None or limit > 0:
+        size = NOTES_PAGE_SIZE if limit is None else min(NOTES_PAGE_SIZE, limit)
+        page = call(method, lambda *a: list(source(*a)), offset, size, reverse, tags, since)
+        for item in page:
+            yield item if records else tuple(item)
+        if len(page) < size:
+            return
+        offset += len(page)
+        if limit is not None:
+            limit -= len(page)
 
 def print_success(message: str) -> None:
-    if RICH_AVAILABLE:
+    console = get_console()
+    if console:
         console.print(f"[green]+[/green] {message}")
     else:
         print(f"+ {message}")
 
 def print_error(message: str) -> None:
-    if RICH_AVAILABLE:
+    console = get_console()
+    if console:
         console.print(f"[red]-[/red] {message}")
     else:
         print(f"- {message}")
 
 def print_info(message: str) -> None:
-    if RICH_AVAILABLE:
+    console = get_console()
+    if console:
         console.print(f"[blue]i[/blue] {message}")
     else:
         print(f"i {message}")
 
-def display_notes(notes: List[str]) -> None:
-    if RICH_AVAILABLE:
-        table = Table(title="Your Notes")
+def print_stream(chunks: Iterable[str]) -> None:
+    """Print text chunks as they arrive, on one info line."""
+    console = get_console()
+    if console:
+        console.print("[blue]i[/blue] ", end='')
+        for chunk in chunks:
+            console.print(chunk, end='', markup=False, highlight=False)
+        console.print()
+    else:
+        sys.stdout.write("i ")
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        sys.stdout.write("\n")
+
+def print_timings(phases: List[Tuple[str, float]]) -> None:
+    """
+    Report where an invocation spent its time, on stderr.
+
+    For a per-module breakdown of import time, run with ``python -X importtime``.
+
+    Args:
+        phases (List[Tuple[str, float]]): (phase name, seconds) in order.
+    """
+    total = sum(seconds for _, seconds in phases)
+    for name, seconds in phases + [('total', total)]:
+        sys.stderr.write(f"{name:<16} {seconds * 1000:8.1f} ms\n")
+    loaded = [name for name in OPTIONAL_MODULES if name in sys.modules]
+    sys.stderr.write(f"optional modules: {', '.join(loaded) or 'none'}\n")
+
+def print_profile(fmt: str = 'table') -> None:
+    """
+    Write the metrics recorded for this command to stderr.
+
+    Args:
+        fmt (str): 'table' (time per metric, slowest first), 'json' or 'prometheus'.
+    """
+    if fmt == 'json':
+        sys.stderr.write(metrics.to_json() + "\n")
+        return
+    if fmt == 'prometheus':
+        sys.stderr.write(metrics.to_prometheus())
+        return
+    data = metrics.snapshot()
+
+    def label(record: dict) -> str:
+        labels = ','.join(f"{k}={v}" for k, v in record['labels'].items())
+        return f"{record['name']}{{{labels}}}" if labels else record['name']
+
+    sys.stderr.write(f"{'timer':<52} {'count':>6} {'total ms':>10} {'mean ms':>9}\n")
+    for record in sorted(data['histograms'], key=lambda r: r['sum'], reverse=True):
+        sys.stderr.write(f"{label(record):<52} {record['count']:>6} {record['sum'] * 1000:>10.3f} "
+                         f"{record['sum'] / record['count'] * 1000:>9.3f}\n")
+    for record in data['counters']:
+        sys.stderr.write(f"{label(record):<52} {record['value']:>6g}\n")
+
+def display_notes(notes: Iterable[Any], fmt: str = 'table') -> int:
+    """
+    Print numbered notes as they are read, so output starts before the listing ends.
+
+    Args:
+        notes (Iterable[Any]): (number, note) pairs, or for 'jsonl' note records
+            with ``id``, ``note``, ``tags`` and ``created``.
+        fmt (str): 'table' for people, or 'jsonl' for one JSON object per line.
+
+    Returns:
+        int: Number of notes printed.
+    """
+    count = 0
+    if fmt == 'jsonl':
+        for count, record in enumerate(notes, 1):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return count
+    console = get_console()
+    if console:
+        from rich.markup import escape
+        for count, (number, note) in enumerate(notes, 1):
+            if count == 1:
+                console.print("[bold]Your Notes[/bold]")
+            console.print(f"[cyan]{number:>4}[/cyan]  [magenta]{escape(note)}[/magenta]", highlight=False)
+    else:
+        for count, (number, note) in enumerate(notes, 1):
+            print(f"{number}. {note}")
+    return count
+
+def display_search_results(results: List[Tuple[int, str, float]]) -> None:
+    console = get_console()
+    if console:
+        from rich.table import Table
+        table = Table(title="Search Results")
         table.add_column("ID", style="cyan", no_wrap=True)
         table.add_column("Note", style="magenta")
-        for i, note in enumerate(notes, 1):
-            table.add_row(str(i), note)
+        table.add_column("Score", style="green", no_wrap=True)
+        for note_id, note, score in results:
+            table.add_row(str(note_id), note, f"{score:.2f}")
         console.print(table)
     else:
-        for i, note in enumerate(notes, 1):
-            print(f"{i}. {note}")
+        for note_id, note, score in results:
+            print(f"{note_id}. {note} ({score:.2f})")
 
-def main() -> None:
+def iso_date(value: str) -> str:
+    """Argparse type for an ISO date or datetime, kept as text."""
+    try:
+        datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date like 2026-01-31, got {value!r}")
+    return value
+
+def parse_tags(tags: List[str], parser: argparse.ArgumentParser) -> List[str]:
+    """Normalize --tag values, exiting with a usage error for an invalid one."""
+    from assistant.notemeta import normalize_tag
+    try:
+        return [normalize_tag(tag) for tag in tags]
+    except ValueError as e:
+        parser.error(str(e))
+
+def non_negative(value: str) -> int:
+    """argparse type for counts that can't be negative."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+def transfer(args: argparse.Namespace, kind: str) -> None:
+    """
+    Run 'import' or 'export' for notes or reminders.
+
+    Imports write each batch through the daemon when one is running, and
+    report progress on stderr.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments of the subcommand.
+        kind (str): 'notes' or 'reminders'.
+    """
+    from assistant import bulk
+    command = args.note_command if kind == 'notes' else args.reminders_command
+    if command == 'export':
+        if kind == 'notes':
+            records = stream_notes(records=True)
+            fields = bulk.NOTE_FIELDS
+        else:
+            records = call('list_reminders', lambda: get_storage().list_reminders())
+            fields = bulk.REMINDER_FIELDS
+        count = bulk.export_records(records, args.file, fields, args.format)
+        if args.file != '-':
+            print_success(f"Exported {count} {kind} to {args.file}.")
+        return
+
+    if kind == 'notes':
+        convert, field = bulk.note_from_record, 'note'
+        write = lambda batch: call('add_note_records', add_note_records, batch)
+    else:
+        convert, field = bulk.reminder_from_record, 'message'
+        write = lambda batch: call('add_reminders', add_reminders, batch)
+    started = time.perf_counter()
+
+    def progress(done: int) -> None:
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        sys.stderr.write(f"\r{done} {kind} imported ({rate:,.0f}/s)")
+        sys.stderr.flush()
+
+    checkpoint = args.checkpoint or (None if args.file == '-' else f"{args.file}.checkpoint")
+    try:
+        counts = bulk.import_records(args.file, convert, write, field, fmt=args.format,
+                                     batch_size=args.batch_size, checkpoint=checkpoint, progress=progress)
+    except (OSError, ValueError) as e:
+        sys.stderr.write("\n")
+        print_error(f"Import failed: {e}")
+        if checkpoint and os.path.exists(checkpoint):
+            print_info("Run the same command again to resume.")
+        sys.exit(1)
+    sys.stderr.write("\n")
+    resumed = f" (resumed after {counts['skipped']})" if counts['skipped'] else ''
+    print_success(f"Imported {counts['imported']} {kind}{resumed}.")
+
+def positive(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be 1 or more, got {number}")
+    return number
+
+def positive_float(value: str) -> float:
+    """argparse type for rates that must be above 0."""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be above 0, got {value}")
+    return number
+
+def add_transfer_parsers(subparsers: Any, kind: str) -> None:
+    """Add 'import' and 'export' subcommands for notes or reminders."""
+    import_parser = subparsers.add_parser('import', help=f'Import {kind} from a JSONL or CSV file')
+    import_parser.add_argument('file', help="File to read ('-' for stdin)")
+    import_parser.add_argument('--format', choices=['jsonl', 'csv'], help='File format (default: from the file name)')
+    import_parser.add_argument('--batch-size', type=positive, default=10000, help='Records written per batch')
+    import_parser.add_argument('--checkpoint', help='Progress file for resuming a failed import (default: FILE.checkpoint)')
+    export_parser = subparsers.add_parser('export', help=f'Export {kind} to a JSONL or CSV file')
+    export_parser.add_argument('file', help="File to write ('-' for stdout)")
+    export_parser.add_argument('--format', choices=['jsonl', 'csv'], help='File format (default: from the file name)')
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for every command."""
     parser = argparse.ArgumentParser(
         description="Mini AI Assistant - Intelligent CLI Tool",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   python -m assistant.cli remind "Meeting" --time 14:00
+  python -m assistant.cli scheduler
   python -m assistant.cli note add "Buy groceries"
   python -m assistant.cli calc "2 + 3 * 4"
+  python -m assistant.cli calc "sin(x)*x**2" --var x=0:1e6:1
   python -m assistant.cli ask "What time is it?" --online
+  python -m assistant.cli ask "Explain recursion" --online --stream
+  python -m assistant.cli ask --batch questions.jsonl --online --concurrency 16
+  python -m assistant.cli --timings note list
+  python -m assistant.cli --profile note search milk
+  python -m assistant.cli shell
+  python -m assistant.cli serve --workers 8
         """
     )
+    parser.add_argument('--timings', action='store_true', help='Report startup and command timings on stderr')
+    parser.add_argument('--profile', action='store_true', help='Report where the command spent its time on stderr')
+    parser.add_argument('--profile-format', choices=['table', 'json', 'prometheus'], default='table',
+                        help='Output format for --profile')
+    parser.add_argument('--log-level', type=str.upper, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Log level (default: ASSISTANT_LOG_LEVEL or INFO)')
+    parser.add_argument('--log', metavar='LOGGER=LEVEL', action='append', default=[],
+                        help='Level for one logger, e.g. assistant.router=DEBUG (repeatable)')
+    # The innermost parser seen, for help and usage errors after parsing
+    parser.set_defaults(command_parser=parser)
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
 
     # Remind command
@@ -65,30 +389,98 @@ Examples:
 
     # Note command
     note_parser = subparsers.add_parser('note', help='Manage notes')
+    note_parser.set_defaults(command_parser=note_parser)
     note_subparsers = note_parser.add_subparsers(dest='note_command', help='Note subcommands')
 
     add_parser = note_subparsers.add_parser('add', help='Add a note')
     add_parser.add_argument('note', help='The note to add')
+    add_parser.add_argument('--tag', action='append', default=[], help='Tag the note (repeatable)')
+
+    list_parser = note_subparsers.add_parser('list', help='List notes')
+    list_parser.add_argument('--limit', type=non_negative, help='Maximum number of notes to show')
+    list_parser.add_argument('--offset', type=non_negative, default=0, help='Notes to skip first')
+    list_parser.add_argument('--reverse', action='store_true', help='Newest notes first')
+    list_parser.add_argument('--tag', action='append', default=[], help='Only notes with this tag (repeatable; all must match)')
+    list_parser.add_argument('--since', type=iso_date, help='Only notes added on or after this date, e.g. 2026-01-01')
+    list_parser.add_argument('--format', choices=['table', 'jsonl'], default='table',
+                             help="Output format; 'jsonl' writes one {\"id\", \"note\"} object per line")
+
+    search_parser = note_subparsers.add_parser('search', help='Search notes by keyword')
+    search_parser.add_argument('query', help="Terms to match; use OR between alternatives and term* for prefixes")
+    search_parser.add_argument('--limit', type=int, default=10, help='Maximum number of results')
+
+    note_subparsers.add_parser('tags', help='List tags with their note counts')
+
+    reindex_parser = note_subparsers.add_parser('reindex', help='Rebuild the note search index')
 
-    list_parser = note_subparsers.add_parser('list', help='List all notes')
+    compact_parser = note_subparsers.add_parser('compact', help='Fold the notes journal into notes.json')
+
+    convert_parser = note_subparsers.add_parser('convert', help='Copy notes between notes.json and the binary note file')
+    convert_parser.add_argument('--to', choices=['binary', 'json'], required=True, help='Format to convert to')
+
+    add_transfer_parsers(note_subparsers, 'notes')
 
     # Calc command
     calc_parser = subparsers.add_parser('calc', help='Evaluate a mathematical expression')
     calc_parser.add_argument('expression', help='Mathematical expression to evaluate')
+    calc_parser.add_argument('--var', action='append', metavar='NAME=START:STOP[:STEP]',
+                             help='Evaluate over a numeric range with NumPy (repeatable)')
 
     # Ask command
     ask_parser = subparsers.add_parser('ask', help='Ask a question')
-    ask_parser.add_argument('question', help='The question to ask')
+    ask_parser.set_defaults(command_parser=ask_parser)
+    ask_parser.add_argument('question', nargs='?', help='The question to ask')
     ask_parser.add_argument('--online', action='store_true', help='Use online AI if available')
+    ask_parser.add_argument('--stream', action='store_true', help='Print the answer as it is generated')
+    ask_parser.add_argument('--no-cache', action='store_true', help='Bypass the online response cache')
+    ask_parser.add_argument('--session', help='Conversation to continue; follow-ups keep their context through the daemon')
+    ask_parser.add_argument('--batch', metavar='FILE', help="Answer every question in a JSONL file ('-' for stdin), writing JSONL")
+    ask_parser.add_argument('--concurrency', type=positive, default=8, help='Questions in flight at once in batch mode')
+    ask_parser.add_argument('--rate', type=positive_float, help='Maximum online requests per second in batch mode')
+    ask_parser.add_argument('--order', choices=['input', 'completion'], default='input',
+                            help='Write batch results in input or completion order')
+
+    # Response cache
+    cache_parser = subparsers.add_parser('cache', help='Inspect the online response cache')
+    cache_parser.set_defaults(command_parser=cache_parser)
+    cache_subparsers = cache_parser.add_subparsers(dest='cache_command', help='Cache subcommands')
+    cache_subparsers.add_parser('stats', help='Show hit/miss statistics')
+    cache_subparsers.add_parser('clear', help='Remove all cached responses')
+
+    # Reminder import/export
+    reminders_parser = subparsers.add_parser('reminders', help='Import or export reminders')
+    reminders_parser.set_defaults(command_parser=reminders_parser)
+    reminders_subparsers = reminders_parser.add_subparsers(dest='reminders_command', help='Reminder subcommands')
+    add_transfer_parsers(reminders_subparsers, 'reminders')
 
     # Check reminders
     check_parser = subparsers.add_parser('check', help='Check for due reminders')
 
-    args = parser.parse_args()
+    # Reminder scheduler
+    scheduler_parser = subparsers.add_parser('scheduler', help='Run the reminder scheduler in the foreground')
+
+    # Migrate JSON data to SQLite
+    migrate_parser = subparsers.add_parser('migrate', help='Copy JSON notes and reminders into the SQLite store')
+
+    # Daemon
+    serve_parser = subparsers.add_parser('serve', help='Serve commands for this data directory over a Unix socket')
+    serve_parser.add_argument('--workers', type=int, default=8, help='Worker threads handling connections')
+
+    # Interactive shell
+    shell_parser = subparsers.add_parser('shell', help='Run commands interactively in one warm process')
+
+    return parser
+
+def run_command(args: argparse.Namespace) -> None:
+    """
+    Run one parsed command.
 
+    Args:
+        args (argparse.Namespace): Arguments from ``build_parser().parse_args()``.
+    """
     if args.command == 'remind':
         try:
-            schedule_reminder(args.message, args.time)
+            call('schedule_reminder', schedule_reminder, args.message, args.time)
             print_success(f"Reminder scheduled: '{args.message}' at {args.time}")
         except ValueError as e:
             print_error(f"Invalid time format: {e}")
@@ -96,34 +488,159 @@ Examples:
 
     elif args.command == 'note':
         if args.note_command == 'add':
-            add_note(args.note)
-            print_success("Note added successfully.")
+            # Check tags before anything is written, so only bad arguments are reported as usage errors
+            tags = parse_tags(args.tag, args.command_parser)
+            try:
+                call('add_note', add_note, args.note, tags=tags)
+            except ValueError as e:
+                print_error(f"Could not add note: {e}")
+            else:
+                print_success("Note added successfully.")
         elif args.note_command == 'list':
-            notes = list_notes()
-            if notes:
-                display_notes(notes)
+            tags = parse_tags(args.tag, args.command_parser)
+            notes = stream_notes(args.offset, args.limit, args.reverse, tags, args.since, records=args.format == 'jsonl')
+            shown = display_notes(notes, args.format)
+            if not shown and args.format == 'table':
+                if args.tag or args.since:
+                    print_info("No notes match.")
+                else:
+                    print_info("No notes found. Add some with 'note add'.")
+        elif args.note_command == 'tags':
+            counts = call('note_tags', note_tags)
+            for tag, count in counts.items():
+                print(f"{tag}: {count}")
+            if not counts:
+                print_info("No tagged notes. Add one with 'note add \"...\" --tag TAG'.")
+        elif args.note_command == 'search':
+            results = call('search_notes', search_notes, args.query, limit=args.limit)
+            if results:
+                display_search_results(results)
             else:
-                print_info("No notes found. Add some with 'note add'.")
+                print_info(f"No notes match '{args.query}'.")
+        elif args.note_command == 'reindex':
+            count = call('reindex_notes', reindex_notes)
+            print_success(f"Indexed {count} notes.")
+        elif args.note_command == 'compact':
+            merged = call('compact_notes', compact_notes)
+            print_success(f"Compacted {merged} journaled notes.")
+        elif args.note_command == 'convert':
+            try:
+                count = convert_notes(args.to)
+            except ValueError as e:
+                print_error(str(e))
+                sys.exit(1)
+            print_success(f"Converted {count} notes to the {args.to} format.")
+            print_info(f"Set ASSISTANT_STORAGE={args.to} to use it.")
+        elif args.note_command in ('import', 'export'):
+            transfer(args, 'notes')
         else:
-            note_parser.print_help()
+            args.command_parser.print_help()
+
+    elif args.command == 'calc' and args.var:
+        result = safe_calc_range(args.expression, args.var)
+        if isinstance(result, str):
+            print_error(result)
+        else:
+            print_success(f"Result ({result.size} values): {result}")
 
     elif args.command == 'calc':
-        result = safe_calc(args.expression)
+        result = call('safe_calc', safe_calc, args.expression)
         if isinstance(result, (int, float)):
             print_success(f"Result: {result}")
         else:
             print_error(result)
 
+    elif args.command == 'ask' and args.batch:
+        from assistant.batch import run_batch
+        run_batch(args.batch, online=args.online, concurrency=args.concurrency, rate=args.rate,
+                  ordered=args.order == 'input', use_cache=not args.no_cache)
+
+    elif args.command == 'ask' and args.question is None:
+        args.command_parser.error("a question or --batch FILE is required")
+
+    elif args.command == 'ask' and args.stream:
+        try:
+            print_stream(call_stream('stream_answer', stream_answer, args.question, online=args.online,
+                                     use_cache=not args.no_cache, session_id=args.session))
+        except Exception as e:
+            print_error(f"Streaming interrupted: {e}")
+            sys.exit(1)
+
     elif args.command == 'ask':
-        answer = get_answer(args.question, online=args.online)
+        answer = call('get_answer', get_answer, args.question, online=args.online, use_cache=not args.no_cache,
+                      session_id=args.session)
         print_info(answer)
 
+    elif args.command == 'cache':
+        if args.cache_command == 'stats':
+            stats = get_response_cache().stats()
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+            print_info(f"Entries: {stats['entries']} ({stats['bytes']} bytes)")
+            print_info(f"Hits: {stats['hits']}, misses: {stats['misses']} ({hit_rate:.1f}% hit rate)")
+            print_info(f"Expired: {stats['expired']}, evicted: {stats['evictions']}")
+        elif args.cache_command == 'clear':
+            removed = get_response_cache().clear()
+            print_success(f"Removed {removed} cached responses.")
+        else:
+            args.command_parser.print_help()
+
+    elif args.command == 'reminders':
+        if args.reminders_command in ('import', 'export'):
+            transfer(args, 'reminders')
+        else:
+            args.command_parser.print_help()
+
     elif args.command == 'check':
-        check_reminders()
+        for reminder in call('check_reminders', check_reminders, announce=False):
+            print(f"[REMINDER] {reminder['message']}")
         print_info("Reminders checked.")
 
+    elif args.command == 'scheduler':
+        print_info("Reminder scheduler running. Press Ctrl+C to stop.")
+        run_scheduler()
+
+    elif args.command == 'migrate':
+        counts = migrate_to_sqlite()
+        print_success(f"Migrated {counts['notes']} notes and {counts['reminders']} reminders to SQLite.")
+        print_info("Set ASSISTANT_STORAGE=sqlite to use the SQLite store.")
+
+    elif args.command == 'serve':
+        from assistant.daemon import serve
+        print_info("Daemon running. Other assistant commands will use it. Press Ctrl+C to stop.")
+        serve(workers=args.workers)
+
+    elif args.command == 'shell':
+        from assistant.shell import Shell
+        Shell(build_parser(), run_command, show_timings=args.timings, print_profile=print_profile).loop()
+
     else:
-        parser.print_help()
+        args.command_parser.print_help()
+
+def main() -> None:
+    started = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args()
+    parsed = time.perf_counter()
+    try:
+        levels = parse_levels(','.join(args.log)) if args.log else None
+    except ValueError as e:
+        parser.error(str(e))
+    configure_logging(args.log_level, levels)
+    if args.profile:
+        metrics.enable()
+    try:
+        with metrics.timer('assistant_command_seconds', command=args.command or 'help'):
+            run_command(args)
+    finally:
+        if args.profile:
+            print_profile(args.profile_format)
+        if args.timings:
+            print_timings([
+                ('import', _IMPORT_FINISHED - _IMPORT_STARTED),
+                ('parse', parsed - started),
+                (f"run {args.command or 'help'}", time.perf_counter() - parsed),
+            ])
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
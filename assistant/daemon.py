@@ -0,0 +1,327 @@
+import os
+import json
+import socket
+import signal
+import socketserver
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from assistant import metrics, utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+# Online answers can take several provider timeouts; don't give up on the daemon before that.
+DEFAULT_CLIENT_TIMEOUT = 300.0
+
+# Errors raised by the daemon that the client re-raises as the same type
+PASSTHROUGH_ERRORS = {'ValueError': ValueError, 'KeyError': KeyError, 'TypeError': TypeError}
+
+class DaemonError(Exception):
+    """Raised when the daemon reports a failure or breaks off mid-request."""
+
+class DaemonUnavailable(DaemonError):
+    """Raised when the daemon cannot be reached; nothing was sent, so it is safe to run in-process."""
+
+def _get_answer(question: str, online: bool = False, use_cache: bool = True,
+                session_id: Optional[str] = None) -> str:
+    from assistant.ai_module import get_answer
+    return get_answer(question, online=online, use_cache=use_cache, session_id=session_id)
+
+def _stream_answer(question: str, online: bool = False, use_cache: bool = True,
+                   session_id: Optional[str] = None) -> Iterator[str]:
+    from assistant.ai_module import stream_answer
+    return stream_answer(question, online=online, use_cache=use_cache, session_id=session_id)
+
+# Method name -> callable, served over the socket
+METHODS: Dict[str, Callable[..., Any]] = {
+    'ping': os.getpid,
+    'add_note': utils.add_note,
+    'add_notes': utils.add_notes,
+    'add_note_records': utils.add_note_records,
+    'list_notes': utils.list_notes,
+    'notes_page': lambda offset=0, limit=None, reverse=False, tags=None, since=None:
+        list(utils.iter_notes(offset, limit, reverse, tags, since)),
+    'note_records_page': lambda offset=0, limit=None, reverse=False, tags=None, since=None:
+        list(utils.iter_note_records(offset, limit, reverse, tags, since)),
+    'note_tags': utils.note_tags,
+    'search_notes': utils.search_notes,
+    'reindex_notes': utils.reindex_notes,
+    'compact_notes': utils.compact_notes,
+    'schedule_reminder': utils.schedule_reminder,
+    'add_reminders': utils.add_reminders,
+    'check_reminders': utils.check_reminders,
+    'list_reminders': lambda: utils.get_storage().list_reminders(),
+    'safe_calc': utils.safe_calc,
+    'get_answer': _get_answer,
+    'metrics': lambda fmt='prometheus': metrics.to_prometheus() if fmt == 'prometheus' else metrics.snapshot(),
+}
+
+# Methods returning iterators, whose items are sent as they are produced
+STREAM_METHODS: Dict[str, Callable[..., Iterator[Any]]] = {
+    'stream_answer': _stream_answer,
+}
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            for response in self.server.responses(line):
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+class AssistantDaemon(socketserver.UnixStreamServer):
+    """
+    Serve the assistant's library calls over a Unix socket.
+
+    One daemon owns the data store for its DATA_DIR, so concurrent scripts
+    share its storage engines, search index, caches and provider clients
+    instead of each loading them and contending on the files. Connections
+    are handled by a fixed pool of worker threads.
+
+    The protocol is newline-delimited JSON. A request is
+    ``{"id": 1, "method": "add_note", "args": ["milk"], "kwargs": {}}``; the
+    reply carries the same id and either ``result`` or
+    ``error: {"type", "message"}``. A connection may send any number of
+    requests. Streaming methods first send ``{"id": 1, "chunk": ...}`` lines
+    as their output is produced, then the usual reply with a null result.
+
+    Args:
+        data_dir (str): Data directory to serve; the socket is created in it.
+        workers (int): Size of the worker pool.
+    """
+
+    def __init__(self, data_dir: str, workers: int = DEFAULT_WORKERS):
+        self.path = os.path.join(data_dir, utils.DAEMON_SOCKET)
+        if os.path.exists(self.path):
+            if _alive(self.path):
+                raise RuntimeError(f"A daemon is already serving {data_dir}")
+            os.remove(self.path)
+        super().__init__(self.path, _Handler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='assistant-daemon')
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request: socket.socket, client_address: Any) -> None:
+        with self._connections_lock:
+            self._connections.add(request)
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request: socket.socket, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+
+    def responses(self, line: bytes) -> Iterator[Dict[str, Any]]:
+        """
+        Run one request line, yielding its chunks (for streaming methods) and then its reply.
+
+        Args:
+            line (bytes): A JSON request.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Reply objects, to be sent in order.
+        """
+        try:
+            request = json.loads(line)
+            method = STREAM_METHODS.get(request.get('method'))
+        except (ValueError, AttributeError):
+            method = None
+        if method is None:
+            yield self.respond(line)
+            return
+        request_id = request.get('id')
+        try:
+            with metrics.timer('assistant_daemon_request_seconds', method=request['method']):
+                for chunk in method(*request.get('args', []), **request.get('kwargs', {})):
+                    yield {'id': request_id, 'chunk': chunk}
+        except Exception as e:
+            logger.error("Daemon call %s failed: %s", request.get('method'), e)
+            yield {'id': request_id, 'error': {'type': type(e).__name__, 'message': str(e)}}
+            return
+        yield {'id': request_id, 'result': None}
+
+    def respond(self, line: bytes) -> Dict[str, Any]:
+        """
+        Run one request line and build its reply.
+
+        Args:
+            line (bytes): A JSON request.
+
+        Returns:
+            Dict[str, Any]: The reply object.
+        """
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+        except (ValueError, AttributeError) as e:
+            return {'id': None, 'error': {'type': 'ProtocolError', 'message': f"Invalid request: {e}"}}
+        method = METHODS.get(request.get('method'))
+        if method is None:
+            return {'id': request_id, 'error': {'type': 'ProtocolError',
+                                                'message': f"Unknown method: {request.get('method')}"}}
+        try:
+            with metrics.timer('assistant_daemon_request_seconds', method=request['method']):
+                result = method(*request.get('args', []), **request.get('kwargs', {}))
+            return {'id': request_id, 'result': result}
+        except Exception as e:
+            logger.error("Daemon call %s failed: %s", request.get('method'), e)
+            return {'id': request_id, 'error': {'type': type(e).__name__, 'message': str(e)}}
+
+    def server_close(self) -> None:
+        super().server_close()
+        # Wake workers blocked reading from idle clients so the pool can drain
+        with self._connections_lock:
+            for request in self._connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.executor.shutdown(wait=True)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def _alive(path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+def serve(workers: int = DEFAULT_WORKERS) -> None:
+    """
+    Run the daemon for the current DATA_DIR in the foreground until interrupted.
+
+    The reminder scheduler runs inside the daemon, so reminders added
+    through it are scheduled without signalling another process.
+
+    Args:
+        workers (int): Size of the worker pool.
+    """
+    utils.ensure_data_dir()
+    server = AssistantDaemon(utils.DATA_DIR, workers)
+    scheduler = utils.start_scheduler()
+    if hasattr(signal, 'SIGTERM'):
+        # shutdown() waits for serve_forever, so it can't run on this (the serving) thread
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info("Daemon listening on %s with %d workers", server.path, workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        server.server_close()
+        utils.close_storage()
+
+class DaemonClient:
+    """
+    Connection to a running daemon.
+
+    Args:
+        path (str): Socket path, from ``utils.daemon_socket_path``.
+        timeout (Optional[float]): Seconds to wait for each reply.
+
+    Raises:
+        DaemonUnavailable: If the daemon cannot be reached.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = DEFAULT_CLIENT_TIMEOUT):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(path)
+        except OSError as e:
+            self._sock.close()
+            raise DaemonUnavailable(f"Cannot connect to {path}: {e}") from e
+        self._file = self._sock.makefile('rwb')
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call a daemon method and wait for its result.
+
+        Args:
+            method (str): Method name, e.g. 'add_note'.
+            *args, **kwargs: Arguments for the method; must be JSON-serializable.
+
+        Returns:
+            Any: The method's result, as decoded from JSON.
+
+        Raises:
+            ValueError, KeyError, TypeError: Re-raised from the daemon.
+            DaemonError: For other failures or a lost connection.
+        """
+        with self._lock:
+            self._next_id += 1
+            request = {'id': self._next_id, 'method': method, 'args': list(args), 'kwargs': kwargs}
+            try:
+                self._file.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+                self._file.flush()
+                line = self._file.readline()
+            except OSError as e:
+                raise DaemonError(f"Lost connection to daemon: {e}") from e
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            error = response['error']
+            raise PASSTHROUGH_ERRORS.get(error['type'], DaemonError)(error['message'])
+        return response['result']
+
+    def stream(self, method: str, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """
+        Call a streaming daemon method, yielding its chunks as they arrive.
+
+        Args:
+            method (str): Method name, e.g. 'stream_answer'.
+            *args, **kwargs: Arguments for the method; must be JSON-serializable.
+
+        Yields:
+            Any: Chunks, as decoded from JSON.
+
+        Raises:
+            ValueError, KeyError, TypeError: Re-raised from the daemon.
+            DaemonError: For other failures or a lost connection.
+        """
+        with self._lock:
+            self._next_id += 1
+            request = {'id': self._next_id, 'method': method, 'args': list(args), 'kwargs': kwargs}
+            try:
+                self._file.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+                self._file.flush()
+                while True:
+                    line = self._file.readline()
+                    if not line:
+                        raise DaemonError("Daemon closed the connection")
+                    response = json.loads(line)
+                    if 'chunk' not in response:
+                        break
+                    yield response['chunk']
+            except OSError as e:
+                raise DaemonError(f"Lost connection to daemon: {e}") from e
+        if 'error' in response:
+            error = response['error']
+            raise PASSTHROUGH_ERRORS.get(error['type'], DaemonError)(error['message'])
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,101 @@
+import os
+import threading
+from typing import Any, Dict, Union
+
+# Advisory locks need fcntl (POSIX); elsewhere locking only covers threads of this process.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FSYNC_ENV = 'ASSISTANT_FSYNC'
+
+def fsync_enabled() -> bool:
+    """Whether writes are flushed to disk; set ASSISTANT_FSYNC=0 to trade durability for speed."""
+    return os.getenv(FSYNC_ENV, '1').lower() not in ('0', 'false', 'off', 'no')
+
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+
+class FileLock:
+    """
+    Advisory lock on ``<path>.lock``, shared between processes.
+
+    Each acquisition opens its own descriptor, so threads of one process
+    exclude each other the same way separate processes do. Shared locks
+    admit any number of readers while excluding writers.
+
+    Args:
+        path (str): The file being protected; the lock file sits next to it.
+        shared (bool): Take a shared (read) lock instead of an exclusive one.
+    """
+
+    def __init__(self, path: str, shared: bool = False):
+        self.path = f"{path}.lock"
+        self.shared = shared
+        self._fd = None
+
+    def __enter__(self) -> 'FileLock':
+        if fcntl is None:
+            with _thread_locks_guard:
+                lock = _thread_locks.setdefault(os.path.abspath(self.path), threading.RLock())
+            lock.acquire()
+            self._fd = lock
+            return self
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if fcntl is None:
+            self._fd.release()
+        else:
+            # Closing the descriptor releases the lock
+            os.close(self._fd)
+        self._fd = None
+
+def fsync_dir(path: str) -> None:
+    """Flush a directory entry change (create, rename) to disk, where the platform allows it."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """
+    Replace a file's contents so readers see either the old or the new version.
+
+    The data goes to a temporary file in the same directory, which is flushed
+    and then renamed over the target. A crash leaves at worst a stray
+    temporary file, never a truncated target.
+
+    Args:
+        path (str): File to replace.
+        data (Union[str, bytes]): New contents; text is written as UTF-8.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    durable = fsync_enabled()
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if durable:
+        fsync_dir(os.path.dirname(path))
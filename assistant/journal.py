@@ -0,0 +1,357 @@
+import json
+import os
+import glob
+import time
+import struct
+import threading
+import logging
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from assistant.fileio import FileLock, atomic_write, fsync_enabled
+
+logger = logging.getLogger(__name__)
+
+# Journal files above this size are folded into the snapshot automatically,
+# as long as they have also outgrown the snapshot itself.
+AUTO_COMPACT_BYTES = 4 * 1024 * 1024
+
+# Seconds a commit leader waits for more writers to join its batch. Batches
+# also form without waiting: writers that arrive during an fsync share the next one.
+GROUP_COMMIT_WINDOW = 0.0
+
+# (inode, offset) of the journal bytes already fsynced, shared by every process
+_SYNCED = struct.Struct('<QQ')
+
+class GroupCommit:
+    """
+    Append lines to a file with one write and one fsync per batch of writers.
+
+    Within a process, the first writer to arrive becomes the leader: it takes
+    every line queued so far and appends them under the file's lock with one
+    write, while writers arriving meanwhile queue up for the next batch.
+
+    Across processes, fsyncs are shared through ``<path>.synced``, which
+    records how far the file is known to be durable. After appending, a
+    leader takes ``<path>.sync.lock``. If another process's fsync already
+    covered its bytes it returns at once; otherwise it fsyncs everything
+    appended so far, covering the writers queued behind it. Each ``append``
+    returns only after its line is durable.
+
+    Args:
+        path (str): File to append to.
+        window (float): Seconds the leader waits for more writers before writing.
+    """
+
+    def __init__(self, path: str, window: float = GROUP_COMMIT_WINDOW):
+        self.path = path
+        self.synced_path = f"{path}.synced"
+        self.window = window
+        self.batches = 0
+        self.fsyncs = 0
+        self._cond = threading.Condition()
+        self._pending: List[str] = []
+        self._open_batch = 1
+        self._committed = 0
+        self._writing = False
+        self._failed: Optional[tuple] = None
+
+    def append(self, line: str) -> None:
+        """
+        Append one line, returning once it has been written (and fsynced).
+
+        Args:
+            line (str): Text ending in a newline.
+        """
+        with self._cond:
+            self._pending.append(line)
+            batch = self._open_batch
+            while self._writing and self._committed < batch:
+                self._cond.wait()
+            if self._committed >= batch:
+                self._raise_if_failed(batch)
+                return
+            self._writing = True
+        error = None
+        try:
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                lines, self._pending = self._pending, []
+                batch = self._open_batch
+                self._open_batch += 1
+            self._write(''.join(lines))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._cond:
+                self._committed = batch
+                self._writing = False
+                self.batches += 1
+                if error is not None:
+                    self._failed = (batch, error)
+                self._cond.notify_all()
+
+    def _raise_if_failed(self, batch: int) -> None:
+        if self._failed is not None and self._failed[0] == batch:
+            raise self._failed[1]
+
+    def _write(self, data: str) -> None:
+        f, end = self._append(data)
+        try:
+            if fsync_enabled():
+                self._sync(f, end)
+        finally:
+            f.close()
+
+    def _append(self, data: str) -> Tuple[IO[bytes], int]:
+        """Append under the file's lock, returning the still-open file and the offset written up to."""
+        with FileLock(self.path):
+            f = open(self.path, 'ab')
+            try:
+                f.write(data.encode('utf-8'))
+                f.flush()
+                return f, f.tell()
+            except BaseException:
+                f.close()
+                raise
+
+    def _sync(self, f: IO[bytes], end: int) -> None:
+        """Make the file durable up to ``end``, unless another process's fsync already has."""
+        if not hasattr(os, 'pread'):
+            os.fsync(f.fileno())
+            self.fsyncs += 1
+            return
+        inode = os.fstat(f.fileno()).st_ino
+        with FileLock(f"{self.path}.sync"):
+            fd = os.open(self.synced_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                record = os.pread(fd, _SYNCED.size, 0)
+                if len(record) == _SYNCED.size:
+                    synced_inode, synced_end = _SYNCED.unpack(record)
+                    if synced_inode == inode and synced_end >= end:
+                        return
+                # Everything appended before the fsync starts is covered by it
+                size = os.fstat(f.fileno()).st_size
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+                # A file that was rotated away no longer gets new appends to cover
+                if _inode(self.path) == inode:
+                    os.pwrite(fd, _SYNCED.pack(inode, size), 0)
+            finally:
+                os.close(fd)
+
+    def reset(self) -> None:
+        """Forget how far the file was synced, after it was moved aside (its inode may be reused)."""
+        with FileLock(f"{self.path}.sync"):
+            try:
+                os.remove(self.synced_path)
+            except FileNotFoundError:
+                pass
+
+def _inode(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+_committers: Dict[str, GroupCommit] = {}
+_committers_guard = threading.Lock()
+
+def _committer_for(path: str) -> GroupCommit:
+    with _committers_guard:
+        key = os.path.abspath(path)
+        committer = _committers.get(key)
+        if committer is None:
+            committer = _committers[key] = GroupCommit(path)
+        return committer
+
+class NoteJournal:
+    """
+    Append-only journal of notes stored next to the ``notes.json`` snapshot.
+
+    Every ``append`` writes one JSON line to ``notes.journal``; old data is
+    never rewritten. ``compact`` folds the journal into the snapshot. The
+    journal is first renamed to ``notes.journal.<ns>`` so that new appends
+    go to a fresh file, and the snapshot records the names of the files it
+    merged under ``compacted``. A compaction interrupted after the snapshot
+    was written is therefore never replayed twice.
+    """
+
+    def __init__(self, data_dir: str, snapshot: str = 'notes.json', journal: str = 'notes.journal'):
+        self.data_dir = data_dir
+        self.snapshot_path = os.path.join(data_dir, snapshot)
+        self.journal_path = os.path.join(data_dir, journal)
+        self._committer = _committer_for(self.journal_path)
+
+    def append(self, note: str) -> None:
+        """
+        Append a single note record to the journal.
+
+        Args:
+            note (str): The note to append.
+        """
+        self.extend([note])
+
+    def extend(self, notes: Iterable[str]) -> None:
+        """
+        Append several note records with a single write.
+
+        Args:
+            notes (Iterable[str]): The notes to append, in order.
+        """
+        lines = ''.join(json.dumps({'op': 'add', 'note': note}, ensure_ascii=False) + '\n' for note in notes)
+        if lines:
+            self._committer.append(lines)
+
+    def lock(self, shared: bool = False) -> FileLock:
+        """
+        Lock the journal against compaction (shared) or all other access (exclusive).
+
+        Args:
+            shared (bool): Take a shared lock, e.g. to read a consistent snapshot and journal.
+
+        Returns:
+            FileLock: A context manager holding the lock.
+        """
+        return FileLock(self.journal_path, shared=shared)
+
+    def _rotated(self) -> List[str]:
+        """Journal files set aside by a compaction, oldest first."""
+        paths = glob.glob(glob.escape(self.journal_path) + '.*')
+        return sorted((p for p in paths if p.rsplit('.', 1)[-1].isdigit()),
+                      key=lambda p: int(p.rsplit('.', 1)[-1]))
+
+    def _read_records(self, path: str) -> Iterator[str]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from self._parse_records(f, path)
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _parse_records(f: IO[str], path: str) -> Iterator[str]:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line is what an interrupted append leaves behind.
+                logger.warning("Skipping unreadable journal record %s:%d", path, lineno)
+                continue
+            if record.get('op') == 'add':
+                yield record['note']
+
+    def replay(self, compacted: Iterable[str] = ()) -> Iterator[str]:
+        """
+        Yield the notes recorded in the journal, in insertion order.
+
+        Args:
+            compacted (Iterable[str]): Journal file names already merged into the snapshot.
+
+        Yields:
+            str: Each journaled note.
+        """
+        skip = set(compacted)
+        for path in self._rotated() + [self.journal_path]:
+            if os.path.basename(path) not in skip:
+                yield from self._read_records(path)
+
+    def open_replay(self, compacted: Iterable[str] = ()) -> Iterator[str]:
+        """
+        Like ``replay``, but open the journal files before returning.
+
+        Call this under a shared ``lock`` and iterate after releasing it: the
+        open files keep their contents even if a compaction then renames or
+        removes them, so a slow reader neither blocks writers nor sees
+        records twice.
+
+        Args:
+            compacted (Iterable[str]): Journal file names already merged into the snapshot.
+
+        Returns:
+            Iterator[str]: Each journaled note, in insertion order.
+        """
+        skip = set(compacted)
+        files = []
+        for path in self._rotated() + [self.journal_path]:
+            if os.path.basename(path) in skip:
+                continue
+            try:
+                files.append((path, open(path, 'r', encoding='utf-8')))
+            except FileNotFoundError:
+                continue
+        return self._replay_files(files)
+
+    def _replay_files(self, files: List[Tuple[str, IO[str]]]) -> Iterator[str]:
+        try:
+            for path, f in files:
+                yield from self._parse_records(f, path)
+        finally:
+            for _, f in files:
+                f.close()
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def needs_compaction(self, threshold: int = AUTO_COMPACT_BYTES) -> bool:
+        """
+        Check whether the journal has grown enough to be worth compacting.
+
+        Args:
+            threshold (int): Minimum journal size in bytes.
+
+        Returns:
+            bool: True if the journal exceeds both the threshold and the snapshot size.
+        """
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except OSError:
+            return False
+        try:
+            snapshot_size = os.path.getsize(self.snapshot_path)
+        except OSError:
+            snapshot_size = 0
+        return journal_size > max(threshold, snapshot_size)
+
+    def compact(self) -> int:
+        """
+        Fold all journal records into the snapshot and remove merged journal files.
+
+        Returns:
+            int: Number of journal records merged.
+        """
+        with self.lock():
+            snapshot = self._read_snapshot()
+            # Finish cleaning up after a compaction that crashed before deleting its inputs.
+            for name in snapshot.get('compacted', []):
+                try:
+                    os.remove(os.path.join(self.data_dir, name))
+                except FileNotFoundError:
+                    pass
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, f"{self.journal_path}.{time.time_ns()}")
+                self._committer.reset()
+            rotated = self._rotated()
+            if not rotated:
+                return 0
+
+            notes = snapshot.get('notes', [])
+            merged = 0
+            for path in rotated:
+                for note in self._read_records(path):
+                    notes.append(note)
+                    merged += 1
+            snapshot['notes'] = notes
+            snapshot['compacted'] = [os.path.basename(p) for p in rotated]
+
+            atomic_write(self.snapshot_path, json.dumps(snapshot, indent=4, ensure_ascii=False))
+            for path in rotated:
+                os.remove(path)
+            logger.info("Compacted %d journaled notes into %s", merged, self.snapshot_path)
+            return merged
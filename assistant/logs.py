@@ -0,0 +1,163 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, List, Optional
+
+# Logging is configured by the command-line entry points only; importing the
+# library leaves the host application's logging alone.
+LEVEL_ENV = 'ASSISTANT_LOG_LEVEL'
+LEVELS_ENV = 'ASSISTANT_LOG_LEVELS'
+SAMPLE_ENV = 'ASSISTANT_LOG_SAMPLE'
+SAMPLED_ENV = 'ASSISTANT_LOG_SAMPLED'
+FILE_ENV = 'ASSISTANT_LOG_FILE'
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DEFAULT_LEVEL = 'INFO'
+# Repeats of one sampled message that are let through: the first, then one in this many
+DEFAULT_SAMPLE = 100
+
+# Pass as ``extra=SAMPLED`` on high-frequency messages, e.g. one per file read
+SAMPLED = {'sampled': True}
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only one in ``every`` repeats of each high-frequency message.
+
+    Only records logged with ``extra=SAMPLED``, or from one of ``loggers``
+    (or their children), are sampled; everything else passes. Records are
+    grouped by logger and unformatted message, so "Data saved to %s" counts
+    as one event whatever the path. The first record of a group always
+    passes. Warnings and above are never sampled.
+
+    Args:
+        every (int): Keep one record in this many; 1 keeps all.
+        loggers (Iterable[str]): Loggers whose every INFO/DEBUG message is sampled.
+        max_level (int): Highest level that is sampled.
+    """
+
+    def __init__(self, every: int = DEFAULT_SAMPLE, loggers: Iterable[str] = (), max_level: int = logging.INFO):
+        super().__init__()
+        self.every = max(1, every)
+        self.loggers = tuple(loggers)
+        self.max_level = max_level
+        self._seen: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def _sampled(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'sampled', False):
+            return True
+        return any(record.name == name or record.name.startswith(name + '.') for name in self.loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > self.max_level or not self._sampled(record):
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._seen.get(key, 0)
+            self._seen[key] = count + 1
+        return count % self.every == 0
+
+class _LazyQueueHandler(QueueHandler):
+    """Hands records to the listener unformatted, so the caller's thread only enqueues."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """
+    Parse per-logger levels, e.g. ``'assistant.router=DEBUG,assistant.journal=WARNING'``.
+
+    Raises:
+        ValueError: For an entry without '=' or an unknown level name.
+    """
+    levels = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        name, sep, level = entry.partition('=')
+        if not sep:
+            raise ValueError(f"Expected LOGGER=LEVEL, got {entry!r}")
+        levels[name.strip()] = _level(level)
+    return levels
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {name}")
+    return level
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+_configured_levels: Dict[str, int] = {}
+_lock = threading.Lock()
+
+def configure_logging(level: Optional[str] = None, levels: Optional[Dict[str, int]] = None,
+                      sample: Optional[int] = None, filename: Optional[str] = None,
+                      sampled: Optional[List[str]] = None) -> None:
+    """
+    Route log records through a queue to a background thread that formats and writes them.
+
+    Callers only put records on a queue; formatting and I/O happen on the
+    listener thread, so logging never waits on the terminal or disk.
+    Calling it again replaces the previous configuration. Unset arguments
+    come from ASSISTANT_LOG_LEVEL, ASSISTANT_LOG_LEVELS, ASSISTANT_LOG_SAMPLE,
+    ASSISTANT_LOG_FILE and ASSISTANT_LOG_SAMPLED.
+
+    Args:
+        level (Optional[str]): Root level name, e.g. 'WARNING'.
+        levels (Optional[Dict[str, int]]): Levels for individual loggers, e.g. {'assistant.router': logging.DEBUG}.
+        sample (Optional[int]): Keep one in this many repeats of each sampled message.
+        filename (Optional[str]): Append to this file instead of writing to stderr.
+        sampled (Optional[List[str]]): Loggers to sample in full, besides messages marked ``extra=SAMPLED``.
+    """
+    global _listener, _handler
+    level = level or os.getenv(LEVEL_ENV, DEFAULT_LEVEL)
+    if levels is None:
+        levels = parse_levels(os.getenv(LEVELS_ENV, ''))
+    if sample is None:
+        sample = int(os.getenv(SAMPLE_ENV, DEFAULT_SAMPLE))
+    filename = filename or os.getenv(FILE_ENV)
+    if sampled is None:
+        sampled = [name.strip() for name in os.getenv(SAMPLED_ENV, '').split(',') if name.strip()]
+
+    output = logging.FileHandler(filename, encoding='utf-8') if filename else logging.StreamHandler(sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _LazyQueueHandler(records)
+    handler.addFilter(SamplingFilter(sample, sampled))
+    listener = QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    with _lock:
+        _shutdown()
+        root.setLevel(_level(level))
+        for name in set(_configured_levels) - set(levels):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        for name, logger_level in levels.items():
+            logging.getLogger(name).setLevel(logger_level)
+        _configured_levels.clear()
+        _configured_levels.update(levels)
+        root.addHandler(handler)
+        listener.start()
+        _handler, _listener = handler, listener
+
+def _shutdown() -> None:
+    """Detach the queue handler and drain the listener. Needs _lock."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def shutdown_logging() -> None:
+    """Write out queued records and remove the handler installed by configure_logging."""
+    with _lock:
+        _shutdown()
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import bisect
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Set ASSISTANT_METRICS=1 to record from startup (e.g. in the daemon); the CLI's --profile enables it per command.
+METRICS_ENV = 'ASSISTANT_METRICS'
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_enabled = os.getenv(METRICS_ENV, '').lower() in ('1', 'true', 'on', 'yes')
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], 'Histogram'] = {}
+
+class Histogram:
+    """
+    Counts of observed values per bucket, plus their count and sum.
+
+    Args:
+        buckets (Tuple[float, ...]): Sorted bucket upper bounds; +Inf is implied.
+    """
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+def enabled() -> bool:
+    """Whether metrics are being recorded."""
+    return _enabled
+
+def enable(on: bool = True) -> None:
+    """Start (or stop) recording metrics."""
+    global _enabled
+    _enabled = on
+
+def reset() -> None:
+    """Discard everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name: str, amount: float = 1.0, **labels: Any) -> None:
+    """
+    Add to a counter.
+
+    Args:
+        name (str): Metric name, e.g. 'assistant_provider_errors_total'.
+        amount (float): Amount to add.
+        **labels: Label values, e.g. provider='openai'.
+    """
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + amount
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """
+    Record a value, usually a duration in seconds, in a histogram.
+
+    Args:
+        name (str): Metric name, e.g. 'assistant_save_data_seconds'.
+        value (float): The observed value.
+        **labels: Label values.
+    """
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name: str, labels: Dict[str, Any]):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name: str, **labels: Any) -> Any:
+    """
+    Context manager recording the duration of its block in a histogram.
+
+    When metrics are disabled this returns a shared no-op object, so a timed
+    block costs one function call.
+
+    Args:
+        name (str): Metric name.
+        **labels: Label values.
+    """
+    return _Timer(name, labels) if _enabled else _NULL_TIMER
+
+def timed(name: str, **labels: Any) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording each call's duration in a histogram.
+
+    Args:
+        name (str): Metric name.
+        **labels: Label values.
+    """
+    def decorate(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+    return decorate
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Copy out everything recorded.
+
+    Returns:
+        Dict[str, Any]: ``counters`` as name/labels/value records and
+        ``histograms`` as name/labels/count/sum/buckets records, where
+        ``buckets`` maps each upper bound to its (non-cumulative) count.
+    """
+    with _lock:
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(_counters.items())]
+        histograms = [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                       'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], h.counts))}
+                      for (name, labels), h in sorted(_histograms.items())]
+    return {'counters': counters, 'histograms': histograms}
+
+def to_json() -> str:
+    """Export everything recorded as JSON."""
+    return json.dumps(snapshot(), indent=2)
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+def to_prometheus() -> str:
+    """
+    Export everything recorded in the Prometheus text exposition format.
+
+    Returns:
+        str: Counters and histograms (with cumulative ``_bucket`` series).
+    """
+    data = snapshot()
+    lines = []
+    typed = set()
+    for counter in data['counters']:
+        if counter['name'] not in typed:
+            lines.append(f"# TYPE {counter['name']} counter")
+            typed.add(counter['name'])
+        lines.append(f"{counter['name']}{_format_labels(counter['labels'])} {counter['value']:g}")
+    for histogram in data['histograms']:
+        name = histogram['name']
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in histogram['buckets'].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(histogram['labels'], ('le', bound))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(histogram['labels'])} {histogram['sum']:g}")
+        lines.append(f"{name}_count{_format_labels(histogram['labels'])} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,233 @@
+import os
+import json
+import mmap
+import struct
+import threading
+import logging
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from assistant.fileio import FileLock, atomic_write, fsync_enabled
+
+logger = logging.getLogger(__name__)
+
+# Each record is its UTF-8 length followed by the bytes; the index holds one offset per record.
+RECORD_HEADER = struct.Struct('<I')
+INDEX_ENTRY = struct.Struct('<Q')
+
+# Records decoded per batch while iterating
+READ_BATCH = 1024
+
+class _Mapping:
+    """Read-only maps of the data and index files, covering ``count`` records."""
+
+    __slots__ = ('data', 'index', 'count')
+
+    def __init__(self, data: Any, index: Any, count: int):
+        self.data = data
+        self.index = index
+        self.count = count
+
+    def read(self, position: int) -> str:
+        """Decode the record at a 0-based position straight out of the map."""
+        start = INDEX_ENTRY.unpack_from(self.index, position * INDEX_ENTRY.size)[0]
+        length = RECORD_HEADER.unpack_from(self.data, start)[0]
+        start += RECORD_HEADER.size
+        return str(memoryview(self.data)[start:start + length], 'utf-8')
+
+    def read_many(self, first: int, count: int) -> List[str]:
+        """
+        Decode ``count`` consecutive records from a 0-based position.
+
+        Each record ends where the next begins, so one unpack of the index
+        gives every boundary; only the store's last record needs its header.
+        """
+        bounds = list(struct.unpack_from(f'<{count}Q', self.index, first * INDEX_ENTRY.size))
+        if first + count < self.count:
+            bounds.append(INDEX_ENTRY.unpack_from(self.index, (first + count) * INDEX_ENTRY.size)[0])
+        else:
+            last = bounds[-1]
+            bounds.append(last + RECORD_HEADER.size + RECORD_HEADER.unpack_from(self.data, last)[0])
+        data = self.data
+        skip = RECORD_HEADER.size
+        return [data[start + skip:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])]
+
+_EMPTY = _Mapping(b'', b'', 0)
+
+def _map(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class NoteFile:
+    """
+    Notes as length-prefixed UTF-8 records in ``notes.bin``, with a fixed-width
+    offset index in ``notes.idx``.
+
+    Both files are read through ``mmap``, so opening a store reads nothing,
+    counting notes is a ``stat`` of the index, and fetching note N is two
+    lookups in the maps. Appends write the records first and their index
+    entries second: a note exists once its index entry does, and bytes past
+    the last indexed record (left by an interrupted append) are overwritten
+    by the next one.
+
+    Args:
+        data_dir (str): Directory holding the files.
+        data (str): Record file name.
+        index (str): Index file name.
+    """
+
+    def __init__(self, data_dir: str, data: str = 'notes.bin', index: str = 'notes.idx'):
+        self.data_path = os.path.join(data_dir, data)
+        self.index_path = os.path.join(data_dir, index)
+        self._lock = threading.Lock()
+        self._mapping = _EMPTY
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    def _current(self) -> _Mapping:
+        """Maps covering every record written so far, remapped only when the files have grown."""
+        count = len(self)
+        with self._lock:
+            if count != self._mapping.count:
+                # Readers holding the old maps keep using them; they close once released.
+                self._mapping = _Mapping(_map(self.data_path), _map(self.index_path), count) if count else _EMPTY
+            return self._mapping
+
+    def get(self, number: int) -> str:
+        """
+        Read one note.
+
+        Args:
+            number (int): The note's number, from 1.
+
+        Returns:
+            str: The note.
+
+        Raises:
+            IndexError: If there is no such note.
+        """
+        mapping = self._current()
+        if not 1 <= number <= mapping.count:
+            raise IndexError(f"No note {number}")
+        return mapping.read(number - 1)
+
+    def iter_notes(self, offset: int = 0, limit: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (number, note) pairs, reading each record only when it is reached.
+
+        Args:
+            offset (int): Notes to skip from the start (or from the end, with ``reverse``).
+            limit (Optional[int]): Maximum number of notes; None for all.
+            reverse (bool): Newest first.
+
+        Yields:
+            Tuple[int, str]: Notes numbered from 1 in insertion order.
+        """
+        mapping = self._current()
+        remaining = max(mapping.count - offset, 0)
+        if limit is not None:
+            remaining = min(remaining, limit)
+        # 0-based positions [low, high) of the notes to yield
+        low, high = (mapping.count - offset - remaining, mapping.count - offset) if reverse else (offset, offset + remaining)
+        starts = range(low, high, READ_BATCH)
+        for start in (reversed(starts) if reverse else starts):
+            count = min(READ_BATCH, high - start)
+            notes = mapping.read_many(start, count)
+            numbered = zip(range(start + 1, start + count + 1), notes)
+            yield from (reversed(list(numbered)) if reverse else numbered)
+
+    def _end(self, count: int) -> int:
+        """Byte offset just past the last indexed record."""
+        if not count:
+            return 0
+        with open(self.index_path, 'rb') as f:
+            f.seek((count - 1) * INDEX_ENTRY.size)
+            start = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+        with open(self.data_path, 'rb') as f:
+            f.seek(start)
+            return start + RECORD_HEADER.size + RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))[0]
+
+    def extend(self, notes: Iterable[str]) -> int:
+        """
+        Append notes with one write (and fsync) per file.
+
+        Args:
+            notes (Iterable[str]): Notes in insertion order.
+
+        Returns:
+            int: Number of notes appended.
+        """
+        with FileLock(self.data_path):
+            count = len(self)
+            end = self._end(count)
+            records, offsets = bytearray(), bytearray()
+            for note in notes:
+                body = note.encode('utf-8')
+                offsets += INDEX_ENTRY.pack(end + len(records))
+                records += RECORD_HEADER.pack(len(body)) + body
+            if not offsets:
+                return 0
+            durable = fsync_enabled()
+            for path, position, data in ((self.data_path, end, records),
+                                         (self.index_path, count * INDEX_ENTRY.size, offsets)):
+                with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                    f.seek(position)
+                    f.write(data)
+                    f.truncate()
+                    if durable:
+                        f.flush()
+                        os.fsync(f.fileno())
+        return len(offsets) // INDEX_ENTRY.size
+
+    def append(self, note: str) -> None:
+        """
+        Append one note.
+
+        Args:
+            note (str): The note.
+        """
+        self.extend([note])
+
+    def close(self) -> None:
+        """Drop the maps; they are recreated on the next read."""
+        with self._lock:
+            self._mapping = _EMPTY
+
+def json_to_binary(json_path: str, notes: NoteFile) -> int:
+    """
+    Append the notes of a ``notes.json`` snapshot to a binary note file.
+
+    Args:
+        json_path (str): The JSON document, ``{"notes": [...]}``.
+        notes (NoteFile): File to append to.
+
+    Returns:
+        int: Number of notes converted.
+    """
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        return 0
+    converted = notes.extend(document.get('notes', []))
+    logger.info("Converted %d notes from %s to %s", converted, json_path, notes.data_path)
+    return converted
+
+def binary_to_json(notes: NoteFile, json_path: str) -> int:
+    """
+    Write every note of a binary note file as a ``notes.json`` snapshot, replacing it.
+
+    Args:
+        notes (NoteFile): File to read.
+        json_path (str): The JSON document to write.
+
+    Returns:
+        int: Number of notes converted.
+    """
+    bodies = [note for _, note in notes.iter_notes()]
+    atomic_write(json_path, json.dumps({'notes': bodies}, indent=4, ensure_ascii=False))
+    logger.info("Converted %d notes from %s to %s", len(bodies), notes.data_path, json_path)
+    return len(bodies)
@@ -0,0 +1,329 @@
+import os
+import re
+import sys
+import time
+import bisect
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from assistant.fileio import FileLock, fsync_enabled
+
+TAG_RE = re.compile(r'^[\w-]+$', re.UNICODE)
+
+# Timestamp of notes saved before metadata existed, which sorts before any real one
+UNKNOWN_TIME = 0.0
+
+def normalize_tag(tag: str) -> str:
+    """
+    Lowercase a tag and check it is a single word (letters, digits, '_' or '-').
+
+    Raises:
+        ValueError: If the tag is empty or has other characters.
+    """
+    normalized = tag.strip().lower()
+    if not TAG_RE.match(normalized):
+        raise ValueError(f"Invalid tag: {tag!r} (use letters, digits, '_' or '-')")
+    return normalized
+
+def _bitmap(ids: Iterable[int]) -> int:
+    """Build a bitmap (bit n set for note n) in one pass rather than one big-int OR per id."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for note_id in ids:
+        bits[note_id >> 3] |= 1 << (note_id & 7)
+    return int.from_bytes(bits, 'little')
+
+def iter_bits(bitmap: int, reverse: bool = False) -> Iterator[int]:
+    """
+    Yield the set bit positions of a bitmap, i.e. the note ids it holds.
+
+    The bitmap is scanned a 64-bit word at a time, skipping empty words.
+
+    Args:
+        bitmap (int): The bitmap.
+        reverse (bool): Highest ids first.
+    """
+    if not bitmap:
+        return
+    size = (bitmap.bit_length() + 63) // 64
+    words = memoryview(bitmap.to_bytes(size * 8, 'little')).cast('Q')
+    if sys.byteorder == 'big':
+        words = array('Q', words)
+        words.byteswap()
+    positions = range(size - 1, -1, -1) if reverse else range(size)
+    for position in positions:
+        word = words[position]
+        if not word:
+            continue
+        base = position * 64
+        if reverse:
+            while word:
+                high = word.bit_length() - 1
+                yield base + high
+                word ^= 1 << high
+        else:
+            while word:
+                low = word & -word
+                yield base + low.bit_length() - 1
+                word ^= low
+
+class NoteMetadata:
+    """
+    When each note was added and how it is tagged, stored column by column.
+
+    Creation times are one ``array('d')`` indexed by note number, kept
+    non-decreasing so a date cut-off is a binary search. Each tag has a
+    bitmap of the notes carrying it, so filtering by several tags is an
+    intersection of bitmaps instead of a scan over every note.
+
+    On disk the times are a raw array in ``<prefix>.created`` and tags an
+    append-only log of ``id<TAB>tag tag`` lines in ``<prefix>.tags``. Both
+    only grow, and other processes' appends are picked up on the next read.
+
+    Args:
+        prefix (str): Path prefix of the two files.
+    """
+
+    def __init__(self, prefix: str):
+        self.created_path = f"{prefix}.created"
+        self.tags_path = f"{prefix}.tags"
+        self._lock = threading.RLock()
+        self._created = array('d')
+        self._tags: Dict[str, int] = {}
+        self._tags_read = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._created)
+
+    def _refresh(self) -> None:
+        """Read whatever other writers appended since the last read. Needs _lock."""
+        try:
+            size = os.path.getsize(self.created_path)
+        except FileNotFoundError:
+            size = 0
+        known = len(self._created) * self._created.itemsize
+        if size > known:
+            added = array('d')
+            with open(self.created_path, 'rb') as f:
+                f.seek(known)
+                added.frombytes(f.read((size - known) // added.itemsize * added.itemsize))
+            if sys.byteorder == 'big':
+                added.byteswap()
+            self._created.extend(added)
+        try:
+            size = os.path.getsize(self.tags_path)
+        except FileNotFoundError:
+            size = 0
+        if size > self._tags_read:
+            with open(self.tags_path, 'rb') as f:
+                f.seek(self._tags_read)
+                data = f.read(size - self._tags_read)
+            # Only whole lines; a partial one is read once its writer finishes it
+            data = data[:data.rfind(b'\n') + 1]
+            self._tags_read += len(data)
+            postings: Dict[str, List[int]] = {}
+            for line in data.decode('utf-8').splitlines():
+                note_id, _, tags = line.partition('\t')
+                for tag in tags.split():
+                    postings.setdefault(tag, []).append(int(note_id))
+            for tag, ids in postings.items():
+                self._tags[tag] = self._tags.get(tag, 0) | _bitmap(ids)
+
+    def add(self, ids: Sequence[int], tags: Iterable[str] = (), created: Optional[float] = None) -> None:
+        """
+        Record newly added notes.
+
+        Notes missing before ``ids`` (added by something that bypassed the
+        metadata, or saved before it existed) are filled in untagged, with the
+        previous note's time.
+
+        Args:
+            ids (Sequence[int]): Consecutive ids of the new notes.
+            tags (Iterable[str]): Tags for every one of them.
+            created (Optional[float]): Unix time they were added; now if None.
+        """
+        tags = list(tags)
+        self.add_many(ids, [tags] * len(ids), [created] * len(ids))
+
+    def add_many(self, ids: Sequence[int], tags: Sequence[Iterable[str]],
+                 created: Sequence[Optional[float]]) -> None:
+        """
+        Record newly added notes, each with its own tags and time, e.g. from an import.
+
+        Times earlier than the last note's are raised to it, so they never decrease.
+
+        Args:
+            ids (Sequence[int]): Consecutive ids of the new notes.
+            tags (Sequence[Iterable[str]]): Tags of each note.
+            created (Sequence[Optional[float]]): Unix time each was added; now where None.
+        """
+        tags = [sorted({normalize_tag(tag) for tag in note_tags}) for note_tags in tags]
+        if not ids:
+            return
+        now = time.time()
+        with self._lock, FileLock(self.created_path):
+            self._refresh()
+            last = self._created[-1] if self._created else UNKNOWN_TIME
+            start = len(self._created)
+            if ids[0] <= start:
+                raise ValueError(f"Note {ids[0]} already has metadata")
+            column = array('d', [last] * (ids[0] - 1 - start))
+            stamp = last
+            for value in created:
+                stamp = max(stamp, now if value is None else value)
+                column.append(stamp)
+            self._append(self.created_path, self._column_bytes(column))
+            self._created.extend(column)
+            data = ''.join(f"{note_id}\t{' '.join(note_tags)}\n"
+                           for note_id, note_tags in zip(ids, tags) if note_tags).encode('utf-8')
+            if data:
+                self._append(self.tags_path, data)
+                self._tags_read += len(data)
+                postings: Dict[str, List[int]] = {}
+                for note_id, note_tags in zip(ids, tags):
+                    for tag in note_tags:
+                        postings.setdefault(tag, []).append(note_id)
+                for tag, tag_ids in postings.items():
+                    self._tags[tag] = self._tags.get(tag, 0) | _bitmap(tag_ids)
+
+    def extend(self, other: 'NoteMetadata', count: Optional[int] = None) -> int:
+        """
+        Append another store's metadata after this one's notes, e.g. when its notes were copied here.
+
+        Args:
+            other (NoteMetadata): Metadata of the copied notes.
+            count (Optional[int]): Copy only its first ``count`` notes; all if None.
+
+        Returns:
+            int: Number of notes appended.
+        """
+        with other._lock:
+            other._refresh()
+            created = other._created[:count]
+            tags = dict(other._tags)
+        if not created:
+            return 0
+        by_id: Dict[int, List[str]] = {}
+        for tag, bits in sorted(tags.items()):
+            for note_id in iter_bits(bits):
+                if note_id <= len(created):
+                    by_id.setdefault(note_id, []).append(tag)
+        with self._lock, FileLock(self.created_path):
+            self._refresh()
+            offset = len(self._created)
+            stamp = self._created[-1] if self._created else UNKNOWN_TIME
+            column = array('d')
+            for value in created:
+                stamp = max(stamp, value)
+                column.append(stamp)
+            self._append(self.created_path, self._column_bytes(column))
+            self._created.extend(column)
+            if by_id:
+                data = ''.join(f"{note_id + offset}\t{' '.join(note_tags)}\n"
+                               for note_id, note_tags in sorted(by_id.items())).encode('utf-8')
+                self._append(self.tags_path, data)
+                self._tags_read += len(data)
+                for tag, bits in tags.items():
+                    bits &= (1 << (len(created) + 1)) - 1
+                    if bits:
+                        self._tags[tag] = self._tags.get(tag, 0) | bits << offset
+        return len(created)
+
+    def sync(self, count: int) -> None:
+        """Fill in metadata for notes up to ``count`` that have none, e.g. after an upgrade."""
+        with self._lock:
+            self._refresh()
+            if count > len(self._created):
+                self.add(range(len(self._created) + 1, count + 1), created=UNKNOWN_TIME)
+
+    @staticmethod
+    def _column_bytes(column: array) -> bytes:
+        if sys.byteorder == 'big':
+            column = array(column.typecode, column)
+            column.byteswap()
+        return column.tobytes()
+
+    @staticmethod
+    def _append(path: str, data: bytes) -> None:
+        with open(path, 'ab') as f:
+            f.write(data)
+            if fsync_enabled():
+                f.flush()
+                os.fsync(f.fileno())
+
+    def created(self, note_id: int) -> Optional[float]:
+        """Unix time a note was added, or None if unknown."""
+        with self._lock:
+            self._refresh()
+            if not 1 <= note_id <= len(self._created):
+                return None
+            stamp = self._created[note_id - 1]
+        return None if stamp == UNKNOWN_TIME else stamp
+
+    def tags_of(self, note_id: int) -> List[str]:
+        """Tags of one note, sorted."""
+        with self._lock:
+            self._refresh()
+            return sorted(tag for tag, bits in self._tags.items() if bits >> note_id & 1)
+
+    def tags_for(self, ids: Sequence[int]) -> Dict[int, List[str]]:
+        """
+        Tags of several notes at once, e.g. a page of a listing.
+
+        Each tag's bitmap is cut down to the span of ``ids`` once, rather than
+        testing every note against every full bitmap.
+
+        Returns:
+            Dict[int, List[str]]: Sorted tags of each note that has any.
+        """
+        if not ids:
+            return {}
+        wanted = set(ids)
+        low = min(wanted)
+        mask = (1 << (max(wanted) - low + 1)) - 1
+        with self._lock:
+            self._refresh()
+            tags = sorted(self._tags.items())
+        result: Dict[int, List[str]] = {}
+        for tag, bits in tags:
+            for position in iter_bits(bits >> low & mask):
+                if position + low in wanted:
+                    result.setdefault(position + low, []).append(tag)
+        return result
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Number of notes carrying each tag."""
+        with self._lock:
+            self._refresh()
+            return {tag: bin(bits).count('1') for tag, bits in sorted(self._tags.items())}
+
+    def select(self, tags: Iterable[str] = (), since: Optional[float] = None, reverse: bool = False) -> Iterator[int]:
+        """
+        Ids of the notes carrying every tag and added at or after ``since``, in order.
+
+        Args:
+            tags (Iterable[str]): Tags the notes must all have.
+            since (Optional[float]): Earliest Unix time; None for any.
+            reverse (bool): Newest first.
+
+        Returns:
+            Iterator[int]: Matching note ids.
+        """
+        tags = {normalize_tag(tag) for tag in tags}
+        with self._lock:
+            self._refresh()
+            count = len(self._created)
+            # Times never decrease, so the notes since a date are one contiguous range
+            first = bisect.bisect_left(self._created, since) + 1 if since is not None else 1
+            bits = -1
+            for tag in tags:
+                bits &= self._tags.get(tag, 0)
+        if not tags:
+            ids = range(first, count + 1)
+            return iter(reversed(ids) if reverse else ids)
+        return iter_bits(bits >> first << first, reverse)
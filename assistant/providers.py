@@ -0,0 +1,279 @@
+import os
+import time
+import random
+import importlib.util
+import threading
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from assistant import metrics
+
+logger = logging.getLogger(__name__)
+
+# Connection settings shared by all providers; override with environment variables.
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider cannot be used (missing SDK or API key)."""
+
+@lru_cache(maxsize=None)
+def module_available(name: str) -> bool:
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+class Provider:
+    """
+    A long-lived client for one online provider.
+
+    The underlying SDK client is created on first use and reused for every
+    later request, so HTTP keep-alive connections and TLS sessions survive
+    across questions. Failed requests are retried with exponential backoff.
+
+    Args:
+        api_key (str): Provider API key.
+        model (str): Model name.
+        timeout (float): Per-request timeout in seconds.
+        max_retries (int): Retries after the first failed attempt.
+        backoff (float): Base delay in seconds, doubled on every retry.
+        base_url (Optional[str]): Alternative endpoint, e.g. a local test server.
+    """
+
+    name = 'base'
+    label = 'Provider'
+
+    def __init__(self, api_key: str, model: str, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.create_client()
+        return self._client
+
+    def create_client(self) -> Any:
+        raise NotImplementedError
+
+    def request(self, question: str, params: Dict[str, Any]) -> str:
+        """Send one request without retrying."""
+        raise NotImplementedError
+
+    def request_stream(self, question: str, params: Dict[str, Any]) -> Iterator[str]:
+        """Send one streaming request without retrying. Defaults to a single chunk."""
+        yield self.request(question, params)
+
+    def _backoff(self, attempt: int, error: Exception) -> None:
+        metrics.inc('assistant_provider_retries_total', provider=self.name)
+        delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+        logger.warning("%s request failed (%s); retrying in %.2fs", self.label, error, delay)
+        time.sleep(delay)
+
+    def complete(self, question: str, params: Dict[str, Any], retries: Optional[int] = None) -> str:
+        """
+        Answer a question, retrying failures with exponential backoff.
+
+        Args:
+            question (str): The question.
+            params (Dict[str, Any]): Generation parameters (max_tokens, temperature).
+            retries (Optional[int]): Retries allowed; ``max_retries`` if None. A
+                router that fails over to other providers passes 0.
+
+        Returns:
+            str: The answer text.
+        """
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer('assistant_provider_request_seconds', provider=self.name):
+                    return self.request(question, params)
+            except Exception as e:
+                metrics.inc('assistant_provider_errors_total', provider=self.name)
+                if attempt >= retries:
+                    raise
+                self._backoff(attempt, e)
+                attempt += 1
+
+    def stream(self, question: str, params: Dict[str, Any], retries: Optional[int] = None) -> Iterator[str]:
+        """
+        Answer a question chunk by chunk as the provider generates it.
+
+        Failures before the first chunk are retried like ``complete``; once
+        text has been yielded a failure is raised to the caller.
+
+        Args:
+            question (str): The question.
+            params (Dict[str, Any]): Generation parameters (max_tokens, temperature).
+            retries (Optional[int]): Retries allowed; ``max_retries`` if None.
+
+        Yields:
+            str: Text chunks in order.
+        """
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            chunks = self.request_stream(question, params)
+            try:
+                with metrics.timer('assistant_provider_first_chunk_seconds', provider=self.name):
+                    first = next(chunks, None)
+            except Exception as e:
+                metrics.inc('assistant_provider_errors_total', provider=self.name)
+                if attempt >= retries:
+                    raise
+                self._backoff(attempt, e)
+                attempt += 1
+                continue
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+
+class OpenAIProvider(Provider):
+    name = 'openai'
+    label = 'OpenAI'
+    api_key_env = 'OPENAI_API_KEY'
+    base_url_env = 'OPENAI_BASE_URL'
+
+    def create_client(self) -> Any:
+        import openai
+        # Retries are handled by Provider.complete so both providers back off the same way.
+        return openai.OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0)
+
+    def request(self, question: str, params: Dict[str, Any]) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": question}],
+            max_tokens=params['max_tokens'],
+            temperature=params['temperature']
+        )
+        return response.choices[0].message.content.strip()
+
+    def request_stream(self, question: str, params: Dict[str, Any]) -> Iterator[str]:
+        chunks = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": question}],
+            max_tokens=params['max_tokens'],
+            temperature=params['temperature'],
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class GeminiProvider(Provider):
+    name = 'gemini'
+    label = 'Gemini'
+    api_key_env = 'GEMINI_API_KEY'
+    base_url_env = 'GEMINI_BASE_URL'
+
+    def create_client(self) -> Any:
+        import google.generativeai as genai
+        options = {'api_endpoint': self.base_url} if self.base_url else None
+        genai.configure(api_key=self.api_key, client_options=options)
+        return genai.GenerativeModel(self.model)
+
+    def request(self, question: str, params: Dict[str, Any]) -> str:
+        response = self.client.generate_content(
+            question,
+            generation_config={'max_output_tokens': params['max_tokens'], 'temperature': params['temperature']},
+            request_options={'timeout': self.timeout}
+        )
+        return response.text.strip()
+
+    def request_stream(self, question: str, params: Dict[str, Any]) -> Iterator[str]:
+        chunks = self.client.generate_content(
+            question,
+            generation_config={'max_output_tokens': params['max_tokens'], 'temperature': params['temperature']},
+            request_options={'timeout': self.timeout},
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
+
+# Provider name -> factory(model) returning a ready Provider or raising ProviderUnavailable
+PROVIDER_FACTORIES: Dict[str, Callable[[str], Provider]] = {}
+
+_providers: Dict[str, Provider] = {}
+_providers_lock = threading.Lock()
+
+def _sdk_factory(cls: type, module: str) -> Callable[[str], Provider]:
+    def factory(model: str) -> Provider:
+        if not module_available(module):
+            raise ProviderUnavailable("Online provider not available or not supported.")
+        api_key = os.getenv(cls.api_key_env)
+        if not api_key:
+            raise ProviderUnavailable(f"{cls.label} API key not set. Set {cls.api_key_env} environment variable.")
+        return cls(
+            api_key, model,
+            timeout=float(os.getenv('ASSISTANT_TIMEOUT', DEFAULT_TIMEOUT)),
+            max_retries=int(os.getenv('ASSISTANT_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+            backoff=float(os.getenv('ASSISTANT_BACKOFF', DEFAULT_BACKOFF)),
+            base_url=os.getenv(cls.base_url_env)
+        )
+    return factory
+
+PROVIDER_FACTORIES.update({
+    'openai': _sdk_factory(OpenAIProvider, 'openai'),
+    'gemini': _sdk_factory(GeminiProvider, 'google.generativeai'),
+})
+
+def register_provider(name: str, factory: Callable[[str], Provider]) -> None:
+    """
+    Register (or replace) a provider factory, e.g. a fake for tests.
+
+    Args:
+        name (str): Provider name used by get_online_answer.
+        factory (Callable[[str], Provider]): Called with the model name.
+    """
+    with _providers_lock:
+        PROVIDER_FACTORIES[name] = factory
+        _providers.pop(name, None)
+
+def get_provider(name: str, model: str) -> Provider:
+    """
+    Get the shared client for a provider, creating it on first use.
+
+    Args:
+        name (str): Provider name.
+        model (str): Model name.
+
+    Returns:
+        Provider: The process-wide provider instance.
+
+    Raises:
+        ProviderUnavailable: If the provider is unknown, not installed or not configured.
+    """
+    provider = _providers.get(name)
+    if provider is not None:
+        return provider
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            factory = PROVIDER_FACTORIES.get(name)
+            if factory is None:
+                raise ProviderUnavailable("Online provider not available or not supported.")
+            provider = factory(model)
+            _providers[name] = provider
+    return provider
+
+def reset_providers() -> None:
+    """Drop every cached provider client."""
+    with _providers_lock:
+        _providers.clear()
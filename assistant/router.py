@@ -0,0 +1,315 @@
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from assistant import metrics
+from assistant.providers import Provider, ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Requests remembered per provider for latency percentiles and error rates
+DEFAULT_WINDOW = 100
+# A second provider is asked once the first is slower than this percentile of its recent latencies
+DEFAULT_HEDGE_PERCENTILE = 95.0
+# Hedge delay before a provider has any latency samples, and the smallest one allowed
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_HEDGE_DELAY = 0.05
+# Overall time allowed for an answer before giving up on every provider
+DEFAULT_DEADLINE = 15.0
+# Circuit breaker: open after this many failures in a row, or this error rate over the window
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_MAX_ERROR_RATE = 0.5
+MIN_REQUESTS = 10
+# Seconds an open circuit waits before letting a trial request through
+DEFAULT_RESET_TIMEOUT = 30.0
+# Threads running provider requests, shared by all concurrent questions
+ROUTER_WORKERS = 32
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class ProviderHealth:
+    """
+    Rolling latency and error rate of one provider, with its circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive failures or
+    once the error rate over the window reaches ``max_error_rate``. While
+    open the provider is skipped; after ``reset_timeout`` seconds a single
+    trial request is let through, which closes the circuit on success and
+    reopens it on failure.
+
+    Args:
+        window (int): Recent requests remembered.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        max_error_rate (float): Error rate over the window that opens the circuit.
+        reset_timeout (float): Seconds before an open circuit allows a trial.
+        clock (Callable[[], float]): Time source, for tests.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE, reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self._outcomes: deque = deque(maxlen=window)
+        self._failures = 0
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in the half-open state only one trial at a time is."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial = False
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            ok (bool): Whether it succeeded.
+            latency (Optional[float]): Seconds it took, if it succeeded and counts towards percentiles.
+        """
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._failures = 0
+                if latency is not None:
+                    self._latencies.append(latency)
+                if self.state != CLOSED:
+                    # A successful trial starts over with a clean error history
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold or (
+                    len(self._outcomes) >= MIN_REQUESTS and self._error_rate() >= self.max_error_rate):
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self._trial = False
+
+    def _error_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def error_rate(self) -> float:
+        """Fraction of recent requests that failed."""
+        with self._lock:
+            return self._error_rate()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile (0-100) of recent successful latencies, or None without samples."""
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def expected_latency(self) -> Optional[float]:
+        """Median latency scaled by the expected attempts to succeed; None without samples."""
+        median = self.percentile(50)
+        if median is None:
+            return None
+        return median / max(1.0 - self.error_rate(), 0.1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State, error rate and latency percentiles, for display."""
+        return {'state': self.state, 'error_rate': self.error_rate(),
+                'p50': self.percentile(50), 'p95': self.percentile(95), 'requests': len(self._outcomes)}
+
+class ProviderRouter:
+    """
+    Send each question to the provider likely to answer fastest, hedging slow requests.
+
+    Providers are ranked by their recent median latency, adjusted for their
+    error rate; providers without samples keep their configured order after
+    those with. The best one is asked first. If it has not answered within
+    ``hedge_percentile`` of its recent latencies, the next one is asked too
+    and the first answer wins. A failure moves on to the next provider at
+    once, and providers whose circuit is open are skipped without waiting.
+    Each provider is asked once, without its own retries and backoff: the
+    router's failover takes their place.
+    Requests that lose a race run to completion in the background so their
+    latency is still recorded.
+
+    Args:
+        names (Sequence[str]): Provider names in order of preference.
+        resolve (Callable[[str], Provider]): Returns the client for a name; may raise ProviderUnavailable.
+        deadline (float): Seconds to wait for any answer.
+        hedge_percentile (float): Percentile of the first provider's latency after which to hedge.
+        hedge_delay (float): Hedge delay for a provider without latency samples.
+        health (Optional[Callable[[], ProviderHealth]]): Factory for per-provider health trackers.
+    """
+
+    def __init__(self, names: Sequence[str], resolve: Callable[[str], Provider],
+                 deadline: float = DEFAULT_DEADLINE, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY,
+                 health: Optional[Callable[[], ProviderHealth]] = None):
+        self.names = list(names)
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self._resolve = resolve
+        self.health: Dict[str, ProviderHealth] = {name: (health or ProviderHealth)() for name in self.names}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=ROUTER_WORKERS, thread_name_prefix='provider')
+        return self._executor
+
+    def ranked(self) -> List[str]:
+        """Provider names, most promising first."""
+        expected = {name: self.health[name].expected_latency() for name in self.names}
+        return sorted(self.names, key=lambda name: (expected[name] is None, expected[name] or 0.0))
+
+    def _hedge_after(self, name: str) -> float:
+        latency = self.health[name].percentile(self.hedge_percentile)
+        return max(MIN_HEDGE_DELAY, self.hedge_delay if latency is None else latency)
+
+    def _candidates(self, errors: List[Exception]) -> Iterator[Tuple[str, Provider]]:
+        """Providers that can be asked right now, in rank order."""
+        for name in self.ranked():
+            try:
+                provider = self._resolve(name)
+            except ProviderUnavailable as e:
+                errors.append(e)
+                continue
+            if not self.health[name].allow():
+                metrics.inc('assistant_router_skipped_total', provider=name)
+                errors.append(ProviderUnavailable(f"Online provider {name} is failing; circuit open."))
+                continue
+            yield name, provider
+
+    def _call(self, name: str, call: Callable[[], str]) -> str:
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            self.health[name].record(False)
+            raise
+        self.health[name].record(True, time.perf_counter() - started)
+        return result
+
+    def complete(self, question: str, params: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Answer a question with whichever provider answers first.
+
+        Args:
+            question (str): The question.
+            params (Dict[str, Any]): Generation parameters.
+
+        Returns:
+            Tuple[str, str]: Name of the provider that answered, and the answer.
+
+        Raises:
+            ProviderUnavailable: If no provider could be asked.
+            TimeoutError: If no provider answered within the deadline.
+            Exception: The last provider error, if every provider failed.
+        """
+        deadline = time.monotonic() + self.deadline
+        errors: List[Exception] = []
+        candidates = self._candidates(errors)
+        pending: Dict[Future, str] = {}
+
+        def launch() -> Optional[str]:
+            for name, provider in candidates:
+                future = self.executor.submit(self._call, name, lambda p=provider: p.complete(question, params, retries=0))
+                pending[future] = name
+                return name
+            return None
+
+        first = launch()
+        if first is None:
+            raise ProviderUnavailable("; ".join(map(str, errors)) or "Online provider not available or not supported.")
+        hedge_at: Optional[float] = time.monotonic() + self._hedge_after(first)
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    logger.warning("Provider %s failed (%s); trying the next one", name, e)
+                    errors.append(e)
+                    launch()
+                    continue
+                return name, answer
+            if not done and hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                hedged = launch()
+                if hedged is not None:
+                    metrics.inc('assistant_router_hedges_total', provider=hedged)
+        if pending:
+            raise TimeoutError(f"no answer within {self.deadline:g}s")
+        raise next((e for e in reversed(errors) if not isinstance(e, ProviderUnavailable)), errors[-1])
+
+    def stream(self, question: str, params: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream an answer from the best available provider, moving on to the next one
+        if a provider fails before sending any text.
+
+        Streams are not hedged: only one provider's text can be shown.
+
+        Args:
+            question (str): The question.
+            params (Dict[str, Any]): Generation parameters.
+
+        Yields:
+            str: Text chunks in order.
+
+        Raises:
+            ProviderUnavailable: If no provider could be asked.
+            Exception: The last provider error, if every provider failed.
+        """
+        errors: List[Exception] = []
+        for name, provider in self._candidates(errors):
+            chunks = provider.stream(question, params, retries=0)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                self.health[name].record(False)
+                logger.warning("Provider %s failed (%s); trying the next one", name, e)
+                errors.append(e)
+                continue
+            try:
+                if first is not None:
+                    yield first
+                    yield from chunks
+            except Exception:
+                self.health[name].record(False)
+                raise
+            self.health[name].record(True)
+            return
+        failures = [e for e in errors if not isinstance(e, ProviderUnavailable)]
+        if failures:
+            raise failures[-1]
+        raise ProviderUnavailable("; ".join(map(str, errors)) or "Online provider not available or not supported.")
+
+    def close(self) -> None:
+        """Stop the worker threads once requests in flight finish."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
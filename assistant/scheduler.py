@@ -0,0 +1,262 @@
+import os
+import json
+import heapq
+import socket
+import datetime
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from assistant.storage import StorageEngine
+
+logger = logging.getLogger(__name__)
+
+# Datagram socket a running scheduler listens on for reminders saved by other processes
+WAKE_SOCKET = 'scheduler.sock'
+# Reminders per wakeup datagram, which keeps each one well under the socket's size limit
+WAKE_BATCH = 500
+# Seconds a notifying process waits if the scheduler's queue is full
+WAKE_TIMEOUT = 1.0
+
+# The scheduler running in this process, if any
+_active: Optional['ReminderScheduler'] = None
+
+class ReminderScheduler:
+    """
+    Fire reminders on time from a single thread.
+
+    Pending reminders sit in a min-heap keyed on ``scheduled_at``. The worker
+    sleeps on a condition until the earliest one is due, so adding a reminder
+    or firing one is O(log n) and nothing polls. Reminders are removed from
+    storage when they fire, which keeps ``check`` and the scheduler from
+    announcing the same reminder twice.
+
+    Args:
+        storage (StorageEngine): Store holding the reminders.
+        notify (Callable): Called with each reminder dict as it fires.
+    """
+
+    def __init__(self, storage: StorageEngine, notify: Callable[[Dict[str, Any]], None]):
+        self.storage = storage
+        self.notify = notify
+        self._heap: List[Tuple[datetime.datetime, int]] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._wake: Optional[socket.socket] = None
+        self._wake_path: Optional[str] = None
+        self._listener: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def reload(self) -> int:
+        """
+        Rebuild the heap from every pending reminder in storage.
+
+        Returns:
+            int: Number of pending reminders.
+        """
+        entries = [(datetime.datetime.fromisoformat(r['scheduled_at']), r.get('id', 0))
+                   for r in self.storage.list_reminders()]
+        heapq.heapify(entries)
+        with self._cond:
+            self._heap = entries
+            self._cond.notify()
+        return len(entries)
+
+    def add(self, reminder: Dict[str, Any]) -> None:
+        """
+        Schedule a reminder that is already saved in storage.
+
+        Args:
+            reminder (Dict[str, Any]): The stored reminder.
+        """
+        self._push([(datetime.datetime.fromisoformat(reminder['scheduled_at']), reminder.get('id', 0))])
+
+    def _push(self, entries: List[Tuple[datetime.datetime, int]]) -> None:
+        """Add heap entries, waking the worker if one is now the earliest."""
+        with self._cond:
+            first = self._heap[0] if self._heap else None
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+            if self._heap and self._heap[0] is not first:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = (self._heap[0][0] - datetime.datetime.now()).total_seconds()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._stopped:
+                    return
+                now = datetime.datetime.now()
+                while self._heap and self._heap[0][0] <= now:
+                    heapq.heappop(self._heap)
+            try:
+                for reminder in self.storage.pop_due_reminders(now):
+                    self.notify(reminder)
+            except Exception as e:
+                logger.error("Failed to fire reminders: %s", e)
+
+    def start(self, data_dir: Optional[str] = None) -> None:
+        """
+        Load pending reminders and start the worker thread.
+
+        Args:
+            data_dir (Optional[str]): Also listen on ``scheduler.sock`` in this
+                directory for reminders saved by other processes.
+        """
+        global _active
+        self.reload()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+        if data_dir is not None:
+            self._listen(data_dir)
+        _active = self
+
+    def _listen(self, data_dir: str) -> bool:
+        """Bind the wakeup socket, replacing one left by a scheduler that died."""
+        if not hasattr(socket, 'AF_UNIX'):
+            return False
+        path = os.path.join(data_dir, WAKE_SOCKET)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            try:
+                sock.bind(path)
+            except OSError:
+                if _listening(path):
+                    logger.warning("Another scheduler is already listening on %s", path)
+                    sock.close()
+                    return False
+                os.remove(path)
+                sock.bind(path)
+        except OSError as e:
+            logger.warning("Cannot listen on %s: %s", path, e)
+            sock.close()
+            return False
+        self._wake, self._wake_path = sock, path
+        self._listener = threading.Thread(target=self._receive, name='reminder-scheduler-wake', daemon=True)
+        self._listener.start()
+        return True
+
+    def _receive(self) -> None:
+        """Schedule the reminders other processes announce on the wakeup socket."""
+        while True:
+            try:
+                data = self._wake.recv(1 << 16)
+            except OSError:
+                return
+            if self._stopped:
+                return
+            try:
+                message = json.loads(data)
+                if message.get('reload'):
+                    self.reload()
+                else:
+                    self._push([(datetime.datetime.fromisoformat(at), reminder_id)
+                                for at, reminder_id in message.get('add', [])])
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning("Ignoring invalid scheduler wakeup: %s", e)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker thread and stop listening for other processes."""
+        global _active
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._wake is not None:
+            try:
+                # An empty datagram to ourselves unblocks the listener
+                self._wake.sendto(b'', self._wake_path)
+            except OSError:
+                pass
+            self._listener.join(timeout)
+            self._wake.close()
+            try:
+                os.remove(self._wake_path)
+            except FileNotFoundError:
+                pass
+            self._wake = self._wake_path = None
+        if _active is self:
+            _active = None
+
+    def run_forever(self, data_dir: str) -> None:
+        """
+        Run in the foreground until interrupted.
+
+        Listens on ``scheduler.sock`` in ``data_dir``; other processes send
+        the reminders they save there, and each is pushed onto the heap.
+
+        Args:
+            data_dir (str): Directory for the wakeup socket.
+        """
+        self.start(data_dir)
+        logger.info("Reminder scheduler running with %d pending reminders", len(self))
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+def get_active_scheduler() -> Optional[ReminderScheduler]:
+    """Return the scheduler running in this process, if any."""
+    return _active
+
+def _listening(path: str) -> bool:
+    """Whether a scheduler is bound to the wakeup socket; a leftover file refuses connections."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+def notify_scheduler(data_dir: str, reminders: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """
+    Hand reminders saved by this process to a scheduler running in another one.
+
+    Only a process bound to the wakeup socket receives anything, so a
+    scheduler that died leaves nothing behind to signal by mistake.
+
+    Args:
+        data_dir (str): Directory holding ``scheduler.sock``.
+        reminders (Optional[List[Dict[str, Any]]]): The stored reminders to
+            schedule; None asks the scheduler to reload storage.
+
+    Returns:
+        bool: True if a running scheduler was told.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    path = os.path.join(data_dir, WAKE_SOCKET)
+    if not os.path.exists(path):
+        return False
+    if reminders is None:
+        messages = [{'reload': True}]
+    else:
+        messages = [{'add': [[r['scheduled_at'], r.get('id', 0)] for r in reminders[start:start + WAKE_BATCH]]}
+                    for start in range(0, len(reminders), WAKE_BATCH)]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(WAKE_TIMEOUT)
+            for message in messages:
+                sock.sendto(json.dumps(message).encode('utf-8'), path)
+        return True
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    except OSError as e:
+        logger.warning("Could not notify the scheduler on %s: %s", path, e)
+        return False
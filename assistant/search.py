@@ -0,0 +1,330 @@
+import re
+import math
+import sqlite3
+import threading
+import heapq
+import itertools
+import importlib.util
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Question words that would otherwise match a large share of notes
+STOPWORDS = frozenset("""
+    a an and are as at be by can could did do does for from had has have how i if in is it
+    me my of on or should so that the their them there these they this to was what when
+    where which who whom why will with would you your
+""".split())
+
+# Above this many candidates a follow-up term is fetched in full rather than by IN (...) lookup.
+_CANDIDATE_LOOKUP_LIMIT = 500
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: Tokens in order of appearance.
+    """
+    return TOKEN_RE.findall(text.lower())
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    Parse a search query into OR-separated groups of AND-ed terms.
+
+    ``buy milk OR groceries`` means (buy AND milk) OR groceries. A trailing
+    ``*`` on a term (``groc*``) matches every token with that prefix.
+
+    Args:
+        query (str): The query string.
+
+    Returns:
+        List[List[str]]: One list of terms per OR group.
+    """
+    groups: List[List[str]] = [[]]
+    for word in query.split():
+        if word == 'OR':
+            groups.append([])
+            continue
+        prefix = word.endswith('*')
+        for token in tokenize(word):
+            groups[-1].append(token)
+        if prefix and groups[-1]:
+            groups[-1][-1] += '*'
+    return [g for g in groups if g]
+
+class SearchIndex:
+    """
+    Persistent inverted index (token -> note ids) kept in SQLite.
+
+    Postings are clustered by token, so exact and prefix lookups are range
+    scans. Note ids are the 1-based positions shown by ``note list``.
+
+    Args:
+        path (str): Database file path.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS docs (
+            id INTEGER PRIMARY KEY,
+            body TEXT NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            token TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (token, doc_id)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        # Note lengths by id (slot 0 unused) for BM25, loaded on first ranking and extended as notes are added
+        self._lengths = array('q', [0])
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM docs').fetchone()[0]
+
+    def add(self, note: str) -> int:
+        """
+        Index one note as the next note id.
+
+        Args:
+            note (str): The note text.
+
+        Returns:
+            int: The id assigned to the note.
+        """
+        return self.add_many([note])[0]
+
+    def add_many(self, notes: Iterable[str]) -> List[int]:
+        """
+        Index several notes in a single transaction.
+
+        Args:
+            notes (Iterable[str]): Note texts, in insertion order.
+
+        Returns:
+            List[int]: The ids assigned to the notes.
+        """
+        ids = []
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                next_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM docs').fetchone()[0] + 1
+                for note in notes:
+                    tokens = tokenize(note)
+                    conn.execute('INSERT INTO docs (id, body, length) VALUES (?, ?, ?)',
+                                 (next_id, note, len(tokens)))
+                    conn.executemany('INSERT INTO postings (token, doc_id, tf) VALUES (?, ?, ?)',
+                                     ((t, next_id, tf) for t, tf in Counter(tokens).items()))
+                    ids.append(next_id)
+                    next_id += 1
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        return ids
+
+    def clear(self) -> None:
+        """Drop every indexed note."""
+        with self._lock:
+            self._conn.execute('DELETE FROM postings')
+            self._conn.execute('DELETE FROM docs')
+            self._lengths = array('q', [0])
+            self._total_length = 0
+
+    def _postings(self, term: str, candidates: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """Map doc id -> term frequency for a term, summing over prefix matches."""
+        if term.endswith('*'):
+            prefix = term[:-1]
+            where, params = 'token >= ? AND token < ?', [prefix, prefix + '\U0010ffff']
+        else:
+            where, params = 'token = ?', [term]
+        if candidates is not None:
+            candidates = list(candidates)
+            where += f" AND doc_id IN ({','.join('?' * len(candidates))})"
+            params += candidates
+        postings: Dict[int, int] = {}
+        for doc_id, tf in self._conn.execute(f'SELECT doc_id, tf FROM postings WHERE {where}', params):
+            postings[doc_id] = postings.get(doc_id, 0) + tf
+        return postings
+
+    def _document_frequency(self, term: str) -> int:
+        """Posting count for a term; for prefixes an upper bound on the distinct notes."""
+        if term.endswith('*'):
+            prefix = term[:-1]
+            sql, params = 'SELECT COUNT(*) FROM postings WHERE token >= ? AND token < ?', (prefix, prefix + '\U0010ffff')
+        else:
+            sql, params = 'SELECT COUNT(*) FROM postings WHERE token = ?', (term,)
+        return self._conn.execute(sql, params).fetchone()[0]
+
+    def _match_group(self, terms: List[str], total: int) -> Dict[int, float]:
+        """Score the notes containing every term, rarest term first."""
+        dfs = {t: self._document_frequency(t) for t in terms}
+        if not all(dfs.values()):
+            return {}
+        ordered = sorted(terms, key=dfs.get)
+        first = ordered[0]
+        idf = math.log(1 + total / dfs[first])
+        scores = {d: (1 + math.log(tf)) * idf for d, tf in self._postings(first).items()}
+        for term in ordered[1:]:
+            if not scores:
+                break
+            idf = math.log(1 + total / dfs[term])
+            candidates = scores if len(scores) <= _CANDIDATE_LOOKUP_LIMIT else None
+            postings = self._postings(term, candidates)
+            scores = {d: s + (1 + math.log(postings[d])) * idf for d, s in scores.items() if d in postings}
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, str, float]]:
+        """
+        Find notes matching a query, best matches first.
+
+        Args:
+            query (str): Terms to AND together, ``OR`` between groups, ``term*`` for prefixes.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[int, str, float]]: (note id, note, score) tuples.
+        """
+        groups = parse_query(query)
+        if not groups:
+            return []
+        with self._lock:
+            total = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM docs').fetchone()[0]
+            scores: Dict[int, float] = {}
+            for terms in groups:
+                for doc_id, score in self._match_group(terms, total).items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            results = []
+            for doc_id, score in top:
+                body = self._conn.execute('SELECT body FROM docs WHERE id = ?', (doc_id,)).fetchone()[0]
+                results.append((doc_id, body, round(score, 4)))
+        return results
+
+    def get_many(self, ids: Iterable[int]) -> List[Tuple[int, str]]:
+        """
+        Fetch indexed notes by id.
+
+        Args:
+            ids (Iterable[int]): Note ids.
+
+        Returns:
+            List[Tuple[int, str]]: (note id, note) pairs in the order asked, skipping unknown ids.
+        """
+        ids = list(ids)
+        bodies: Dict[int, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), _CANDIDATE_LOOKUP_LIMIT):
+                chunk = ids[start:start + _CANDIDATE_LOOKUP_LIMIT]
+                rows = self._conn.execute(
+                    f"SELECT id, body FROM docs WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                bodies.update(rows)
+        return [(note_id, bodies[note_id]) for note_id in ids if note_id in bodies]
+
+    def _doc_lengths(self) -> array:
+        """Bring the cached note lengths up to date with the database."""
+        last = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM docs').fetchone()[0]
+        if last < len(self._lengths) - 1:
+            # Rebuilt by another connection
+            self._lengths = array('q', [0])
+            self._total_length = 0
+        if last >= len(self._lengths):
+            rows = self._conn.execute('SELECT length FROM docs WHERE id >= ? ORDER BY id', (len(self._lengths),))
+            added = array('q', (row[0] for row in rows))
+            self._lengths.extend(added)
+            self._total_length += sum(added)
+        return self._lengths
+
+    def rank(self, text: str, limit: int = 3) -> List[Tuple[int, str, float]]:
+        """
+        Rank notes by BM25 relevance to free text, such as a question.
+
+        Unlike ``search``, any term may match; notes sharing more (and rarer)
+        terms score higher, and common question words are ignored. Term
+        frequencies and note lengths are recorded when notes are indexed, so
+        only the postings of the question's terms are read. Scoring is
+        vectorized with NumPy when it is installed.
+
+        Args:
+            text (str): The text to match.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[int, str, float]]: (note id, note, score) tuples, best match first.
+        """
+        terms = [t for t in dict.fromkeys(tokenize(text)) if t not in STOPWORDS]
+        if not terms or limit <= 0:
+            return []
+        with self._lock:
+            lengths = self._doc_lengths()
+            total = len(lengths) - 1
+            if not total:
+                return []
+            postings = []
+            for term in terms:
+                rows = self._conn.execute('SELECT doc_id, tf FROM postings WHERE token = ?', (term,)).fetchall()
+                if rows:
+                    postings.append((math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5)), rows))
+            if not postings:
+                return []
+            average = self._total_length / total or 1.0
+            score = _bm25_numpy if NUMPY_AVAILABLE else _bm25_python
+            top = score(postings, lengths, average, limit)
+            results = []
+            for doc_id, value in top:
+                body = self._conn.execute('SELECT body FROM docs WHERE id = ?', (doc_id,)).fetchone()[0]
+                results.append((doc_id, body, round(value, 4)))
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+Postings = List[Tuple[float, List[Tuple[int, int]]]]
+
+def _bm25_python(postings: Postings, lengths: array, average: float, limit: int) -> List[Tuple[int, float]]:
+    """Accumulate BM25 scores term by term in a dict; the fallback without NumPy."""
+    scores: Dict[int, float] = {}
+    for idf, rows in postings:
+        for doc_id, tf in rows:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+def _bm25_numpy(postings: Postings, lengths: array, average: float, limit: int) -> List[Tuple[int, float]]:
+    """Score each term's postings as arrays into one dense score vector, then select the top notes."""
+    import numpy as np
+    doc_lengths: Any = np.frombuffer(lengths, dtype=np.int64)
+    scores = np.zeros(len(doc_lengths))
+    for idf, rows in postings:
+        pairs = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows))
+        ids, tf = pairs[0::2], pairs[1::2].astype(np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[ids] / average)
+        scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+    candidates = np.flatnonzero(scores)
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+    return sorted(((int(d), float(scores[d])) for d in candidates), key=lambda item: (-item[1], item[0]))
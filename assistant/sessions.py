@@ -0,0 +1,225 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, MutableMapping, Optional
+
+from assistant import metrics
+
+DEFAULT_SESSION = 'default'
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_SHARDS = 16
+
+# Rough per-session bookkeeping cost counted against max_bytes
+SESSION_OVERHEAD = 256
+
+class _Session:
+    __slots__ = ('values', 'touched', 'size')
+
+    def __init__(self, touched: float):
+        self.values: Dict[str, Any] = {}
+        self.touched = touched
+        self.size = SESSION_OVERHEAD
+
+class _Shard:
+    __slots__ = ('lock', 'sessions', 'size')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: 'OrderedDict[str, _Session]' = OrderedDict()
+        self.size = 0
+
+def _entry_size(key: str, value: Any) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+class SessionStore:
+    """
+    Per-session conversation context, bounded in count, age and memory.
+
+    Sessions are spread over independently locked shards by id, so callers
+    working on different sessions rarely contend. Each shard evicts its
+    least recently used sessions once it holds more than its share of
+    ``max_sessions`` or ``max_bytes``. A session untouched for ``ttl``
+    seconds is dropped when next seen.
+
+    Args:
+        max_sessions (int): Maximum number of sessions kept.
+        ttl (float): Seconds a session survives without being used.
+        max_bytes (int): Approximate memory budget for all sessions.
+        shards (int): Number of independently locked shards.
+        clock (Callable[[], float]): Time source, for tests.
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, shards: int = DEFAULT_SHARDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_sessions = max(1, -(-max_sessions // shards))
+        self._max_bytes = max(SESSION_OVERHEAD, max_bytes // shards)
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def _live(self, shard: _Shard, session_id: str, now: float) -> Optional[_Session]:
+        """The session if it exists and hasn't expired, marked most recently used. Needs the shard lock."""
+        session = shard.sessions.get(session_id)
+        if session is None:
+            return None
+        if now - session.touched > self.ttl:
+            del shard.sessions[session_id]
+            shard.size -= session.size
+            metrics.inc('assistant_sessions_evicted_total', reason='ttl')
+            return None
+        session.touched = now
+        shard.sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        """Drop expired sessions, then the least recently used while over budget. Needs the shard lock."""
+        sessions = shard.sessions
+        while len(sessions) > 1:
+            session_id, oldest = next(iter(sessions.items()))
+            if now - oldest.touched > self.ttl:
+                reason = 'ttl'
+            elif len(sessions) > self._max_sessions or shard.size > self._max_bytes:
+                reason = 'capacity'
+            else:
+                break
+            del sessions[session_id]
+            shard.size -= oldest.size
+            metrics.inc('assistant_sessions_evicted_total', reason=reason)
+
+    def get(self, session_id: str, key: str, default: Any = None) -> Any:
+        """
+        Read one value from a session's context.
+
+        Args:
+            session_id (str): The session.
+            key (str): Context key, e.g. 'last_topic'.
+            default (Any): Returned if the session or key is missing.
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = self._live(shard, session_id, self._clock())
+            if session is None:
+                return default
+            return session.values.get(key, default)
+
+    def set(self, session_id: str, key: str, value: Any) -> None:
+        """
+        Store a value in a session's context, creating the session if needed.
+
+        Args:
+            session_id (str): The session.
+            key (str): Context key.
+            value (Any): The value.
+        """
+        shard = self._shard(session_id)
+        now = self._clock()
+        with shard.lock:
+            session = self._live(shard, session_id, now)
+            if session is None:
+                session = shard.sessions[session_id] = _Session(now)
+                shard.size += session.size
+            if key in session.values:
+                old = _entry_size(key, session.values[key])
+                session.size -= old
+                shard.size -= old
+            session.values[key] = value
+            new = _entry_size(key, value)
+            session.size += new
+            shard.size += new
+            self._evict(shard, now)
+
+    def discard(self, session_id: str, key: str) -> None:
+        """Remove a value from a session's context, if present."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = self._live(shard, session_id, self._clock())
+            if session is not None and key in session.values:
+                size = _entry_size(key, session.values.pop(key))
+                session.size -= size
+                shard.size -= size
+
+    def context(self, session_id: str) -> Dict[str, Any]:
+        """A copy of a session's context; empty for unknown or expired sessions."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = self._live(shard, session_id, self._clock())
+            return dict(session.values) if session is not None else {}
+
+    def end(self, session_id: str) -> None:
+        """Forget a session entirely."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.pop(session_id, None)
+            if session is not None:
+                shard.size -= session.size
+
+    def clear(self) -> None:
+        """Forget every session."""
+        for shard in self._shards:
+            with shard.lock:
+                shard.sessions.clear()
+                shard.size = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Current usage.
+
+        Returns:
+            Dict[str, int]: ``sessions`` held and their approximate ``bytes``.
+        """
+        sessions = size = 0
+        for shard in self._shards:
+            with shard.lock:
+                sessions += len(shard.sessions)
+                size += shard.size
+        return {'sessions': sessions, 'bytes': size}
+
+class SessionContext(MutableMapping):
+    """
+    Dict-like view of one session in a ``SessionStore``.
+
+    Args:
+        store (SessionStore): The store.
+        session_id (str): The session viewed.
+    """
+
+    def __init__(self, store: SessionStore, session_id: str = DEFAULT_SESSION):
+        self.store = store
+        self.session_id = session_id
+
+    def __getitem__(self, key: str) -> Any:
+        missing = object()
+        value = self.store.get(self.session_id, key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.set(self.session_id, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.store.discard(self.session_id, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.context(self.session_id))
+
+    def __len__(self) -> int:
+        return len(self.store.context(self.session_id))
+
+    def clear(self) -> None:
+        self.store.end(self.session_id)
+
+    def __repr__(self) -> str:
+        return f"SessionContext({self.session_id!r}, {self.store.context(self.session_id)!r})"
@@ -0,0 +1,174 @@
+import sys
+import time
+import shlex
+import argparse
+import logging
+from typing import Callable, Dict, List, Optional
+
+from assistant import metrics
+
+logger = logging.getLogger(__name__)
+
+class Shell:
+    """
+    Interactive prompt running CLI commands in one long-lived process.
+
+    Storage engines, the search index, cached documents, compiled
+    expressions and provider clients are created on first use and then
+    shared by every later command, so repeated commands skip process start
+    and warm-up entirely. The latency of each command is recorded under its
+    name (e.g. 'note add') and summarized by the ``stats`` builtin.
+
+    ``--timings`` and ``--profile`` before a command apply to that line
+    alone. Logging options configure the whole process, so they are only
+    accepted when starting the shell.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser from ``cli.build_parser``.
+        run (Callable): Runs one parsed command (``cli.run_command``).
+        show_timings (bool): Print each command's latency on stderr.
+        input_fn (Callable): Reads a line given the prompt; raises EOFError at the end.
+        print_profile (Optional[Callable]): Reports recorded metrics in a
+            ``--profile-format`` (``cli.print_profile``); None to reject ``--profile``.
+    """
+
+    prompt = 'assistant> '
+    BUILTINS = {
+        'help': 'Show commands',
+        'stats': 'Show per-command latency',
+        'exit': 'Leave the shell (also quit or Ctrl+D)',
+    }
+
+    def __init__(self, parser: argparse.ArgumentParser, run: Callable[[argparse.Namespace], None],
+                 show_timings: bool = False, input_fn: Callable[[str], str] = input,
+                 print_profile: Optional[Callable[[str], None]] = None):
+        self.parser = parser
+        self.run = run
+        self.show_timings = show_timings
+        self.input = input_fn
+        self.print_profile = print_profile
+        self.latencies: Dict[str, List[float]] = {}
+
+    def execute(self, line: str) -> bool:
+        """
+        Run one line of input.
+
+        Args:
+            line (str): A command as it would follow ``python -m assistant.cli``.
+
+        Returns:
+            bool: False once the user asked to leave.
+        """
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"- {e}")
+            return True
+        if not argv:
+            return True
+        if argv[0] in ('exit', 'quit'):
+            return False
+        if argv[0] == 'help':
+            self.parser.print_help()
+            for name, description in self.BUILTINS.items():
+                print(f"  {name:<10} {description}")
+            return True
+        if argv[0] == 'stats':
+            self.print_stats()
+            return True
+
+        started = time.perf_counter()
+        try:
+            args = self.parser.parse_args(argv)
+        except SystemExit:
+            # argparse errors and --help exit; the shell carries on
+            return True
+        if args.command in ('shell', 'scheduler', 'serve'):
+            print(f"- '{args.command}' is not available inside the shell.")
+            return True
+        if args.log_level is not None or args.log:
+            print("- Logging options apply to the whole shell; pass them before 'shell' instead.")
+            return True
+        if args.profile and self.print_profile is None:
+            print("- --profile is not available in this shell.")
+            return True
+        # Metrics already on for the whole process keep accumulating; otherwise record this line only
+        profiling = args.profile and not metrics.enabled()
+        if profiling:
+            metrics.reset()
+            metrics.enable()
+        try:
+            with metrics.timer('assistant_command_seconds', command=args.command or 'help'):
+                self.run(args)
+        except SystemExit:
+            # Failed commands exit too
+            return True
+        except KeyboardInterrupt:
+            print()
+            return True
+        except Exception as e:
+            logger.error("Shell command '%s' failed: %s", line, e)
+            print(f"- {e}")
+            return True
+        finally:
+            if args.profile:
+                self.print_profile(args.profile_format)
+            if profiling:
+                metrics.enable(False)
+                metrics.reset()
+        elapsed = time.perf_counter() - started
+        subcommands = [value for key, value in vars(args).items() if key.endswith('_command') and value]
+        name = ' '.join([args.command or 'help'] + subcommands)
+        self.latencies.setdefault(name, []).append(elapsed)
+        if self.show_timings or args.timings:
+            sys.stderr.write(f"{name}: {elapsed * 1000:.2f} ms\n")
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize recorded latencies.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Per command: count, and mean, p50,
+            p95 and max in milliseconds.
+        """
+        summary = {}
+        for name, samples in self.latencies.items():
+            ordered = sorted(samples)
+            summary[name] = {
+                'count': len(ordered),
+                'mean': sum(ordered) / len(ordered) * 1000,
+                'p50': ordered[(len(ordered) - 1) // 2] * 1000,
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                'max': ordered[-1] * 1000,
+            }
+        return summary
+
+    def print_stats(self) -> None:
+        summary = self.stats()
+        if not summary:
+            print("i No commands run yet.")
+            return
+        print(f"{'command':<16} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}  (ms)")
+        for name, row in sorted(summary.items()):
+            print(f"{name:<16} {row['count']:>6} {row['mean']:>9.2f} {row['p50']:>9.2f} "
+                  f"{row['p95']:>9.2f} {row['max']:>9.2f}")
+
+    def loop(self) -> None:
+        """Read and run commands until exit or end of input."""
+        try:
+            import readline  # noqa: F401 -- line editing and history where available
+        except ImportError:
+            pass
+        print("i Type a command (e.g. note add \"milk\"), 'help' or 'exit'.")
+        while True:
+            try:
+                line = self.input(self.prompt)
+            except EOFError:
+                print()
+                break
+            except KeyboardInterrupt:
+                print()
+                continue
+            if not self.execute(line):
+                break
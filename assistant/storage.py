@@ -0,0 +1,549 @@
+import os
+import bisect
+import sqlite3
+import itertools
+import collections
+import datetime
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from assistant.fileio import FileLock, fsync_enabled
+from assistant.journal import NoteJournal
+from assistant.notefile import NoteFile
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per query when streaming notes out of SQLite
+NOTES_PAGE_SIZE = 500
+
+# Fired reminders left as tombstones before reminders.json is rewritten without them
+FOLD_MIN_FIRED = 256
+
+def _page(numbered: Iterable[Tuple[int, str]], offset: int, limit: Optional[int]) -> Iterator[Tuple[int, str]]:
+    return itertools.islice(numbered, offset, None if limit is None else offset + limit)
+
+class StorageEngine:
+    """
+    Interface for the stores behind notes and reminders.
+
+    Reminders are dicts with ``id``, ``message``, ``time`` and ``scheduled_at``
+    (an ISO-8601 string), exactly as they appear in ``reminders.json``.
+    """
+
+    name = 'base'
+
+    def add_note(self, note: str) -> None:
+        raise NotImplementedError
+
+    def list_notes(self) -> List[str]:
+        raise NotImplementedError
+
+    def add_notes(self, notes: List[str]) -> None:
+        """Add several notes at once; engines override this to write them in one go."""
+        for note in notes:
+            self.add_note(note)
+
+    def iter_notes(self, offset: int = 0, limit: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, str]]:
+        """
+        Yield notes with their numbers, without building the whole list where the engine allows.
+
+        Notes are numbered from 1 in insertion order, the same numbering
+        whichever direction they are read in.
+
+        Args:
+            offset (int): Notes to skip from the start (or from the end, with ``reverse``).
+            limit (Optional[int]): Maximum number of notes; None for all.
+            reverse (bool): Newest first.
+
+        Returns:
+            Iterator[Tuple[int, str]]: (number, note) pairs.
+        """
+        notes = self.list_notes()
+        if reverse:
+            return _page(zip(range(len(notes), 0, -1), reversed(notes)), offset, limit)
+        return _page(enumerate(notes, 1), offset, limit)
+
+    def get_notes(self, numbers: Iterable[int]) -> List[Tuple[int, str]]:
+        """
+        Read particular notes by number, e.g. the ones a tag filter selected.
+
+        Args:
+            numbers (Iterable[int]): Note numbers; ones past the end are skipped.
+
+        Returns:
+            List[Tuple[int, str]]: (number, note) pairs in the order asked for.
+        """
+        numbers = list(numbers)
+        wanted = set(numbers)
+        found = {number: note for number, note in _page(self.iter_notes(), 0, max(wanted, default=0))
+                 if number in wanted}
+        return [(number, found[number]) for number in numbers if number in found]
+
+    def compact(self) -> int:
+        """Reclaim space after many writes. Returns the number of records merged."""
+        return 0
+
+    def add_reminder(self, message: str, time_str: str, scheduled_at: datetime.datetime) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def add_reminders(self, reminders: List[Tuple[str, str, datetime.datetime]]) -> List[Dict[str, Any]]:
+        """Add several (message, time, scheduled_at) reminders at once, returning them as stored."""
+        return [self.add_reminder(*reminder) for reminder in reminders]
+
+    def list_reminders(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def pop_due_reminders(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Remove and return every reminder scheduled at or before ``now``."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+class _ReminderSchedule:
+    """
+    One version of ``reminders.json`` with its reminders sorted by time, and
+    which of them have fired since it was written.
+
+    Fired reminders are listed by position in ``reminders.done``, whose first
+    line is the (inode, size, mtime) of the document they belong to, so a
+    tombstone file left behind by a crash or an outside rewrite is ignored.
+    """
+
+    def __init__(self, document: Dict[str, Any], signature: Tuple[int, int, int]):
+        self.document = document
+        self.items: List[Dict[str, Any]] = document.get('reminders', [])
+        self.signature = signature
+        self.schedule = sorted((datetime.datetime.fromisoformat(r['scheduled_at']), i) for i, r in enumerate(self.items))
+        # Schedule entries before this one were already handed out by this process
+        self.start = 0
+        self.fired: Set[int] = set()
+        self.fired_read = 0
+        self.stale = False
+
+    def refresh(self, path: str) -> None:
+        """Read tombstones other processes appended since the last read."""
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        if size < self.fired_read:
+            self.fired, self.fired_read, self.stale = set(), 0, False
+        if size <= self.fired_read or self.stale:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self.fired_read)
+            data = f.read(size - self.fired_read)
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return
+        if self.fired_read == 0:
+            header, _, data = data.partition(b'\n')
+            self.stale = tuple(int(n) for n in header.split()) != self.signature
+            self.fired_read = len(header) + 1
+            if self.stale:
+                return
+        self.fired_read += len(data)
+        self.fired.update(int(n) for n in data.split())
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return [r for i, r in enumerate(self.items) if i not in self.fired]
+
+class JSONStorage(StorageEngine):
+    """
+    The original file layout: a notes journal plus ``notes.json`` snapshot, and
+    ``reminders.json`` rewritten as a whole document.
+
+    Several processes may share the files: reminder updates hold an advisory
+    lock on ``reminders.json`` across their read-modify-write, and notes are
+    read under a shared journal lock so a concurrent compaction can't move
+    records between the snapshot and the journal mid-read.
+
+    Firing reminders doesn't rewrite ``reminders.json``: due reminders are
+    found by binary search in a cached schedule and marked fired in the
+    append-only ``reminders.done``. The next rewrite (adding reminders,
+    compaction, or tombstones outnumbering pending reminders) folds them in.
+
+    Args:
+        data_dir (str): Directory holding the files.
+        load (Callable): Cached document loader (``utils.load_data``).
+        save (Callable): Document writer (``utils.save_data``).
+    """
+
+    name = 'json'
+
+    def __init__(self, data_dir: str, load: Callable[[str], Dict[str, Any]], save: Callable[[str, Dict[str, Any]], None]):
+        self.data_dir = data_dir
+        self._load = load
+        self._save = save
+        self._reminders_lock = threading.Lock()
+        self._schedule: Optional[_ReminderSchedule] = None
+
+    def _reminders_file_lock(self, shared: bool = False) -> FileLock:
+        return FileLock(os.path.join(self.data_dir, 'reminders.json'), shared=shared)
+
+    def _fired_path(self) -> str:
+        return os.path.join(self.data_dir, 'reminders.done')
+
+    def _reminder_schedule(self) -> _ReminderSchedule:
+        """The current reminders and their tombstones. Needs both reminder locks."""
+        document = self._load('reminders.json')
+        if self._schedule is None or self._schedule.document is not document:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, 'reminders.json'))
+                signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                signature = (0, 0, 0)
+            self._schedule = _ReminderSchedule(document, signature)
+        self._schedule.refresh(self._fired_path())
+        return self._schedule
+
+    def _rewrite_reminders(self, reminders: List[Dict[str, Any]]) -> None:
+        """Save the reminders as a new document, dropping the tombstones. Needs both reminder locks."""
+        # Tombstones go first: a crash in between can only fire a reminder twice, never lose one
+        try:
+            os.remove(self._fired_path())
+        except FileNotFoundError:
+            pass
+        self._schedule = None
+        document = dict(self._load('reminders.json'))
+        document['reminders'] = reminders
+        self._save('reminders.json', document)
+
+    def fold_reminders(self) -> int:
+        """Rewrite ``reminders.json`` without fired reminders. Returns how many were dropped."""
+        with self._reminders_lock, self._reminders_file_lock():
+            schedule = self._reminder_schedule()
+            if not schedule.fired:
+                return 0
+            self._rewrite_reminders(schedule.pending())
+            return len(schedule.fired)
+
+    def add_note(self, note: str) -> None:
+        self.add_notes([note])
+
+    def add_notes(self, notes: List[str]) -> None:
+        journal = NoteJournal(self.data_dir)
+        journal.extend(notes)
+        if journal.needs_compaction():
+            self.compact()
+
+    def list_notes(self) -> List[str]:
+        journal = NoteJournal(self.data_dir)
+        with journal.lock(shared=True):
+            snapshot = self._load('notes.json')
+            notes = list(snapshot.get('notes', []))
+            notes.extend(journal.replay(snapshot.get('compacted', [])))
+        return notes
+
+    def iter_notes(self, offset: int = 0, limit: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, str]]:
+        journal = NoteJournal(self.data_dir)
+        with journal.lock(shared=True):
+            snapshot = self._load('notes.json')
+            records = journal.open_replay(snapshot.get('compacted', []))
+        notes = snapshot.get('notes', [])
+        if not reverse:
+            return _page(enumerate(itertools.chain(notes, records), 1), offset, limit)
+        # The journal only reads forwards: keep just the newest records the page can reach
+        newest = collections.deque(maxlen=None if limit is None else offset + limit)
+        journaled = 0
+        for note in records:
+            newest.append(note)
+            journaled += 1
+        total = len(notes) + journaled
+        return _page(zip(itertools.count(total, -1), itertools.chain(reversed(newest), reversed(notes))), offset, limit)
+
+    def compact(self) -> int:
+        merged = NoteJournal(self.data_dir).compact()
+        self._load.cache_clear()
+        return merged + self.fold_reminders()
+
+    def add_reminder(self, message: str, time_str: str, scheduled_at: datetime.datetime) -> Dict[str, Any]:
+        return self.add_reminders([(message, time_str, scheduled_at)])[0]
+
+    def add_reminders(self, reminders: List[Tuple[str, str, datetime.datetime]]) -> List[Dict[str, Any]]:
+        with self._reminders_lock, self._reminders_file_lock():
+            items = self._reminder_schedule().pending()
+            next_id = max((r.get('id', 0) for r in items), default=0) + 1
+            added = []
+            for message, time_str, scheduled_at in reminders:
+                added.append({
+                    'message': message,
+                    'time': time_str,
+                    'scheduled_at': scheduled_at.isoformat(),
+                    'id': next_id
+                })
+                next_id += 1
+            self._rewrite_reminders(items + added)
+        return added
+
+    def list_reminders(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(os.path.join(self.data_dir, 'reminders.json')):
+            return []
+        with self._reminders_lock, self._reminders_file_lock(shared=True):
+            return self._reminder_schedule().pending()
+
+    def pop_due_reminders(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        with self._reminders_lock, self._reminders_file_lock():
+            schedule = self._reminder_schedule()
+            end = bisect.bisect_right(schedule.schedule, (now, len(schedule.items)))
+            due = [i for _, i in schedule.schedule[schedule.start:end] if i not in schedule.fired]
+            schedule.start = max(schedule.start, end)
+            if not due:
+                return []
+            path = self._fired_path()
+            lines = ''.join(f"{i}\n" for i in due)
+            if schedule.fired_read == 0 or schedule.stale:
+                lines = ' '.join(map(str, schedule.signature)) + '\n' + lines
+                mode = 'w'
+            else:
+                mode = 'a'
+            with open(path, mode, encoding='utf-8') as f:
+                f.write(lines)
+                if fsync_enabled():
+                    f.flush()
+                    os.fsync(f.fileno())
+            schedule.fired_read = (schedule.fired_read if mode == 'a' else 0) + len(lines.encode('utf-8'))
+            schedule.stale = False
+            schedule.fired.update(due)
+            if len(schedule.fired) > max(FOLD_MIN_FIRED, len(schedule.items) // 2):
+                self._rewrite_reminders(schedule.pending())
+            return [schedule.items[i] for i in due]
+
+class BinaryStorage(JSONStorage):
+    """
+    Notes in the memory-mapped ``notes.bin``/``notes.idx`` format; reminders
+    stay in ``reminders.json`` as with the JSON store.
+
+    Args:
+        data_dir (str): Directory holding the files.
+        load (Callable): Cached document loader (``utils.load_data``).
+        save (Callable): Document writer (``utils.save_data``).
+    """
+
+    name = 'binary'
+
+    def __init__(self, data_dir: str, load: Callable[[str], Dict[str, Any]], save: Callable[[str, Dict[str, Any]], None]):
+        super().__init__(data_dir, load, save)
+        self.notes = NoteFile(data_dir)
+
+    def add_note(self, note: str) -> None:
+        self.notes.append(note)
+
+    def add_notes(self, notes: List[str]) -> None:
+        self.notes.extend(notes)
+
+    def list_notes(self) -> List[str]:
+        return [note for _, note in self.notes.iter_notes()]
+
+    def iter_notes(self, offset: int = 0, limit: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, str]]:
+        return self.notes.iter_notes(offset, limit, reverse)
+
+    def get_notes(self, numbers: Iterable[int]) -> List[Tuple[int, str]]:
+        count = len(self.notes)
+        return [(number, self.notes.get(number)) for number in numbers if 1 <= number <= count]
+
+    def compact(self) -> int:
+        return self.fold_reminders()
+
+    def close(self) -> None:
+        self.notes.close()
+
+class SQLiteStorage(StorageEngine):
+    """
+    Notes and reminders as rows of a SQLite database in WAL mode.
+
+    Reminders are indexed by ``scheduled_at``, so finding due reminders is a
+    range scan rather than a full read-modify-write.
+
+    Args:
+        data_dir (str): Directory holding the database.
+        filename (str): Database file name.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            body TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY,
+            message TEXT NOT NULL,
+            time TEXT NOT NULL,
+            scheduled_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS reminders_scheduled_at ON reminders (scheduled_at);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, data_dir: str, filename: str = 'assistant.db'):
+        self.path = os.path.join(data_dir, filename)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _reminder(row: sqlite3.Row) -> Dict[str, Any]:
+        return {'id': row[0], 'message': row[1], 'time': row[2], 'scheduled_at': row[3]}
+
+    def add_note(self, note: str) -> None:
+        with self._lock:
+            self._conn.execute('INSERT INTO notes (body) VALUES (?)', (note,))
+
+    def add_notes(self, notes: List[str]) -> None:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany('INSERT INTO notes (body) VALUES (?)', ((note,) for note in notes))
+                self._conn.execute('COMMIT')
+            except sqlite3.Error:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def list_notes(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT body FROM notes ORDER BY id')]
+
+    def iter_notes(self, offset: int = 0, limit: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, str]]:
+        # Fetch a page at a time by id (not OFFSET, which rescans), so memory stays flat
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0]
+        order, compare = ('DESC', '<') if reverse else ('ASC', '>')
+        remaining = max(total - offset, 0) if limit is None else max(min(limit, total - offset), 0)
+        number = total - offset if reverse else offset + 1
+        step = -1 if reverse else 1
+        last_id = None
+        while remaining > 0:
+            size = min(NOTES_PAGE_SIZE, remaining)
+            with self._lock:
+                if last_id is None:
+                    rows = self._conn.execute(f'SELECT id, body FROM notes ORDER BY id {order} LIMIT ? OFFSET ?',
+                                              (size, offset)).fetchall()
+                else:
+                    rows = self._conn.execute(f'SELECT id, body FROM notes WHERE id {compare} ? ORDER BY id {order} LIMIT ?',
+                                              (last_id, size)).fetchall()
+            if not rows:
+                return
+            for _, body in rows:
+                yield number, body
+                number += step
+            remaining -= len(rows)
+            last_id = rows[-1][0]
+
+    def get_notes(self, numbers: Iterable[int]) -> List[Tuple[int, str]]:
+        # Notes are never deleted, so a note's number is its row id
+        numbers = list(numbers)
+        found: Dict[int, str] = {}
+        for start in range(0, len(numbers), NOTES_PAGE_SIZE):
+            chunk = numbers[start:start + NOTES_PAGE_SIZE]
+            with self._lock:
+                found.update(self._conn.execute(
+                    f"SELECT id, body FROM notes WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        return [(number, found[number]) for number in numbers if number in found]
+
+    def add_reminder(self, message: str, time_str: str, scheduled_at: datetime.datetime) -> Dict[str, Any]:
+        with self._lock:
+            cur = self._conn.execute(
+                'INSERT INTO reminders (message, time, scheduled_at) VALUES (?, ?, ?)',
+                (message, time_str, scheduled_at.isoformat())
+            )
+        return {'message': message, 'time': time_str, 'scheduled_at': scheduled_at.isoformat(), 'id': cur.lastrowid}
+
+    def add_reminders(self, reminders: List[Tuple[str, str, datetime.datetime]]) -> List[Dict[str, Any]]:
+        added = []
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for message, time_str, scheduled_at in reminders:
+                    cur = self._conn.execute(
+                        'INSERT INTO reminders (message, time, scheduled_at) VALUES (?, ?, ?)',
+                        (message, time_str, scheduled_at.isoformat())
+                    )
+                    added.append({'message': message, 'time': time_str,
+                                  'scheduled_at': scheduled_at.isoformat(), 'id': cur.lastrowid})
+                self._conn.execute('COMMIT')
+            except sqlite3.Error:
+                self._conn.execute('ROLLBACK')
+                raise
+        return added
+
+    def list_reminders(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, message, time, scheduled_at FROM reminders ORDER BY scheduled_at, id'
+            ).fetchall()
+        return [self._reminder(row) for row in rows]
+
+    def pop_due_reminders(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        cutoff = now.isoformat()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    'SELECT id, message, time, scheduled_at FROM reminders WHERE scheduled_at <= ? ORDER BY scheduled_at, id',
+                    (cutoff,)
+                ).fetchall()
+                self._conn.execute('DELETE FROM reminders WHERE scheduled_at <= ?', (cutoff,))
+                self._conn.execute('COMMIT')
+            except sqlite3.Error:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [self._reminder(row) for row in rows]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def migrate_json_to_sqlite(source: JSONStorage, target: SQLiteStorage) -> Dict[str, int]:
+    """
+    Copy notes and reminders from the JSON files into SQLite, once.
+
+    Args:
+        source (JSONStorage): Store to read from.
+        target (SQLiteStorage): Store to write to.
+
+    Returns:
+        Dict[str, int]: Number of notes and reminders copied; zeros if already migrated.
+    """
+    if target.get_meta('migrated_from_json'):
+        logger.info("%s already migrated, skipping.", target.path)
+        return {'notes': 0, 'reminders': 0}
+    notes = source.list_notes()
+    reminders = source.list_reminders()
+    with target._lock:
+        conn = target._conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT INTO notes (body) VALUES (?)', ((n,) for n in notes))
+            # Legacy ids were len+1 and may collide, so let SQLite assign fresh ones.
+            conn.executemany(
+                'INSERT INTO reminders (message, time, scheduled_at) VALUES (?, ?, ?)',
+                ((r['message'], r.get('time', ''), r['scheduled_at']) for r in reminders)
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                ('migrated_from_json', datetime.datetime.now().isoformat())
+            )
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+    logger.info("Migrated %d notes and %d reminders to %s", len(notes), len(reminders), target.path)
+    return {'notes': len(notes), 'reminders': len(reminders)}
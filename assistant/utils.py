@@ -1,47 +1,135 @@
 import json
 import os
-import ast
+import shutil
 import datetime
-import threading
 import logging
-from typing import Dict, List, Union, Optional, Any
-from functools import lru_cache
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple, Union, Optional, Any
+from assistant import metrics
+from assistant.logs import SAMPLED
+from assistant.fileio import FileLock, atomic_write
+from assistant.storage import StorageEngine, BinaryStorage, JSONStorage, SQLiteStorage, migrate_json_to_sqlite
+from assistant.notefile import binary_to_json, json_to_binary
+from assistant.notemeta import NoteMetadata, normalize_tag
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Search, scheduling, calculation and caching are imported by the functions
+# that use them, so commands that don't need them start faster.
+if TYPE_CHECKING:
+    from assistant.search import SearchIndex
+    from assistant.cache import ResponseCache
+    from assistant.scheduler import ReminderScheduler
+
+# Library loggers only; the CLI configures output, see assistant.logs
+logger = logging.getLogger(__name__)
 
 DATA_DIR = 'data'
 
+# Storage backend selection: 'json' (default), 'binary' or 'sqlite'
+STORAGE_ENV = 'ASSISTANT_STORAGE'
+_storage_engines: Dict[tuple, StorageEngine] = {}
+_search_indexes: Dict[tuple, 'SearchIndex'] = {}
+_note_metadata: Dict[tuple, NoteMetadata] = {}
+_response_caches: Dict[str, 'ResponseCache'] = {}
+# Guards creating the shared resources above when several threads (e.g. daemon workers) start at once
+_resources_lock = threading.Lock()
+
+# Socket of a running 'serve' daemon; set ASSISTANT_DAEMON=off to ignore it
+DAEMON_SOCKET = 'assistant.sock'
+DAEMON_ENV = 'ASSISTANT_DAEMON'
+
 def ensure_data_dir() -> None:
     """Ensure the data directory exists."""
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
-@lru_cache(maxsize=10)
+def _notes_lock() -> FileLock:
+    """
+    Lock held while notes are written, shared by threads and processes.
+
+    Storage, the search index and note metadata each number notes by
+    insertion order, so every add must reach all three before another
+    writer starts, or their ids drift apart.
+    """
+    ensure_data_dir()
+    return FileLock(os.path.join(DATA_DIR, 'notes'))
+
+# Parsed JSON documents by path, with the (inode, size, mtime) they were read at
+_documents: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+_documents_lock = threading.Lock()
+DOCUMENT_CACHE_SIZE = 10
+
+def _signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+@metrics.timed('assistant_load_data_seconds')
+def _read_document(full_path: str) -> Dict[str, Any]:
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        # Keep the damaged file for recovery rather than letting the next save overwrite it
+        quarantine = f"{full_path}.corrupt-{int(datetime.datetime.now().timestamp())}"
+        os.replace(full_path, quarantine)
+        logger.error("Corrupted data in %s (%s); moved it to %s and starting empty.", full_path, e, quarantine)
+        return {}
+    logger.debug("Data loaded from %s", full_path, extra=SAMPLED)
+    return data
+
 def load_data(file_path: str) -> Dict[str, Any]:
     """
     Load data from a JSON file with caching.
 
+    Cached documents are checked against the file's inode, size and mtime on
+    every call, so changes saved by other processes are picked up.
+
     Args:
         file_path (str): Path to the JSON file.
 
     Returns:
-        Dict[str, Any]: Loaded data, or empty dict if file missing or corrupted.
+        Dict[str, Any]: Loaded data, or empty dict if the file is missing or corrupted.
     """
     full_path = os.path.join(DATA_DIR, file_path)
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        logging.info(f"Data loaded from {full_path}")
-        return data
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logging.warning(f"Failed to load data from {full_path}: {e}. Returning empty dict.")
+        signature = _signature(os.stat(full_path))
+    except FileNotFoundError as e:
+        logger.warning("Failed to load data from %s: %s. Returning empty dict.", full_path, e)
+        return {}
+    with _documents_lock:
+        cached = _documents.get(full_path)
+        if cached is not None and cached[0] == signature:
+            _documents.move_to_end(full_path)
+            return cached[1]
+    try:
+        data = _read_document(full_path)
+    except FileNotFoundError as e:
+        logger.warning("Failed to load data from %s: %s. Returning empty dict.", full_path, e)
         return {}
+    with _documents_lock:
+        _documents[full_path] = (signature, data)
+        _documents.move_to_end(full_path)
+        while len(_documents) > DOCUMENT_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return data
 
+def clear_document_cache() -> None:
+    """Forget every cached document."""
+    with _documents_lock:
+        _documents.clear()
+
+# Same interface as the lru_cache this cache replaced
+load_data.cache_clear = clear_document_cache
+
+@metrics.timed('assistant_save_data_seconds')
 def save_data(file_path: str, data: Dict[str, Any]) -> None:
     """
     Save data to a JSON file.
 
+    The file is replaced atomically, so a crash mid-write leaves the previous
+    version intact. Read-modify-write callers should hold ``FileLock`` on the
+    file so concurrent processes don't lose each other's updates.
+
     Args:
         file_path (str): Path to the JSON file.
         data (Dict[str, Any]): Data to save.
@@ -52,27 +140,286 @@ def save_data(file_path: str, data: Dict[str, Any]) -> None:
     ensure_data_dir()
     full_path = os.path.join(DATA_DIR, file_path)
     try:
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        logging.info(f"Data saved to {full_path}")
-        load_data.cache_clear()  # Invalidate cache
+        atomic_write(full_path, json.dumps(data, indent=4, ensure_ascii=False))
+        logger.debug("Data saved to %s", full_path, extra=SAMPLED)
     except IOError as e:
-        logging.error(f"Failed to save data to {full_path}: {e}")
+        logger.error("Failed to save data to %s: %s", full_path, e)
         raise
+    finally:
+        # Callers may have modified the cached document in place
+        with _documents_lock:
+            _documents.pop(full_path, None)
+
+def _backend_name(backend: Optional[str] = None) -> str:
+    return (backend or os.getenv(STORAGE_ENV) or 'json').lower()
+
+def get_storage(backend: Optional[str] = None) -> StorageEngine:
+    """
+    Get the storage engine for the current DATA_DIR.
+
+    Args:
+        backend (Optional[str]): 'json', 'binary' or 'sqlite'. Defaults to the ASSISTANT_STORAGE
+            environment variable, or 'json' if unset.
+
+    Returns:
+        StorageEngine: A shared engine instance.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = _backend_name(backend)
+    key = (backend, os.path.abspath(DATA_DIR))
+    engine = _storage_engines.get(key)
+    if engine is not None:
+        return engine
+    with _resources_lock:
+        engine = _storage_engines.get(key)
+        if engine is None:
+            ensure_data_dir()
+            if backend == 'json':
+                engine = JSONStorage(DATA_DIR, load_data, save_data)
+            elif backend == 'binary':
+                engine = BinaryStorage(DATA_DIR, load_data, save_data)
+            elif backend == 'sqlite':
+                engine = SQLiteStorage(DATA_DIR)
+            else:
+                raise ValueError(f"Unknown storage backend: {backend}")
+            _storage_engines[key] = engine
+    return engine
+
+def get_search_index(backend: Optional[str] = None) -> 'SearchIndex':
+    """
+    Get the full-text index for a store, building it on first use.
+
+    Args:
+        backend (Optional[str]): As for get_storage; the configured store if None.
+
+    Returns:
+        SearchIndex: A shared index instance.
+    """
+    storage = get_storage(backend)
+    key = (storage.name, os.path.abspath(DATA_DIR))
+    index = _search_indexes.get(key)
+    if index is not None:
+        return index
+    from assistant.search import SearchIndex
+    # Building from storage must not interleave with add_note
+    with _notes_lock():
+        index = _search_indexes.get(key)
+        if index is None:
+            index = SearchIndex(os.path.join(DATA_DIR, f"search-{storage.name}.db"))
+            if len(index) == 0:
+                notes = storage.list_notes()
+                if notes:
+                    index.add_many(notes)
+                    logger.info("Indexed %d existing notes", len(notes))
+            _search_indexes[key] = index
+    return index
+
+def get_note_metadata(backend: Optional[str] = None) -> NoteMetadata:
+    """
+    Get the tags and creation times of notes in a store.
+
+    Notes saved before metadata existed are given entries (untagged, with
+    no known time) the first time it is opened.
+
+    Args:
+        backend (Optional[str]): As for get_storage; the configured store if None.
+
+    Returns:
+        NoteMetadata: A shared instance, aligned with the search index's note ids.
+    """
+    storage = get_storage(backend)
+    key = (storage.name, os.path.abspath(DATA_DIR))
+    meta = _note_metadata.get(key)
+    if meta is not None:
+        return meta
+    index = get_search_index(backend)
+    with _notes_lock():
+        meta = _note_metadata.get(key)
+        if meta is None:
+            meta = NoteMetadata(_note_metadata_prefix(storage.name))
+            meta.sync(len(index))
+            _note_metadata[key] = meta
+    return meta
+
+def _note_metadata_prefix(backend: str) -> str:
+    return os.path.join(DATA_DIR, f"meta-{backend}")
+
+def _copy_note_metadata(source: str, target: str) -> None:
+    """Carry tags and times over to a backend the notes were just copied to, unless it has its own."""
+    source_prefix, target_prefix = _note_metadata_prefix(source), _note_metadata_prefix(target)
+    if os.path.exists(f"{target_prefix}.created"):
+        return
+    for suffix in ('.tags', '.created'):
+        if os.path.exists(source_prefix + suffix):
+            shutil.copyfile(source_prefix + suffix, target_prefix + suffix)
 
-def add_note(note: str) -> None:
+def get_response_cache() -> 'ResponseCache':
     """
-    Add a note to the notes file.
+    Get the persistent cache of online answers for the current DATA_DIR.
+
+    Limits come from ASSISTANT_CACHE_TTL (seconds), ASSISTANT_CACHE_MAX_ENTRIES
+    and ASSISTANT_CACHE_MAX_BYTES.
+
+    Returns:
+        ResponseCache: A shared cache instance.
+    """
+    key = os.path.abspath(DATA_DIR)
+    cache = _response_caches.get(key)
+    if cache is not None:
+        return cache
+    from assistant.cache import ResponseCache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+    with _resources_lock:
+        cache = _response_caches.get(key)
+        if cache is None:
+            ensure_data_dir()
+            cache = ResponseCache(
+                os.path.join(DATA_DIR, 'cache.db'),
+                ttl=float(os.getenv('ASSISTANT_CACHE_TTL', DEFAULT_TTL)),
+                max_entries=int(os.getenv('ASSISTANT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(os.getenv('ASSISTANT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+            )
+            _response_caches[key] = cache
+    return cache
+
+def close_storage() -> None:
+    """Close and forget every open storage engine, search index, note metadata and response cache."""
+    _note_metadata.clear()
+    while _response_caches:
+        _, cache = _response_caches.popitem()
+        cache.close()
+    while _search_indexes:
+        _, index = _search_indexes.popitem()
+        index.close()
+    while _storage_engines:
+        _, engine = _storage_engines.popitem()
+        engine.close()
+
+def migrate_to_sqlite() -> Dict[str, int]:
+    """
+    Copy existing JSON notes and reminders into the SQLite store, once.
+
+    The notes go after any already in SQLite, so its search index is
+    rebuilt and their tags and times are appended to its metadata.
+
+    Returns:
+        Dict[str, int]: Number of notes and reminders migrated.
+    """
+    index = get_search_index('sqlite')
+    meta = get_note_metadata('sqlite')
+    storage = get_storage('sqlite')
+    with _notes_lock():
+        counts = migrate_json_to_sqlite(get_storage('json'), storage)
+        if counts['notes']:
+            index.clear()
+            index.add_many(storage.list_notes())
+            meta.extend(NoteMetadata(_note_metadata_prefix('json')), counts['notes'])
+            # JSON notes that predate metadata have no entries yet
+            meta.sync(len(index))
+    return counts
+
+def convert_notes(to: str) -> int:
+    """
+    Copy notes between the JSON store and the binary note file.
+
+    Reminders are kept in ``reminders.json`` by both, so only notes move.
+    The JSON journal is compacted first, so the conversion works on the
+    ``notes.json`` snapshot alone.
+
+    Args:
+        to (str): 'binary' or 'json'.
+
+    Returns:
+        int: Number of notes converted.
+
+    Raises:
+        ValueError: If the format is unknown or the target already has notes.
+    """
+    if to not in ('binary', 'json'):
+        raise ValueError(f"Unknown note format: {to}")
+    json_store = get_storage('json')
+    binary_store = get_storage('binary')
+    snapshot = os.path.join(DATA_DIR, 'notes.json')
+    with _notes_lock():
+        if to == 'binary':
+            if len(binary_store.notes):
+                raise ValueError("The binary note file already has notes")
+            json_store.compact()
+            converted = json_to_binary(snapshot, binary_store.notes)
+        else:
+            if next(json_store.iter_notes(limit=1), None) is not None:
+                raise ValueError("The JSON store already has notes")
+            converted = binary_to_json(binary_store.notes, snapshot)
+        if converted:
+            _copy_note_metadata('json' if to == 'binary' else 'binary', to)
+    return converted
+
+@metrics.timed('assistant_add_note_seconds')
+def add_note(note: str, tags: Optional[List[str]] = None) -> None:
+    """
+    Add a note to the configured store.
 
     Args:
         note (str): The note to add.
+        tags (Optional[List[str]]): Tags for the note, e.g. ['work'].
+
+    Raises:
+        ValueError: If a tag is not a single word.
+    """
+    tags = [normalize_tag(tag) for tag in tags or ()]
+    ensure_data_dir()
+    index = get_search_index()
+    meta = get_note_metadata()
+    with _notes_lock():
+        get_storage().add_note(note)
+        meta.add([index.add(note)], tags)
+
+@metrics.timed('assistant_add_notes_seconds')
+def add_notes(notes: List[str]) -> int:
+    """
+    Add a batch of notes with one write to the store and one index transaction.
+
+    Args:
+        notes (List[str]): The notes to add, in order.
+
+    Returns:
+        int: Number of notes added.
+    """
+    ensure_data_dir()
+    index = get_search_index()
+    meta = get_note_metadata()
+    with _notes_lock():
+        get_storage().add_notes(notes)
+        meta.add(index.add_many(notes))
+    return len(notes)
+
+@metrics.timed('assistant_add_notes_seconds')
+def add_note_records(records: List[Dict[str, Any]]) -> int:
+    """
+    Add a batch of notes that keep their own tags and creation times, e.g. from an import.
+
+    Args:
+        records (List[Dict[str, Any]]): Dicts with ``note`` and optionally
+            ``tags`` (a list) and ``created`` (Unix time; now if missing).
+
+    Returns:
+        int: Number of notes added.
+
+    Raises:
+        ValueError: If a tag is not a single word.
     """
-    notes = load_data('notes.json')
-    if 'notes' not in notes:
-        notes['notes'] = []
-    notes['notes'].append(note)
-    save_data('notes.json', notes)
+    tags = [[normalize_tag(tag) for tag in record.get('tags') or ()] for record in records]
+    notes = [record['note'] for record in records]
+    ensure_data_dir()
+    index = get_search_index()
+    meta = get_note_metadata()
+    with _notes_lock():
+        get_storage().add_notes(notes)
+        meta.add_many(index.add_many(notes), tags, [record.get('created') for record in records])
+    return len(notes)
 
+@metrics.timed('assistant_list_notes_seconds')
 def list_notes() -> List[str]:
     """
     List all notes.
@@ -80,13 +427,151 @@ def list_notes() -> List[str]:
     Returns:
         List[str]: List of notes.
     """
-    notes = load_data('notes.json')
-    return notes.get('notes', [])
+    return get_storage().list_notes()
+
+def iter_notes(offset: int = 0, limit: Optional[int] = None, reverse: bool = False,
+               tags: Optional[List[str]] = None, since: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Stream notes with their numbers instead of listing them all at once.
+
+    Filtering by tags or date intersects the tag bitmaps and the creation
+    time range first, then reads only the matching notes.
+
+    Args:
+        offset (int): Notes to skip from the start (or from the end, with ``reverse``).
+        limit (Optional[int]): Maximum number of notes; None for all.
+        reverse (bool): Newest first.
+        tags (Optional[List[str]]): Only notes carrying all of these tags.
+        since (Optional[str]): Only notes added on or after this ISO date or datetime (local time).
+
+    Returns:
+        Iterator[Tuple[int, str]]: (number, note) pairs; notes are numbered from 1 in insertion order.
+
+    Raises:
+        ValueError: If ``since`` is not an ISO date or a tag is invalid.
+    """
+    if not tags and since is None:
+        return get_storage().iter_notes(offset, limit, reverse)
+    cutoff = datetime.datetime.fromisoformat(since).timestamp() if since is not None else None
+    ensure_data_dir()
+    ids = get_note_metadata().select(tags or (), cutoff, reverse)
+    return _read_notes(islice(ids, offset, None if limit is None else offset + limit))
+
+def _read_notes(ids: Iterable[int], batch: int = 500) -> Iterator[Tuple[int, str]]:
+    """Fetch notes by id from the store in batches, so bodies come from the notes themselves."""
+    storage = get_storage()
+    ids = iter(ids)
+    while True:
+        chunk = list(islice(ids, batch))
+        if not chunk:
+            return
+        yield from storage.get_notes(chunk)
+
+def iter_note_records(offset: int = 0, limit: Optional[int] = None, reverse: bool = False,
+                      tags: Optional[List[str]] = None, since: Optional[str] = None,
+                      batch: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Stream notes with their tags and creation times, e.g. for an export.
+
+    Takes the same arguments as :func:`iter_notes`.
+
+    Returns:
+        Iterator[Dict[str, Any]]: Records with ``id``, ``note``, ``tags`` (a
+        sorted list) and ``created`` (an ISO local datetime, or None if unknown).
+    """
+    notes = iter_notes(offset, limit, reverse, tags, since)
+    meta = get_note_metadata()
+    while True:
+        chunk = list(islice(notes, batch))
+        if not chunk:
+            return
+        tagged = meta.tags_for([number for number, _ in chunk])
+        for number, note in chunk:
+            created = meta.created(number)
+            yield {'id': number, 'note': note, 'tags': tagged.get(number, []),
+                   'created': None if created is None else
+                   datetime.datetime.fromtimestamp(created).isoformat(timespec='seconds')}
+
+def note_tags() -> Dict[str, int]:
+    """
+    Count the notes carrying each tag.
+
+    Returns:
+        Dict[str, int]: Tag -> number of notes, sorted by tag.
+    """
+    ensure_data_dir()
+    return get_note_metadata().tag_counts()
+
+@metrics.timed('assistant_search_notes_seconds')
+def search_notes(query: str, limit: int = 10) -> List[tuple]:
+    """
+    Search notes by keyword.
+
+    Args:
+        query (str): Terms to AND together, 'OR' between groups, 'term*' for prefixes.
+        limit (int): Maximum number of results.
+
+    Returns:
+        List[tuple]: (note id, note, score) tuples, best match first.
+    """
+    ensure_data_dir()
+    return get_search_index().search(query, limit)
+
+@metrics.timed('assistant_retrieve_notes_seconds')
+def retrieve_notes(text: str, limit: int = 3) -> List[tuple]:
+    """
+    Find the notes most relevant to free text, such as a question, by BM25.
+
+    Args:
+        text (str): The text to match; any of its words may match.
+        limit (int): Maximum number of results.
+
+    Returns:
+        List[tuple]: (note id, note, score) tuples, best match first; empty
+        if there is no search index yet.
+    """
+    # A read path: never create the data directory or build an index just to find nothing
+    name = _backend_name()
+    if (name, os.path.abspath(DATA_DIR)) not in _search_indexes and \
+            not os.path.exists(os.path.join(DATA_DIR, f"search-{name}.db")):
+        return []
+    return get_search_index().rank(text, limit)
+
+def reindex_notes() -> int:
+    """
+    Rebuild the full-text index from the notes store.
+
+    Returns:
+        int: Number of notes indexed.
+    """
+    ensure_data_dir()
+    index = get_search_index()
+    with _notes_lock():
+        index.clear()
+        return len(index.add_many(get_storage().list_notes()))
+
+def compact_notes() -> int:
+    """
+    Compact the notes store (folds the JSON journal into notes.json).
+
+    Returns:
+        int: Number of journaled notes merged.
+    """
+    ensure_data_dir()
+    return get_storage().compact()
+
+def _announce(reminder: Dict[str, Any]) -> None:
+    print(f"[REMINDER] {reminder['message']}")
+    logger.info("Reminder triggered: %s", reminder['message'])
 
 def schedule_reminder(message: str, time_str: str) -> None:
     """
     Schedule a reminder at the specified time.
 
+    The reminder is saved to storage and handed to the reminder scheduler,
+    either the one running in this process or a 'scheduler' process
+    started from the CLI.
+
     Args:
         message (str): Reminder message.
         time_str (str): Time in HH:MM format.
@@ -94,50 +579,123 @@ def schedule_reminder(message: str, time_str: str) -> None:
     Raises:
         ValueError: If time format is invalid.
     """
+    ensure_data_dir()
+    storage = get_storage()
     try:
         time_obj = datetime.datetime.strptime(time_str, '%H:%M').time()
         now = datetime.datetime.now()
         reminder_time = datetime.datetime.combine(now.date(), time_obj)
         if reminder_time < now:
             reminder_time += datetime.timedelta(days=1)  # Next day if time passed
-        delay = (reminder_time - now).total_seconds()
-
-        reminders = load_data('reminders.json')
-        if 'reminders' not in reminders:
-            reminders['reminders'] = []
-        reminders['reminders'].append({
-            'message': message,
-            'time': time_str,
-            'scheduled_at': reminder_time.isoformat(),
-            'id': len(reminders['reminders']) + 1
-        })
-        save_data('reminders.json', reminders)
-
-        threading.Timer(delay, lambda: print(f"[REMINDER] {message}")).start()
-        logging.info(f"Reminder scheduled for {time_str}: {message}")
+
+        reminder = storage.add_reminder(message, time_str, reminder_time)
+        from assistant.scheduler import get_active_scheduler, notify_scheduler
+        scheduler = get_active_scheduler()
+        if scheduler is not None and scheduler.storage is storage:
+            scheduler.add(reminder)
+        else:
+            notify_scheduler(DATA_DIR, [reminder])
+        logger.info("Reminder scheduled for %s: %s", time_str, message)
     except ValueError as e:
-        logging.error(f"Invalid time format {time_str}: {e}")
+        logger.error("Invalid time format %s: %s", time_str, e)
         raise
 
-def check_reminders() -> None:
+def add_reminders(reminders: List[Dict[str, Any]]) -> int:
+    """
+    Add a batch of reminders at their exact times, e.g. from an import.
+
+    Args:
+        reminders (List[Dict[str, Any]]): Reminders with ``message`` and an
+            ISO-8601 ``scheduled_at``; ``time`` (HH:MM) defaults to the
+            scheduled time of day. Times with a UTC offset are converted to
+            local time, as reminders are scheduled in.
+
+    Returns:
+        int: Number of reminders added.
+
+    Raises:
+        ValueError: If a reminder lacks a message or has an invalid time.
+    """
+    entries = []
+    for reminder in reminders:
+        if not reminder.get('message'):
+            raise ValueError(f"Reminder without a message: {reminder}")
+        scheduled_at = datetime.datetime.fromisoformat(reminder['scheduled_at'])
+        if scheduled_at.tzinfo is not None:
+            # Stored times are naive local ones; mixing in aware ones breaks comparisons and sorting
+            scheduled_at = scheduled_at.astimezone().replace(tzinfo=None)
+        entries.append((reminder['message'], reminder.get('time') or scheduled_at.strftime('%H:%M'), scheduled_at))
+    ensure_data_dir()
+    storage = get_storage()
+    added = storage.add_reminders(entries)
+    from assistant.scheduler import get_active_scheduler, notify_scheduler
+    scheduler = get_active_scheduler()
+    if scheduler is not None and scheduler.storage is storage:
+        for reminder in added:
+            scheduler.add(reminder)
+    elif added:
+        notify_scheduler(DATA_DIR, added)
+    return len(added)
+
+@metrics.timed('assistant_check_reminders_seconds')
+def check_reminders(announce: bool = True) -> List[Dict[str, Any]]:
     """
     Check and alert for due reminders, then remove them.
+
+    Args:
+        announce (bool): Print each due reminder.
+
+    Returns:
+        List[Dict[str, Any]]: The reminders that were due.
     """
-    reminders = load_data('reminders.json')
-    if 'reminders' not in reminders:
-        return
     now = datetime.datetime.now()
-    updated_reminders = []
-    for rem in reminders['reminders']:
-        rem_time = datetime.datetime.fromisoformat(rem['scheduled_at'])
-        if rem_time <= now:
-            print(f"[REMINDER] {rem['message']}")
-            logging.info(f"Reminder triggered: {rem['message']}")
-        else:
-            updated_reminders.append(rem)
-    reminders['reminders'] = updated_reminders
-    save_data('reminders.json', reminders)
+    due = get_storage().pop_due_reminders(now)
+    if announce:
+        for rem in due:
+            _announce(rem)
+    return due
 
+def run_scheduler() -> None:
+    """
+    Run the reminder scheduler in the foreground until interrupted.
+    """
+    from assistant.scheduler import ReminderScheduler
+    ensure_data_dir()
+    ReminderScheduler(get_storage(), notify=_announce).run_forever(DATA_DIR)
+
+def start_scheduler() -> 'ReminderScheduler':
+    """
+    Start the reminder scheduler on a background thread of this process.
+
+    It listens on ``scheduler.sock`` in DATA_DIR like the 'scheduler'
+    command, so reminders saved by other processes reach it.
+
+    Returns:
+        ReminderScheduler: The running scheduler; call ``stop()`` when done.
+    """
+    from assistant.scheduler import ReminderScheduler
+    ensure_data_dir()
+    scheduler = ReminderScheduler(get_storage(), notify=_announce)
+    scheduler.start(DATA_DIR)
+    return scheduler
+
+def daemon_socket_path() -> Optional[str]:
+    """
+    Locate the socket of a daemon serving the current DATA_DIR.
+
+    Only checks that the socket file exists; connecting may still fail if the
+    daemon died without cleaning up.
+
+    Returns:
+        Optional[str]: The socket path, or None if there is no daemon or
+        ASSISTANT_DAEMON is 'off'.
+    """
+    if os.getenv(DAEMON_ENV, '').lower() in ('off', '0', 'false', 'no'):
+        return None
+    path = os.path.join(DATA_DIR, DAEMON_SOCKET)
+    return path if os.path.exists(path) else None
+
+@metrics.timed('assistant_safe_calc_seconds')
 def safe_calc(expression: str) -> Union[float, str]:
     """
     Safely evaluate a mathematical expression.
@@ -148,22 +706,35 @@ def safe_calc(expression: str) -> Union[float, str]:
     Returns:
         Union[float, str]: Result or error message.
     """
+    from assistant.calc import evaluate
     try:
-        # Use eval with restricted environment for basic math
-        import math
-        safe_dict = {
-            'abs': abs,
-            'round': round,
-            'min': min,
-            'max': max,
-            'math': math,
-            '__builtins__': {}
-        }
-        result = eval(expression, safe_dict)
+        result = evaluate(expression)
         if isinstance(result, (int, float)):
             return result
         else:
             return "Error: Expression must evaluate to a number."
     except Exception as e:
-        logging.error(f"Calculation error for '{expression}': {e}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        logger.error("Calculation error for '%s': %s", expression, e)
+        return f"Error: {str(e)}"
+
+def safe_calc_range(expression: str, ranges: List[str]) -> Any:
+    """
+    Evaluate an expression over numeric ranges in one vectorized pass.
+
+    Args:
+        expression (str): The expression to evaluate, e.g. 'sin(x)*x**2'.
+        ranges (List[str]): Range variables as 'name=start:stop[:step]'.
+
+    Returns:
+        Any: A NumPy array of results, or an error message.
+    """
+    from assistant.calc import evaluate_range, parse_range
+    try:
+        parsed = {}
+        for spec in ranges:
+            name, start, stop, step = parse_range(spec)
+            parsed[name] = (start, stop, step)
+        return evaluate_range(expression, parsed)
+    except Exception as e:
+        logger.error("Calculation error for '%s': %s", expression, e)
+        return f"Error: {str(e)}"
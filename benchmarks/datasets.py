@@ -0,0 +1,87 @@
+import os
+import json
+import random
+import datetime
+from typing import Any, Dict, List
+
+WORDS = (
+    "buy milk call mom meeting project deadline review code deploy release budget invoice "
+    "dentist gym run book flight hotel groceries birthday gift report slides email client "
+    "team sync lunch dinner pay rent fix bug write docs plan trip water plants backup laptop"
+).split()
+
+SHORT_QUESTIONS = [
+    "hi", "what time is it?", "tell me a joke", "what's the date today?", "who are you?",
+    "thanks", "help", "what's the weather?", "bye", "how are you?",
+]
+
+def make_notes(count: int, seed: int = 0) -> List[str]:
+    """
+    Generate notes of 3-12 words drawn from a small vocabulary.
+
+    Args:
+        count (int): Number of notes.
+        seed (int): Random seed, so runs are comparable.
+
+    Returns:
+        List[str]: The notes.
+    """
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.randint(3, 12))) for _ in range(count)]
+
+def make_reminders(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate reminders spread over the next 30 days, in the JSON store's format.
+
+    Args:
+        count (int): Number of reminders.
+        seed (int): Random seed.
+
+    Returns:
+        List[Dict[str, Any]]: The reminders.
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    reminders = []
+    for i in range(count):
+        at = now + datetime.timedelta(minutes=rng.randint(1, 30 * 24 * 60))
+        reminders.append({'message': f"reminder {i}", 'time': at.strftime('%H:%M'),
+                          'scheduled_at': at.isoformat(), 'id': i + 1})
+    return reminders
+
+def make_questions(count: int, long: bool = False, seed: int = 0) -> List[str]:
+    """
+    Generate questions: short greetings and intents, or long run-on paragraphs.
+
+    Long questions are around 100 words with any intent keyword near the end,
+    the worst case for keyword matching.
+
+    Args:
+        count (int): Number of questions.
+        long (bool): Generate long questions.
+        seed (int): Random seed.
+
+    Returns:
+        List[str]: The questions.
+    """
+    rng = random.Random(seed)
+    if not long:
+        return [rng.choice(SHORT_QUESTIONS) for _ in range(count)]
+    return [' '.join(rng.choices(WORDS, k=100)) + ' ' + rng.choice(SHORT_QUESTIONS) for _ in range(count)]
+
+def write_json_store(data_dir: str, notes: List[str], reminders: List[Dict[str, Any]]) -> None:
+    """
+    Write notes and reminders straight into the JSON store's files.
+
+    Much faster than adding them one at a time, for building large datasets.
+
+    Args:
+        data_dir (str): Data directory.
+        notes (List[str]): Notes for notes.json.
+        reminders (List[Dict[str, Any]]): Reminders for reminders.json.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, 'notes.json'), 'w', encoding='utf-8') as f:
+        json.dump({'notes': notes}, f)
+    with open(os.path.join(data_dir, 'reminders.json'), 'w', encoding='utf-8') as f:
+        json.dump({'reminders': reminders}, f)
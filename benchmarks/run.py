@@ -0,0 +1,410 @@
+"""
+Benchmark runner for the assistant's hot paths.
+
+    python -m benchmarks.run --notes 1000 100000 --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+
+Results are written as JSON: per benchmark, the iteration count, latency
+percentiles in milliseconds and throughput. With --baseline, each
+benchmark's median is compared against the saved run and the exit status
+is 1 if any got slower by more than the threshold. Benchmarks with a
+fixed budget (importing the CLI must take under STARTUP_BUDGET_MS) fail
+the run whenever their median is over it, baseline or not.
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import assistant.utils
+from assistant.utils import close_storage
+from benchmarks.datasets import make_notes, make_questions, make_reminders, write_json_store, WORDS
+
+DEFAULT_NOTE_SIZES = [1000, 10000]
+DEFAULT_THRESHOLD = 0.2
+COMPARED_METRIC = 'p50_ms'
+# Cold-start target for importing the CLI, in milliseconds
+STARTUP_BUDGET_MS = 200
+
+Result = Dict[str, Any]
+
+class Skip(Exception):
+    """Raised by a benchmark that cannot run here, e.g. a missing optional dependency."""
+
+# (name, function) in run order; functions yield (result name, result)
+BENCHMARKS: List[Tuple[str, Callable[['argparse.Namespace'], Iterator[Tuple[str, Result]]]]] = []
+
+def benchmark(name: str) -> Callable:
+    def register(func: Callable) -> Callable:
+        BENCHMARKS.append((name, func))
+        return func
+    return register
+
+def summarize(samples: List[float]) -> Result:
+    """
+    Summarize per-operation timings.
+
+    Args:
+        samples (List[float]): Seconds per operation.
+
+    Returns:
+        Result: iterations, mean/min/max and p50/p90/p99 in milliseconds, and ops_per_sec.
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(p: float) -> float:
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(p / 100 * count) - 1)] * 1000
+
+    total = sum(ordered)
+    return {
+        'iterations': count,
+        'mean_ms': total / count * 1000,
+        'min_ms': ordered[0] * 1000,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+        'ops_per_sec': count / total if total else float('inf'),
+    }
+
+def measure(op: Callable[..., Any], items: Optional[Iterable[Any]] = None, iterations: int = 0) -> Result:
+    """
+    Time ``op`` once per item, or ``iterations`` times with no arguments.
+
+    Args:
+        op (Callable): The operation.
+        items (Iterable[Any]): Argument for each call.
+        iterations (int): Number of calls when there are no items.
+
+    Returns:
+        Result: Summary from ``summarize``.
+    """
+    samples = []
+    clock = time.perf_counter
+    if items is None:
+        for _ in range(iterations):
+            started = clock()
+            op()
+            samples.append(clock() - started)
+    else:
+        for item in items:
+            started = clock()
+            op(item)
+            samples.append(clock() - started)
+    return summarize(samples)
+
+class TempDataDir:
+    """Point assistant.utils at a fresh temporary DATA_DIR for the duration of a block."""
+
+    def __init__(self, backend: str = 'json'):
+        self.backend = backend
+
+    def __enter__(self) -> str:
+        self.path = tempfile.mkdtemp(prefix='assistant-bench-')
+        self.saved = (assistant.utils.DATA_DIR, os.environ.get(assistant.utils.STORAGE_ENV))
+        assistant.utils.DATA_DIR = self.path
+        os.environ[assistant.utils.STORAGE_ENV] = self.backend
+        return self.path
+
+    def __exit__(self, *exc: Any) -> None:
+        close_storage()
+        assistant.utils.load_data.cache_clear()
+        assistant.utils.DATA_DIR, backend = self.saved
+        if backend is None:
+            os.environ.pop(assistant.utils.STORAGE_ENV, None)
+        else:
+            os.environ[assistant.utils.STORAGE_ENV] = backend
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def populate(path: str, backend: str, notes: List[str], reminders: List[Dict[str, Any]]) -> None:
+    write_json_store(path, notes, reminders)
+    if backend == 'sqlite':
+        assistant.utils.migrate_to_sqlite()
+    elif backend == 'binary':
+        assistant.utils.convert_notes('binary')
+
+@benchmark('offline_answer')
+def bench_offline_answer(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.ai_module import get_offline_answer, conversation_context
+    for kind in ('short', 'long'):
+        questions = make_questions(args.questions, long=kind == 'long')
+        conversation_context.clear()
+        yield f"offline_answer[{kind}]", measure(get_offline_answer, questions)
+
+@benchmark('calc')
+def bench_calc(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.utils import safe_calc
+    yield 'calc[cached]', measure(safe_calc, ['sqrt(2) * pi + 3 ** 4 - abs(-7) / 2'] * args.questions * 10)
+    yield 'calc[uncached]', measure(safe_calc, [f"{i} * 2 + sqrt({i}) - {i} ** 2 / 3" for i in range(args.questions * 2)])
+
+@benchmark('note_add')
+def bench_note_add(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.utils import add_note, add_notes
+    notes = make_notes(args.questions)
+    batches = [make_notes(1000, seed=i) for i in range(5)]
+    for backend in ('json', 'binary', 'sqlite'):
+        with TempDataDir(backend):
+            yield f"note_add[{backend}]", measure(add_note, notes)
+            # Bulk import path: one store write and one index transaction per 1000 notes
+            yield f"note_add_batch[{backend}]", measure(add_notes, batches)
+
+@benchmark('notes')
+def bench_notes(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.utils import list_notes, iter_notes, search_notes, retrieve_notes, get_search_index
+    queries = WORDS[:50] + [f"{word[:3]}*" for word in WORDS[:25]] + [f"{a} {b}" for a, b in zip(WORDS, WORDS[1:26])]
+    for size in args.notes:
+        notes = make_notes(size)
+        for backend in ('json', 'binary', 'sqlite'):
+            with TempDataDir(backend) as path:
+                populate(path, backend, notes, [])
+                list_notes()  # warm the document cache, as a long-lived process would
+                yield f"note_list[{backend},{size}]", measure(list_notes, iterations=max(3, min(100, 1000000 // size)))
+                yield f"note_newest_page[{backend},{size}]", measure(lambda: list(iter_notes(limit=20, reverse=True)), iterations=100)
+                get_search_index()  # built once from storage; not part of the query time
+                yield f"note_search[{backend},{size}]", measure(lambda query: search_notes(query, limit=10), queries)
+                yield f"note_retrieve[{backend},{size}]", measure(retrieve_notes, make_notes(100, seed=1))
+
+@benchmark('reminders')
+def bench_reminders(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.utils import check_reminders, get_storage
+    from assistant.scheduler import ReminderScheduler
+    reminders = make_reminders(args.reminders)
+    for backend in ('json', 'sqlite'):
+        with TempDataDir(backend) as path:
+            populate(path, backend, [], reminders)
+            # Nothing is due, so every call scans the pending reminders without removing any
+            yield f"reminders_check[{backend},{args.reminders}]", measure(lambda: check_reminders(announce=False), iterations=20)
+            scheduler = ReminderScheduler(get_storage(), notify=lambda reminder: None)
+            yield f"scheduler_reload[{backend},{args.reminders}]", measure(scheduler.reload, iterations=20)
+
+def import_time(module: str, env: Dict[str, str]) -> float:
+    """Seconds a fresh interpreter spends importing ``module``, as reported by ``-X importtime``."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        _, _, cumulative, name = [part.strip() for part in line.replace(':', '|', 1).split('|')]
+        if name == module and cumulative.isdigit():
+            return int(cumulative) / 1e6
+    raise RuntimeError(f"No import time reported for {module}")
+
+@benchmark('startup')
+def bench_startup(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    env = dict(os.environ, PYTHONPATH=ROOT, ASSISTANT_DAEMON='off')
+    samples = [import_time('assistant.cli', env) for _ in range(args.startup_runs)]
+    yield 'cli_import', dict(summarize(samples), budget_ms=STARTUP_BUDGET_MS)
+    commands = {
+        'python': [sys.executable, '-c', 'pass'],
+        'calc': [sys.executable, '-m', 'assistant.cli', 'calc', '1+1'],
+        'note_list': [sys.executable, '-m', 'assistant.cli', 'note', 'list'],
+    }
+    with tempfile.TemporaryDirectory(prefix='assistant-bench-') as cwd:
+        for name, command in commands.items():
+            run = lambda: subprocess.run(command, cwd=cwd, env=env, check=True,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            yield f"cli_startup[{name}]", measure(run, iterations=args.startup_runs)
+
+@benchmark('online')
+def bench_online(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.ai_module import get_answer, get_answers, online_cache_key, reset_router, REQUESTS_AVAILABLE
+    from assistant.providers import module_available, reset_providers
+    from assistant.utils import get_response_cache
+    questions = make_questions(args.questions)
+
+    with TempDataDir():
+        cache = get_response_cache()
+        for question in set(questions):
+            cache.put(online_cache_key(question), 'cached answer')
+        yield 'online[cached]', measure(lambda question: get_answer(question, online=True), questions)
+
+    if not (module_available('openai') and REQUESTS_AVAILABLE):
+        raise Skip("openai and requests are needed for the fake-server benchmarks")
+    from tests.fake_server import FakeOpenAIServer
+    saved = dict(os.environ)
+    try:
+        with FakeOpenAIServer(delay=args.server_delay) as server, TempDataDir():
+            os.environ.update({'OPENAI_API_KEY': 'benchmark', 'OPENAI_BASE_URL': server.base_url})
+            reset_providers()
+            reset_router()
+            distinct = [f"{question} #{i}" for i, question in enumerate(questions[:200])]
+            yield 'online[fake_server]', measure(lambda question: get_answer(question, online=True, use_cache=False), distinct)
+            started = time.perf_counter()
+            get_answers(distinct, online=True, concurrency=8, use_cache=False)
+            elapsed = time.perf_counter() - started
+            yield 'online_batch[fake_server,8]', {'iterations': len(distinct), 'total_ms': elapsed * 1000,
+                                                  'ops_per_sec': len(distinct) / elapsed}
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+        reset_providers()
+        reset_router()
+
+@benchmark('router')
+def bench_router(args: argparse.Namespace) -> Iterator[Tuple[str, Result]]:
+    from assistant.providers import Provider
+    from assistant.router import ProviderRouter
+
+    class SimulatedProvider(Provider):
+        # Answers in `latency` seconds, except every `stall_every`-th request which takes `stall` seconds
+        def __init__(self, latency: float, stall: float = 0.0, stall_every: int = 0):
+            super().__init__('key', 'model', max_retries=0)
+            self.latency, self.stall, self.stall_every = latency, stall, stall_every
+            self.requests = 0
+
+        def request(self, question: str, params: Dict[str, Any]) -> str:
+            self.requests += 1
+            stalled = self.stall_every and self.requests % self.stall_every == 0
+            time.sleep(self.stall if stalled else self.latency)
+            return question
+
+    questions = make_questions(args.questions)
+    providers = {'primary': SimulatedProvider(0.002, stall=0.2, stall_every=50), 'secondary': SimulatedProvider(0.004)}
+    yield 'router[direct]', measure(lambda question: providers['primary'].complete(question, {}), questions)
+    router = ProviderRouter(list(providers), providers.__getitem__, hedge_delay=0.01)
+    try:
+        yield 'router[hedged]', measure(lambda question: router.complete(question, {}), questions)
+    finally:
+        router.close()
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], threshold: float,
+            metric: str = COMPARED_METRIC) -> List[Dict[str, Any]]:
+    """
+    Compare results against a baseline run.
+
+    Args:
+        results (Dict[str, Result]): Current results by benchmark name.
+        baseline (Dict[str, Result]): Baseline results by benchmark name.
+        threshold (float): Allowed slowdown as a fraction, e.g. 0.2 for 20%.
+        metric (str): Latency metric to compare.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per benchmark present in both, with
+        ``name``, ``baseline``, ``current``, ``change`` and ``regression``.
+    """
+    comparison = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        comparison.append({'name': name, 'baseline': before, 'current': after,
+                           'change': change, 'regression': change > threshold})
+    return comparison
+
+def check_budgets(results: Dict[str, Result], metric: str = COMPARED_METRIC) -> List[Dict[str, Any]]:
+    """
+    Check results that carry a ``budget_ms`` against it.
+
+    Args:
+        results (Dict[str, Result]): Results by benchmark name.
+        metric (str): Latency metric to check.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per budgeted benchmark, with ``name``,
+        ``budget``, ``current`` and ``over``.
+    """
+    return [{'name': name, 'budget': result['budget_ms'], 'current': result[metric],
+             'over': result[metric] > result['budget_ms']}
+            for name, result in results.items() if 'budget_ms' in result and metric in result]
+
+def run(selected: List[str], args: argparse.Namespace) -> Dict[str, Result]:
+    """
+    Run the selected benchmarks.
+
+    Args:
+        selected (List[str]): Benchmark names; empty for all.
+        args (argparse.Namespace): Dataset sizes and options.
+
+    Returns:
+        Dict[str, Result]: Results by name; skipped benchmarks carry ``skipped``.
+    """
+    results: Dict[str, Result] = {}
+    for name, func in BENCHMARKS:
+        if selected and name not in selected:
+            continue
+        try:
+            for result_name, result in func(args):
+                results[result_name] = result
+                sys.stderr.write(f"{result_name:<36} p50 {result.get('p50_ms', 0):10.3f} ms  "
+                                 f"{result['ops_per_sec']:12.1f} ops/s\n")
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+            sys.stderr.write(f"{name:<36} skipped: {e}\n")
+    return results
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the assistant's hot paths.")
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f"Benchmarks to run (default: all): {', '.join(name for name, _ in BENCHMARKS)}")
+    parser.add_argument('--notes', type=int, nargs='+', default=DEFAULT_NOTE_SIZES,
+                        help='Note counts for the list/search datasets, e.g. 1000 100000 1000000')
+    parser.add_argument('--reminders', type=int, default=10000, help='Pending reminders in the reminder dataset')
+    parser.add_argument('--questions', type=int, default=1000, help='Questions per Q&A benchmark')
+    parser.add_argument('--startup-runs', type=int, default=10, help='Process launches per startup benchmark')
+    parser.add_argument('--server-delay', type=float, default=0.0, help='Seconds of latency added by the fake server')
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='Results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed {COMPARED_METRIC} slowdown before failing, as a fraction (default 0.2)')
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - {name for name, _ in BENCHMARKS}
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    logging.getLogger().setLevel(logging.WARNING)
+    report: Dict[str, Any] = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'notes': args.notes,
+            'reminders': args.reminders,
+            'questions': args.questions,
+        },
+        'results': run(args.benchmarks, args),
+    }
+    status = 0
+    report['budgets'] = check_budgets(report['results'])
+    for entry in report['budgets']:
+        if entry['over']:
+            sys.stderr.write(f"OVER BUDGET {entry['name']}: {entry['current']:.3f} ms "
+                             f"(budget {entry['budget']} ms)\n")
+            status = 1
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        report['threshold'] = args.threshold
+        report['comparison'] = compare(report['results'], baseline, args.threshold)
+        for entry in report['comparison']:
+            if entry['regression']:
+                sys.stderr.write(f"REGRESSION {entry['name']}: {entry['baseline']:.3f} -> "
+                                 f"{entry['current']:.3f} ms ({entry['change']:+.0%})\n")
+                status = 1
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        question = body.get('messages', [{}])[-1].get('content', '')
+        payload = json.dumps({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.server.answer(question)},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the OpenAI chat completions endpoint.
+
+    Point a client at ``server.base_url``. ``connections`` and ``requests``
+    count TCP connections and requests served, and ``delay`` adds latency.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0, answer=lambda question: f"Echo: {question}"):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.delay = delay
+        self.answer = answer
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -1,10 +1,23 @@
+import os
 import unittest
+import tempfile
+import shutil
 from unittest.mock import patch
-from assistant.ai_module import get_offline_answer, get_answer, conversation_context
+import assistant.utils
+from assistant.utils import add_note, close_storage, get_response_cache, save_data
+from assistant.providers import reset_providers, ProviderUnavailable
+from assistant.ai_module import get_offline_answer, get_answer, stream_answer, conversation_context, IntentMatcher, OFFLINE_INTENTS, OFFLINE_RESPONSES, FOLLOW_UP_KEYWORDS
 
 class TestAIModule(unittest.TestCase):
     def setUp(self):
         conversation_context.clear()
+        reset_providers()
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
 
     def test_get_offline_answer_known(self):
         answer = get_offline_answer('What is your name?')
@@ -19,10 +32,69 @@ class TestAIModule(unittest.TestCase):
         answer = get_offline_answer('Tell me more')
         self.assertIn('precisely', answer)
 
+    def test_get_offline_answer_sessions_isolated(self):
+        get_offline_answer('What time is it?', session_id='alice')
+        get_offline_answer('What is the date today?', session_id='bob')
+        self.assertIn('precisely', get_offline_answer('Tell me more', session_id='alice'))
+        self.assertNotIn('precisely', get_offline_answer('Tell me more', session_id='bob'))
+        self.assertNotIn('last_topic', conversation_context)
+
+    def test_get_answer_session(self):
+        get_answer('What time is it?', session_id='carol')
+        self.assertIn('precisely', get_answer('Tell me more', session_id='carol'))
+        self.assertNotIn('precisely', get_answer('Tell me more'))
+
     def test_get_offline_answer_unknown(self):
         answer = get_offline_answer('Unknown question xyz')
         self.assertIn("don't understand", answer)
 
+    def test_get_offline_answer_creates_nothing(self):
+        assistant.utils.DATA_DIR = os.path.join(self.test_dir, 'missing')
+        self.assertIn("don't understand", get_offline_answer('Unknown question xyz'))
+        self.assertFalse(os.path.exists(assistant.utils.DATA_DIR))
+        # Notes but no index yet: still nothing is built or created
+        assistant.utils.DATA_DIR = self.test_dir
+        save_data('notes.json', {'notes': ['wifi password is hunter2']})
+        names = sorted(os.listdir(self.test_dir))
+        get_offline_answer('What was the wifi password again?')
+        self.assertEqual(sorted(os.listdir(self.test_dir)), names)
+
+    def test_get_offline_answer_from_notes(self):
+        add_note('The wifi password is hunter2')
+        add_note('Buy milk')
+        answer = get_offline_answer('What was the wifi password again?')
+        self.assertIn('From your notes', answer)
+        self.assertIn('hunter2', answer)
+        self.assertNotIn('milk', answer)
+
+    def test_get_offline_answer_intent_before_notes(self):
+        add_note('Joke for the party')
+        self.assertIn('scientists', get_offline_answer('Tell me a joke'))
+
+    def test_get_offline_answer_priority(self):
+        # 'hello' comes first in the text but the name intent ranks higher.
+        answer = get_offline_answer('Hello there, what is your name?')
+        self.assertIn('Mini AI Assistant', answer)
+
+    def test_get_offline_answer_long_input(self):
+        answer = get_offline_answer('lorem ipsum ' * 2000 + 'tell me a joke')
+        self.assertIn('scientists', answer)
+
+    def test_intent_matcher_agrees_with_regex_table(self):
+        matcher = IntentMatcher(OFFLINE_INTENTS, FOLLOW_UP_KEYWORDS)
+        patterns = list(OFFLINE_RESPONSES)
+        questions = ['What is your name?', 'hi', 'this is it', 'thanks a lot', 'I think so',
+                     'what can you do', 'whatever', 'add a note', 'notes please', 'goodbye!',
+                     'how are you today', 'exit', 'reminder at noon', 'compute 2+2', 'nothing here']
+        for question in questions:
+            expected = next((i for i, p in enumerate(patterns) if p.search(question)), None)
+            self.assertEqual(matcher.classify(question.lower())[0], expected, question)
+
+    def test_intent_matcher_follow_up(self):
+        matcher = IntentMatcher(OFFLINE_INTENTS, FOLLOW_UP_KEYWORDS)
+        self.assertEqual(matcher.classify('tell me more'), (None, True))
+        self.assertEqual(matcher.classify('tell them'), (None, False))
+
     def test_get_answer_offline(self):
         answer = get_answer('Hello', online=False)
         self.assertIn('[OFFLINE]', answer)
@@ -46,5 +118,53 @@ class TestAIModule(unittest.TestCase):
         answer = get_answer('Question', online=True)
         self.assertIn('[OFFLINE]', answer)
 
+    @patch('assistant.ai_module.get_online_answer')
+    def test_get_answer_online_cached(self, mock_online):
+        mock_online.return_value = "Cached response"
+        self.assertEqual(get_answer('What is  Python?', online=True), '[ONLINE] Cached response')
+        self.assertEqual(get_answer('what is python?', online=True), '[ONLINE] Cached response')
+        mock_online.assert_called_once()
+        stats = get_response_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    @patch('assistant.ai_module.get_online_answer')
+    def test_get_answer_no_cache(self, mock_online):
+        mock_online.return_value = "Fresh response"
+        get_answer('Question', online=True, use_cache=False)
+        get_answer('Question', online=True, use_cache=False)
+        self.assertEqual(mock_online.call_count, 2)
+        self.assertEqual(get_response_cache().stats()['entries'], 0)
+
+    @patch('assistant.ai_module.get_online_answer')
+    def test_get_answer_errors_not_cached(self, mock_online):
+        mock_online.return_value = "Error querying OpenAI: timeout"
+        get_answer('Question', online=True)
+        self.assertEqual(get_response_cache().stats()['entries'], 0)
+
+    @patch('assistant.ai_module.get_online_answer')
+    def test_get_answer_missing_key_falls_back(self, mock_online):
+        mock_online.return_value = "OpenAI API key not set. Set OPENAI_API_KEY environment variable."
+        answer = get_answer('Hello', online=True)
+        self.assertIn('[OFFLINE]', answer)
+        self.assertEqual(get_response_cache().stats()['entries'], 0)
+
+    @patch('assistant.ai_module._stream_online')
+    def test_stream_answer_online(self, mock_stream):
+        mock_stream.return_value = iter(['Stre', 'amed'])
+        self.assertEqual(list(stream_answer('Q', online=True)), ['[ONLINE] ', 'Stre', 'amed'])
+        # Completed answers are cached and served whole.
+        self.assertEqual(list(stream_answer('Q', online=True)), ['[ONLINE] Streamed'])
+        self.assertEqual(get_answer('Q', online=True), '[ONLINE] Streamed')
+
+    @patch('assistant.ai_module._stream_online')
+    def test_stream_answer_falls_back(self, mock_stream):
+        mock_stream.side_effect = ProviderUnavailable('OpenAI API key not set.')
+        chunks = list(stream_answer('Tell me a joke', online=True))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith('[OFFLINE]'))
+
+    def test_stream_answer_offline(self):
+        self.assertEqual(''.join(stream_answer('Tell me a joke')), get_answer('Tell me a joke'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
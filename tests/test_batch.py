@@ -0,0 +1,98 @@
+import unittest
+import io
+import json
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+from assistant.batch import TokenBucket, ask_batch, read_questions, run_batch
+from assistant.ai_module import get_answers
+
+def collect(items, **kwargs):
+    async def run():
+        return [r async for r in ask_batch(items, **kwargs)]
+    return asyncio.run(run())
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate_limit(self):
+        async def run():
+            bucket = TokenBucket(rate=50, capacity=1)
+            start = time.monotonic()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.monotonic() - start
+        self.assertGreaterEqual(asyncio.run(run()), 0.09)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+class TestReadQuestions(unittest.TestCase):
+    def test_formats(self):
+        lines = ['"plain"\n', '\n', '{"id": 7, "question": "with id"}\n', 'not json\n', '{"id": 8}\n']
+        items = list(read_questions(lines))
+        self.assertEqual(items[0], {'question': 'plain'})
+        self.assertEqual(items[1], {'id': 7, 'question': 'with id'})
+        self.assertIsNone(items[2]['question'])
+        self.assertIn('line 4', items[2]['error'])
+        self.assertEqual(items[3]['id'], 8)
+        self.assertIn('error', items[3])
+
+class TestAskBatch(unittest.TestCase):
+    def setUp(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def fake_answer(self, question, online=False, use_cache=True, session_id=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(float(question) / 1000)
+        with self.lock:
+            self.active -= 1
+        return f"[ONLINE] answer {question}"
+
+    def test_input_order_and_concurrency_cap(self):
+        items = [{'question': q} for q in ['40', '5', '30', '1', '20', '10']]
+        with patch('assistant.batch.get_answer', side_effect=self.fake_answer):
+            results = collect(items, concurrency=3)
+        self.assertEqual([r['index'] for r in results], list(range(6)))
+        self.assertEqual(results[0], {'index': 0, 'question': '40', 'source': 'online', 'answer': 'answer 40'})
+        self.assertLessEqual(self.peak, 3)
+        self.assertGreater(self.peak, 1)
+
+    def test_completion_order(self):
+        items = [{'question': '60'}, {'question': '1'}]
+        with patch('assistant.batch.get_answer', side_effect=self.fake_answer):
+            results = collect(items, concurrency=2, ordered=False)
+        self.assertEqual([r['index'] for r in results], [1, 0])
+
+    def test_provider_failure_falls_back_offline(self):
+        items = [{'id': 'a', 'question': 'Tell me a joke'}]
+        with patch('assistant.batch.get_answer', side_effect=RuntimeError('down')):
+            results = collect(items)
+        self.assertEqual(results[0]['source'], 'offline')
+        self.assertEqual(results[0]['id'], 'a')
+        self.assertIn('scientists', results[0]['answer'])
+
+    def test_invalid_items_reported(self):
+        results = collect([{'question': None, 'error': 'line 1: bad'}])
+        self.assertEqual(results, [{'index': 0, 'question': None, 'error': 'line 1: bad'}])
+
+    def test_get_answers(self):
+        answers = get_answers(['Hello', 'Tell me a joke'])
+        self.assertTrue(answers[0].startswith('[OFFLINE] Hello'))
+        self.assertIn('scientists', answers[1])
+
+    def test_run_batch_writes_jsonl(self):
+        stdin = io.StringIO('"Hello"\n{"id": 2, "question": "Tell me a joke"}\n')
+        stdout = io.StringIO()
+        with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+            self.assertEqual(run_batch('-'), 2)
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([r['index'] for r in records], [0, 1])
+        self.assertEqual(records[1]['id'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import io
+import json
+import unittest
+import tempfile
+from contextlib import redirect_stderr
+from benchmarks.run import check_budgets, compare, main, summarize
+from benchmarks.datasets import make_notes, make_questions, make_reminders
+
+class TestBenchmarks(unittest.TestCase):
+    def test_summarize(self):
+        result = summarize([0.001 * i for i in range(1, 101)])
+        self.assertEqual(result['iterations'], 100)
+        self.assertAlmostEqual(result['p50_ms'], 50, delta=1)
+        self.assertAlmostEqual(result['p99_ms'], 99, delta=1)
+        self.assertAlmostEqual(result['ops_per_sec'], 100 / 5.05, places=3)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'p50_ms': 1.0}, 'b': {'p50_ms': 2.0}, 'gone': {'p50_ms': 1.0}}
+        results = {'a': {'p50_ms': 1.1}, 'b': {'p50_ms': 3.0}, 'new': {'p50_ms': 1.0}, 'c': {'skipped': 'x'}}
+        comparison = {entry['name']: entry for entry in compare(results, baseline, 0.2)}
+        self.assertEqual(set(comparison), {'a', 'b'})
+        self.assertFalse(comparison['a']['regression'])
+        self.assertTrue(comparison['b']['regression'])
+        self.assertAlmostEqual(comparison['b']['change'], 0.5)
+
+    def test_budgets(self):
+        results = {'fast': {'p50_ms': 50.0, 'budget_ms': 200}, 'slow': {'p50_ms': 250.0, 'budget_ms': 200},
+                   'unbudgeted': {'p50_ms': 1000.0}}
+        budgets = {entry['name']: entry['over'] for entry in check_budgets(results)}
+        self.assertEqual(budgets, {'fast': False, 'slow': True})
+
+    def test_datasets_are_deterministic(self):
+        self.assertEqual(make_notes(50), make_notes(50))
+        self.assertEqual(len(make_reminders(10)), 10)
+        self.assertTrue(all(len(q.split()) > 100 for q in make_questions(5, long=True)))
+
+    def test_run_and_compare_against_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            args = ['calc', 'note_add', '--questions', '20', '--output', output]
+            with redirect_stderr(io.StringIO()):
+                self.assertEqual(main(args), 0)
+            with open(output, 'r', encoding='utf-8') as f:
+                results = json.load(f)['results']
+            self.assertEqual(set(results), {'calc[cached]', 'calc[uncached]'} |
+                             {f"{name}[{backend}]" for name in ('note_add', 'note_add_batch')
+                              for backend in ('json', 'binary', 'sqlite')})
+
+            # A baseline that is impossibly fast makes every benchmark a regression
+            for result in results.values():
+                result['p50_ms'] = 1e-9
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(baseline, 'w', encoding='utf-8') as f:
+                json.dump({'results': results}, f)
+            with redirect_stderr(io.StringIO()) as errors:
+                self.assertEqual(main(['calc', '--questions', '20', '--output', output, '--baseline', baseline]), 1)
+            self.assertIn('REGRESSION calc[cached]', errors.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
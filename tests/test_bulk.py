@@ -0,0 +1,181 @@
+import unittest
+import os
+import io
+import json
+import datetime
+import tempfile
+import shutil
+from unittest.mock import patch
+import assistant.utils
+from assistant.utils import (add_note_records, add_reminders, check_reminders, close_storage, get_storage,
+                             iter_note_records, list_notes, search_notes)
+from assistant.bulk import (Checkpoint, NOTE_FIELDS, REMINDER_FIELDS, export_records, import_records,
+                            note_from_record, reminder_from_record)
+from assistant.cli import main
+
+class TestImport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = os.path.join(self.test_dir, 'data')
+        assistant.utils.load_data.cache_clear()
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_jsonl_notes_in_batches(self):
+        path = self.write_file('notes.jsonl', '"one"\n{"note": "two"}\n\n"three"\n')
+        batches, progress = [], []
+        counts = import_records(path, note_from_record, lambda batch: batches.append(list(batch)), 'note',
+                                batch_size=2, progress=progress.append)
+        self.assertEqual(counts, {'imported': 3, 'skipped': 0})
+        self.assertEqual([[r['note'] for r in batch] for batch in batches], [['one', 'two'], ['three']])
+        self.assertEqual(progress, [2, 3])
+
+    def test_csv_notes_into_store(self):
+        path = self.write_file('notes.csv', 'id,note\n1,"milk, eggs"\n2,"multi\nline"\n')
+        import_records(path, note_from_record, add_note_records, 'note')
+        self.assertEqual(list_notes(), ['milk, eggs', 'multi\nline'])
+        self.assertEqual(search_notes('eggs')[0][1], 'milk, eggs')
+
+    def test_bad_record_reports_number(self):
+        path = self.write_file('notes.jsonl', '"ok"\n{"text": "no note field"}\n')
+        with self.assertRaisesRegex(ValueError, 'Record 2: missing field'):
+            import_records(path, note_from_record, add_note_records, 'note')
+        with self.assertRaisesRegex(ValueError, 'Line 1'):
+            import_records(self.write_file('bad.jsonl', '{oops\n'), note_from_record, add_note_records, 'note')
+
+    def test_resume_from_checkpoint(self):
+        path = self.write_file('notes.jsonl', ''.join(f'"n{i}"\n' for i in range(5)))
+        checkpoint = path + '.checkpoint'
+        written = []
+
+        def failing_write(batch):
+            if len(written) >= 2:
+                raise OSError('disk full')
+            written.extend(batch)
+
+        with self.assertRaises(OSError):
+            import_records(path, note_from_record, failing_write, 'note', batch_size=2, checkpoint=checkpoint)
+        self.assertEqual(Checkpoint(checkpoint, path).load(), 2)
+        counts = import_records(path, note_from_record, written.extend, 'note', batch_size=2, checkpoint=checkpoint)
+        self.assertEqual(counts, {'imported': 3, 'skipped': 2})
+        self.assertEqual([r['note'] for r in written], [f'n{i}' for i in range(5)])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_checkpoint_for_other_source(self):
+        checkpoint = os.path.join(self.test_dir, 'import.checkpoint')
+        Checkpoint(checkpoint, 'a.jsonl').save(10)
+        with self.assertRaisesRegex(ValueError, 'remove it'):
+            Checkpoint(checkpoint, 'b.jsonl').load()
+
+    def test_reminders(self):
+        path = self.write_file('reminders.csv', 'message,time,scheduled_at\n'
+                                                'dentist,,2030-01-02T15:30:00\n'
+                                                'call,09:00,2030-01-03T09:00:00\n')
+        self.assertEqual(import_records(path, reminder_from_record, add_reminders, 'message')['imported'], 2)
+        reminders = get_storage().list_reminders()
+        self.assertEqual([(r['message'], r['time']) for r in reminders], [('dentist', '15:30'), ('call', '09:00')])
+        with self.assertRaisesRegex(ValueError, 'Record 1'):
+            import_records(self.write_file('bad.jsonl', '{"message": "x", "scheduled_at": "soon"}\n'),
+                           reminder_from_record, add_reminders, 'message')
+
+    def test_reminders_with_utc_offset(self):
+        past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+        path = self.write_file('offset.jsonl', json.dumps({'message': 'due', 'scheduled_at': past.isoformat()}) + '\n' +
+                               json.dumps({'message': 'later', 'scheduled_at': '2030-01-02T15:30:00+05:00'}) + '\n')
+        self.assertEqual(import_records(path, reminder_from_record, add_reminders, 'message')['imported'], 2)
+        later = datetime.datetime.fromisoformat('2030-01-02T15:30:00+05:00').astimezone().replace(tzinfo=None)
+        stored = {r['message']: r['scheduled_at'] for r in get_storage().list_reminders()}
+        self.assertEqual(stored['later'], later.isoformat())
+        self.assertEqual([r['message'] for r in check_reminders(announce=False)], ['due'])
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_jsonl_and_csv(self):
+        records = [{'id': 1, 'note': 'café', 'tags': ['home', 'food'], 'created': '2024-01-02T03:04:05'},
+                   {'id': 2, 'note': 'a, "b"', 'tags': [], 'created': None}]
+        jsonl = os.path.join(self.test_dir, 'notes.jsonl')
+        csv_path = os.path.join(self.test_dir, 'notes.csv')
+        self.assertEqual(export_records(iter(records), jsonl, NOTE_FIELDS), 2)
+        self.assertEqual(export_records(iter(records), csv_path, NOTE_FIELDS), 2)
+        with open(jsonl, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], records)
+        written = []
+        import_records(csv_path, note_from_record, written.extend, 'note')
+        created = datetime.datetime(2024, 1, 2, 3, 4, 5).timestamp()
+        self.assertEqual(written, [{'note': 'café', 'tags': ['food', 'home'], 'created': created},
+                                   {'note': 'a, "b"', 'tags': [], 'created': None}])
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['notes.csv', 'notes.jsonl'])
+
+    def test_failed_export_leaves_nothing(self):
+        def records():
+            yield {'id': 1, 'message': 'x'}
+            raise RuntimeError('storage went away')
+
+        with self.assertRaises(RuntimeError):
+            export_records(records(), os.path.join(self.test_dir, 'out.jsonl'), REMINDER_FIELDS)
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+class TestTransferCommands(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = os.path.join(self.test_dir, 'data')
+        assistant.utils.load_data.cache_clear()
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def run_cli(self, *argv):
+        with patch('sys.argv', ['cli.py', *argv]), patch('sys.stderr', new_callable=io.StringIO), \
+             patch('assistant.cli.print_success') as mock_success:
+            main()
+        return mock_success.call_args[0][0]
+
+    def test_notes_round_trip(self):
+        source = os.path.join(self.test_dir, 'in.jsonl')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write('{"note": "beta", "tags": "Work, urgent", "created": "2024-01-02T03:04:05"}\n"alpha"\n')
+        self.assertEqual(self.run_cli('note', 'import', source), 'Imported 2 notes.')
+        self.assertFalse(os.path.exists(source + '.checkpoint'))
+        target = os.path.join(self.test_dir, 'out.csv')
+        self.assertEqual(self.run_cli('note', 'export', target), f'Exported 2 notes to {target}.')
+        with open(target, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'id,note,tags,created')
+        self.assertEqual(lines[1], '1,beta,urgent work,2024-01-02T03:04:05')
+        self.assertTrue(lines[2].startswith('2,alpha,,'))
+
+        # Tags and times survive a move to another store
+        close_storage()
+        assistant.utils.DATA_DIR = os.path.join(self.test_dir, 'other')
+        self.assertEqual(self.run_cli('note', 'import', target), 'Imported 2 notes.')
+        moved = list(iter_note_records())
+        self.assertEqual(moved[0], {'id': 1, 'note': 'beta', 'tags': ['urgent', 'work'],
+                                    'created': '2024-01-02T03:04:05'})
+        self.assertEqual(moved[1]['tags'], [])
+
+    def test_failed_import_exits(self):
+        source = os.path.join(self.test_dir, 'in.jsonl')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write('[1, 2]\n')
+        with patch('sys.argv', ['cli.py', 'reminders', 'import', source]), \
+             patch('sys.stderr', new_callable=io.StringIO), patch('assistant.cli.print_error') as mock_error:
+            with self.assertRaises(SystemExit):
+                main()
+        self.assertIn('Line 1', mock_error.call_args[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest.mock import patch
+from assistant.cache import ResponseCache, cache_key, normalize_question
+
+class TestCacheKey(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_question('  What   IS\tthis? '), 'what is this?')
+
+    def test_key_depends_on_all_parts(self):
+        base = cache_key('Hi there', 'openai', 'gpt-4o-mini', {'temperature': 0.7})
+        self.assertEqual(base, cache_key('hi  THERE', 'openai', 'gpt-4o-mini', {'temperature': 0.7}))
+        self.assertNotEqual(base, cache_key('Hi there', 'gemini', 'gpt-4o-mini', {'temperature': 0.7}))
+        self.assertNotEqual(base, cache_key('Hi there', 'openai', 'gpt-4o', {'temperature': 0.7}))
+        self.assertNotEqual(base, cache_key('Hi there', 'openai', 'gpt-4o-mini', {'temperature': 0.1}))
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'cache.db')
+        self.cache = ResponseCache(self.path, ttl=60, max_entries=3)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get('k'))
+        self.cache.put('k', 'answer')
+        self.assertEqual(self.cache.get('k'), 'answer')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_persistent(self):
+        self.cache.put('k', 'answer')
+        self.cache.close()
+        self.cache = ResponseCache(self.path)
+        self.assertEqual(self.cache.get('k'), 'answer')
+
+    def test_ttl(self):
+        with patch('assistant.cache.time.time', return_value=1000.0):
+            self.cache.put('k', 'answer')
+        with patch('assistant.cache.time.time', return_value=1061.0):
+            self.assertIsNone(self.cache.get('k'))
+        self.assertEqual(self.cache.stats()['expired'], 1)
+
+    def test_lru_eviction(self):
+        self.cache.ttl = float('inf')
+        for i, key in enumerate(['a', 'b', 'c']):
+            with patch('assistant.cache.time.time', return_value=1000.0 + i):
+                self.cache.put(key, key)
+        with patch('assistant.cache.time.time', return_value=1010.0):
+            self.cache.get('a')
+            self.cache.put('d', 'd')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_size_eviction(self):
+        self.cache.max_bytes = 10
+        self.cache.put('a', 'x' * 6)
+        self.cache.put('b', 'y' * 6)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 'y' * 6)
+
+    def test_hits_batch_their_writes(self):
+        self.cache.put('k', 'answer')
+        writes = self.cache._conn.total_changes
+        for _ in range(10):
+            self.assertEqual(self.cache.get('k'), 'answer')
+        self.assertEqual(self.cache._conn.total_changes, writes)
+        self.cache.close()
+        self.cache = ResponseCache(self.path)
+        self.assertEqual(self.cache.stats()['hits'], 10)
+
+    def test_running_totals(self):
+        other = ResponseCache(self.path, max_entries=3)
+        self.cache.put('a', 'xx')
+        other.put('b', 'yyy')
+        self.cache.put('a', 'x')
+        other.put('c', 'z')
+        self.cache.put('d', 'w')
+        other.close()
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (3, 3, 1))
+        entries, size = self.cache._conn.execute('SELECT COUNT(*), SUM(size) FROM responses').fetchone()
+        self.assertEqual((entries, size), (3, 3))
+
+    def test_clear(self):
+        self.cache.put('k', 'answer')
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import math
+import sys
+import time
+from unittest.mock import patch
+import assistant.calc
+from assistant.calc import CalcError, compile_expression, evaluate, evaluate_range, parse_range, NUMPY_AVAILABLE
+
+class TestEvaluate(unittest.TestCase):
+    def test_arithmetic(self):
+        self.assertEqual(evaluate('2 + 3 * 4'), 14)
+        self.assertEqual(evaluate('-(7 // 2) % 4'), 1)
+        self.assertEqual(evaluate('2 ** 10'), 1024)
+
+    def test_math_functions(self):
+        self.assertAlmostEqual(evaluate('math.sqrt(16) + sin(0)'), 4.0)
+        self.assertAlmostEqual(evaluate('pi'), math.pi)
+        self.assertEqual(evaluate('max(1, abs(-5), round(2.6))'), 5)
+
+    def test_rejects_unsafe(self):
+        for expression in ['__import__("os")', '().__class__', 'open("x")', 'lambda: 1',
+                           'math.__dict__', '"a" * 3', '[1, 2]', 'x', '_pow(2, 3)', 'max(1, key=abs)']:
+            with self.assertRaises(CalcError, msg=expression):
+                evaluate(expression)
+
+    def test_huge_exponent_rejected(self):
+        with self.assertRaises(CalcError):
+            evaluate('9 ** 9 ** 9')
+
+    def test_huge_results_rejected_fast(self):
+        started = time.monotonic()
+        for expression in ['(9 ** 9999) ** 9999', 'factorial(10 ** 8)', 'math.factorial(10 ** 8)',
+                           'comb(10 ** 7, 5 * 10 ** 6)', 'math.perm(10 ** 7)']:
+            with self.assertRaises(CalcError, msg=expression):
+                evaluate(expression)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(evaluate('factorial(5) + comb(5, 2) + math.perm(4, 2)'), 142)
+        self.assertEqual(evaluate('1 ** 10 ** 100 + (-1) ** 10 ** 100'), 2)
+
+    @unittest.skipUnless(hasattr(sys, 'get_int_max_str_digits'), 'no integer printing limit')
+    def test_unprintable_result(self):
+        with self.assertRaises(CalcError):
+            evaluate('10 ** 5000')
+        from assistant.utils import safe_calc
+        self.assertTrue(safe_calc('10 ** 5000').startswith('Error: Result has too many digits'))
+
+    def test_syntax_error(self):
+        with self.assertRaises(CalcError):
+            evaluate('2 +')
+
+    def test_compiled_code_cached(self):
+        compile_expression.cache_clear()
+        evaluate('1 + 1')
+        evaluate('1 + 1')
+        self.assertEqual(compile_expression.cache_info().hits, 1)
+
+class TestRange(unittest.TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range('x=0:1e6:1'), ('x', 0.0, 1e6, 1.0))
+        self.assertEqual(parse_range('t=1:5'), ('t', 1.0, 5.0, 1.0))
+        for spec in ['x', 'x=1', '1x=0:1', 'x=a:b', 'x=0:1:0']:
+            with self.assertRaises(CalcError, msg=spec):
+                parse_range(spec)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+    def test_evaluate_range(self):
+        result = evaluate_range('sin(x)*x**2 + math.cos(x)', {'x': (0, 5, 1)})
+        expected = [math.sin(x) * x ** 2 + math.cos(x) for x in range(5)]
+        self.assertEqual(len(result), 5)
+        for got, want in zip(result, expected):
+            self.assertAlmostEqual(got, want)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+    def test_range_functions(self):
+        result = evaluate_range('log(x, 2) + math.asin(0) + math.log(x)', {'x': (1, 4, 1)})
+        for got, x in zip(result, range(1, 4)):
+            self.assertAlmostEqual(got, math.log(x, 2) + math.log(x))
+        # Functions with no NumPy counterpart are rejected, not looked up
+        for expression in ('factorial(x)', 'math.gamma(x)', 'lgamma(x)'):
+            with self.assertRaises(CalcError, msg=expression):
+                evaluate_range(expression, {'x': (1, 4, 1)})
+        self.assertEqual(evaluate('factorial(4)'), 24)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+    def test_range_size_limit(self):
+        for bounds in ((0, 1e12, 1), (0, float('inf'), 1)):
+            with self.assertRaises(CalcError, msg=bounds):
+                evaluate_range('x', {'x': bounds})
+
+    def test_evaluate_range_without_numpy(self):
+        with patch.object(assistant.calc, 'NUMPY_AVAILABLE', False):
+            with self.assertRaises(CalcError):
+                evaluate_range('x', {'x': (0, 1, 1)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
 import unittest
+import io
+import json
+import os
 import sys
+import subprocess
+import tempfile
 from unittest.mock import patch
-from assistant.cli import main
+from assistant.cli import main, OPTIONAL_MODULES
 
 class TestCLI(unittest.TestCase):
     @patch('assistant.cli.schedule_reminder')
@@ -17,17 +22,87 @@ class TestCLI(unittest.TestCase):
     def test_note_add_command(self, mock_print, mock_add):
         with patch('sys.argv', ['cli.py', 'note', 'add', 'Test note']):
             main()
-            mock_add.assert_called_with('Test note')
+            mock_add.assert_called_with('Test note', tags=[])
             mock_print.assert_called_with('Note added successfully.')
 
-    @patch('assistant.cli.list_notes')
+    @patch('assistant.cli.iter_notes')
     @patch('assistant.cli.display_notes')
-    def test_note_list_command(self, mock_display, mock_list):
-        mock_list.return_value = ['Note 1', 'Note 2']
-        with patch('sys.argv', ['cli.py', 'note', 'list']):
+    def test_note_list_command(self, mock_display, mock_iter):
+        mock_iter.return_value = iter([(1, 'Note 1'), (2, 'Note 2')])
+        mock_display.side_effect = lambda notes, fmt: len(list(notes))
+        with patch('sys.argv', ['cli.py', 'note', 'list', '--limit', '5', '--offset', '2', '--reverse']):
             main()
-            mock_list.assert_called()
-            mock_display.assert_called_with(['Note 1', 'Note 2'])
+            mock_iter.assert_called_with(2, 5, True, [], None)
+            self.assertEqual(mock_display.call_args[0][1], 'table')
+
+    @patch('assistant.cli.iter_note_records')
+    def test_note_list_jsonl(self, mock_iter):
+        records = [{'id': 1, 'note': 'Buy milk', 'tags': ['home'], 'created': '2024-01-02T03:04:05'},
+                   {'id': 2, 'note': 'Café', 'tags': [], 'created': None}]
+        mock_iter.return_value = iter(records)
+        with patch('sys.argv', ['cli.py', 'note', 'list', '--format', 'jsonl']), \
+             patch('sys.stdout', new_callable=io.StringIO) as out:
+            main()
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, records)
+
+    @patch('assistant.cli.add_note')
+    def test_note_add_with_tags(self, mock_add):
+        with patch('sys.argv', ['cli.py', 'note', 'add', 'Ship it', '--tag', 'work', '--tag', 'urgent']), \
+             patch('sys.stdout', new_callable=io.StringIO):
+            main()
+        mock_add.assert_called_with('Ship it', tags=['work', 'urgent'])
+
+    @patch('assistant.cli.add_note')
+    def test_note_add_rejects_bad_tag_before_writing(self, mock_add):
+        with patch('sys.argv', ['cli.py', 'note', 'add', 'x', '--tag', 'two words']), \
+             patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main()
+        mock_add.assert_not_called()
+
+    @patch('assistant.cli.print_error')
+    @patch('assistant.cli.add_note', side_effect=ValueError('Note 3 already has metadata'))
+    def test_note_add_failure_is_not_usage_error(self, mock_add, mock_error):
+        with patch('sys.argv', ['cli.py', 'note', 'add', 'x', '--tag', 'work']):
+            main()
+        mock_error.assert_called_with('Could not add note: Note 3 already has metadata')
+
+    @patch('assistant.cli.iter_notes')
+    def test_note_list_filters(self, mock_iter):
+        mock_iter.return_value = iter([(3, 'Ship it')])
+        with patch('sys.argv', ['cli.py', 'note', 'list', '--tag', 'work', '--since', '2026-01-01']), \
+             patch('sys.stdout', new_callable=io.StringIO):
+            main()
+        mock_iter.assert_called_with(0, None, False, ['work'], '2026-01-01')
+
+    def test_note_list_rejects_bad_date(self):
+        with patch('sys.argv', ['cli.py', 'note', 'list', '--since', 'yesterday']), patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main()
+
+    def test_note_list_rejects_negative_limit(self):
+        with patch('sys.argv', ['cli.py', 'note', 'list', '--limit', '-1']), patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main()
+
+    @patch('assistant.cli.search_notes')
+    @patch('assistant.cli.display_search_results')
+    def test_note_search_command(self, mock_display, mock_search):
+        mock_search.return_value = [(1, 'Buy milk', 1.5)]
+        with patch('sys.argv', ['cli.py', 'note', 'search', 'milk', '--limit', '5']):
+            main()
+            mock_search.assert_called_with('milk', limit=5)
+            mock_display.assert_called_with([(1, 'Buy milk', 1.5)])
+
+    @patch('assistant.cli.compact_notes')
+    @patch('assistant.cli.print_success')
+    def test_note_compact_command(self, mock_print, mock_compact):
+        mock_compact.return_value = 3
+        with patch('sys.argv', ['cli.py', 'note', 'compact']):
+            main()
+            mock_compact.assert_called()
+            mock_print.assert_called_with('Compacted 3 journaled notes.')
 
     @patch('assistant.cli.safe_calc')
     @patch('assistant.cli.print_success')
@@ -47,15 +122,74 @@ class TestCLI(unittest.TestCase):
             mock_calc.assert_called_with('invalid')
             mock_print.assert_called_with('Error: Invalid')
 
+    @patch('assistant.cli.safe_calc_range')
+    @patch('assistant.cli.print_error')
+    def test_calc_range_command(self, mock_print, mock_range):
+        mock_range.return_value = "Error: NumPy is required"
+        with patch('sys.argv', ['cli.py', 'calc', 'x*2', '--var', 'x=0:10']):
+            main()
+            mock_range.assert_called_with('x*2', ['x=0:10'])
+            mock_print.assert_called_with('Error: NumPy is required')
+
     @patch('assistant.cli.get_answer')
     @patch('assistant.cli.print_info')
     def test_ask_command(self, mock_print, mock_get):
         mock_get.return_value = '[OFFLINE] Answer'
         with patch('sys.argv', ['cli.py', 'ask', 'Question']):
             main()
-            mock_get.assert_called_with('Question', online=False)
+            mock_get.assert_called_with('Question', online=False, use_cache=True, session_id=None)
             mock_print.assert_called_with('[OFFLINE] Answer')
 
+    @patch('assistant.cli.get_answer')
+    @patch('assistant.cli.print_info')
+    def test_ask_command_no_cache(self, mock_print, mock_get):
+        mock_get.return_value = '[ONLINE] Answer'
+        with patch('sys.argv', ['cli.py', 'ask', 'Question', '--online', '--no-cache']):
+            main()
+            mock_get.assert_called_with('Question', online=True, use_cache=False, session_id=None)
+
+    @patch('assistant.cli.get_answer')
+    @patch('assistant.cli.print_info')
+    def test_ask_command_session(self, mock_print, mock_get):
+        mock_get.return_value = '[OFFLINE] Answer'
+        with patch('sys.argv', ['cli.py', 'ask', 'Tell me more', '--session', 'alice']):
+            main()
+            mock_get.assert_called_with('Tell me more', online=False, use_cache=True, session_id='alice')
+
+    @patch('assistant.cli.get_response_cache')
+    @patch('assistant.cli.print_success')
+    def test_cache_clear_command(self, mock_print, mock_cache):
+        mock_cache.return_value.clear.return_value = 4
+        with patch('sys.argv', ['cli.py', 'cache', 'clear']):
+            main()
+            mock_print.assert_called_with('Removed 4 cached responses.')
+
+    @patch('assistant.cli.stream_answer')
+    @patch('assistant.cli.print_stream')
+    def test_ask_stream_command(self, mock_print, mock_stream):
+        mock_stream.return_value = iter(['[ONLINE] ', 'Hi'])
+        with patch('sys.argv', ['cli.py', 'ask', 'Question', '--online', '--stream']):
+            main()
+            mock_stream.assert_called_with('Question', online=True, use_cache=True, session_id=None)
+            mock_print.assert_called_with(mock_stream.return_value)
+
+    @patch('assistant.batch.run_batch')
+    def test_ask_batch_command(self, mock_batch):
+        with patch('sys.argv', ['cli.py', 'ask', '--batch', 'q.jsonl', '--online', '--concurrency', '4',
+                                '--rate', '2.5', '--order', 'completion']):
+            main()
+            mock_batch.assert_called_with('q.jsonl', online=True, concurrency=4, rate=2.5,
+                                          ordered=False, use_cache=True)
+
+    @patch('assistant.batch.run_batch')
+    def test_ask_batch_rejects_bad_limits(self, mock_batch):
+        for option, value in (('--concurrency', '0'), ('--rate', '0'), ('--rate', '-1'), ('--rate', 'nan')):
+            with patch('sys.argv', ['cli.py', 'ask', '--batch', 'q.jsonl', option, value]), \
+                 patch('sys.stderr', new_callable=io.StringIO):
+                with self.assertRaises(SystemExit, msg=(option, value)):
+                    main()
+        mock_batch.assert_not_called()
+
     @patch('assistant.cli.check_reminders')
     @patch('assistant.cli.print_info')
     def test_check_command(self, mock_print, mock_check):
@@ -64,5 +198,59 @@ class TestCLI(unittest.TestCase):
             mock_check.assert_called()
             mock_print.assert_called_with('Reminders checked.')
 
+    @patch('assistant.cli.run_scheduler')
+    @patch('assistant.cli.print_info')
+    def test_scheduler_command(self, mock_print, mock_run):
+        with patch('sys.argv', ['cli.py', 'scheduler']):
+            main()
+            mock_run.assert_called()
+
+    @patch('assistant.cli.convert_notes')
+    @patch('assistant.cli.print_success')
+    def test_note_convert_command(self, mock_print, mock_convert):
+        mock_convert.return_value = 3
+        with patch('sys.argv', ['cli.py', 'note', 'convert', '--to', 'binary']), patch('assistant.cli.print_info'):
+            main()
+        mock_convert.assert_called_with('binary')
+        mock_print.assert_called_with("Converted 3 notes to the binary format.")
+
+    @patch('assistant.cli.migrate_to_sqlite')
+    @patch('assistant.cli.print_success')
+    def test_migrate_command(self, mock_print, mock_migrate):
+        mock_migrate.return_value = {'notes': 2, 'reminders': 1}
+        with patch('sys.argv', ['cli.py', 'migrate']):
+            main()
+            mock_migrate.assert_called()
+            mock_print.assert_called_with('Migrated 2 notes and 1 reminders to SQLite.')
+
+class TestStartup(unittest.TestCase):
+    ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def import_times(self):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import assistant.cli'],
+                                cwd=self.ROOT, capture_output=True, text=True, check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            _, _, cumulative, name = [part.strip() for part in line.replace(':', '|', 1).split('|')]
+            if cumulative.isdigit():
+                times[name] = int(cumulative) / 1000
+        return times
+
+    def test_offline_import_skips_optional_modules(self):
+        times = self.import_times()
+        self.assertEqual([name for name in OPTIONAL_MODULES if name in times], [])
+        for name in ('assistant.calc', 'assistant.cache', 'assistant.search', 'assistant.scheduler'):
+            self.assertNotIn(name, times)
+
+    def test_timings_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, PYTHONPATH=self.ROOT)
+            result = subprocess.run([sys.executable, '-m', 'assistant.cli', '--timings', 'note', 'list'],
+                                    cwd=tmp, env=env, capture_output=True, text=True, check=True)
+        self.assertIn('No notes found', result.stdout)
+        for phase in ('import', 'parse', 'run note', 'total'):
+            self.assertIn(phase, result.stderr)
+        self.assertIn('optional modules:', result.stderr)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
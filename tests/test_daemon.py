@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+import unittest
+import tempfile
+import shutil
+import threading
+from unittest.mock import Mock, patch
+import assistant.utils
+from assistant.utils import add_note, close_storage, daemon_socket_path, list_notes
+from assistant.daemon import AssistantDaemon, DaemonClient, DaemonError, DaemonUnavailable
+from assistant.cli import call, call_stream
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        self.server = AssistantDaemon(self.test_dir, workers=4)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self.thread.start()
+        self.path = daemon_socket_path()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_calls(self):
+        with DaemonClient(self.path) as client:
+            self.assertEqual(client.call('ping'), os.getpid())
+            client.call('add_note', 'Buy milk')
+            client.call('add_note', 'Call mom', tags=['family'])
+            self.assertEqual(client.call('list_notes'), ['Buy milk', 'Call mom'])
+            self.assertEqual(client.call('notes_page', 0, 1, True), [[2, 'Call mom']])
+            self.assertEqual(client.call('notes_page', 0, 5, False, ['family']), [[2, 'Call mom']])
+            self.assertEqual(client.call('note_tags'), {'family': 1})
+            self.assertEqual(client.call('search_notes', 'milk', limit=5)[0][:2], [1, 'Buy milk'])
+            self.assertEqual(client.call('safe_calc', '2 + 3'), 5)
+            self.assertIn('[OFFLINE]', client.call('get_answer', 'Tell me a joke'))
+
+    def test_cli_streams_notes_in_pages(self):
+        from assistant.cli import stream_notes
+        for i in range(5):
+            add_note(f"n{i}")
+        # Pages must come from the daemon, not the in-process store
+        with patch('assistant.cli.NOTES_PAGE_SIZE', 2), patch('assistant.cli.iter_notes', side_effect=AssertionError):
+            self.assertEqual([n for n, _ in stream_notes(offset=1, limit=3)], [2, 3, 4])
+            self.assertEqual([n for n, _ in stream_notes(reverse=True)], [5, 4, 3, 2, 1])
+
+    def test_errors(self):
+        with DaemonClient(self.path) as client:
+            with self.assertRaises(ValueError):
+                client.call('schedule_reminder', 'x', '25:99')
+            with self.assertRaises(DaemonError):
+                client.call('no_such_method')
+            # The connection survives failed calls
+            self.assertEqual(client.call('safe_calc', '1 + 1'), 2)
+
+    def test_concurrent_clients(self):
+        def worker(n):
+            with DaemonClient(self.path) as client:
+                for i in range(10):
+                    client.call('add_note', f"note {n}-{i}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        notes = list_notes()
+        self.assertEqual(len(notes), 80)
+        # Storage and search index agree on every note id
+        for note_id, body, _ in assistant.utils.search_notes('note', limit=100):
+            self.assertEqual(notes[note_id - 1], body)
+
+    def test_cli_uses_daemon(self):
+        with patch('assistant.cli.safe_calc') as local:
+            self.assertEqual(call('safe_calc', local, '6 * 7'), 42)
+            local.assert_not_called()
+
+    def test_stream_through_daemon(self):
+        from assistant.ai_module import sessions
+        local = Mock(side_effect=AssertionError)
+        chunks = list(call_stream('stream_answer', local, 'What time is it?', session_id='streamed'))
+        self.assertTrue(chunks[0].startswith('[OFFLINE] '))
+        local.assert_not_called()
+        # The question's context is kept by the daemon, for follow-ups in the same session
+        self.assertEqual(sessions.get('streamed', 'last_topic'), 'time')
+        with DaemonClient(self.path) as client:
+            with self.assertRaises(TypeError):
+                list(client.stream('stream_answer', 'x', no_such_option=True))
+            self.assertEqual(client.call('safe_calc', '1 + 1'), 2)
+
+    def test_due_reminders_returned_not_printed(self):
+        with DaemonClient(self.path) as client:
+            self.assertEqual(client.call('check_reminders', announce=False), [])
+
+class TestDaemonFallback(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_no_daemon_runs_in_process(self):
+        self.assertIsNone(daemon_socket_path())
+        self.assertEqual(call('safe_calc', assistant.utils.safe_calc, '2 * 4'), 8)
+
+    def test_stale_socket_falls_back(self):
+        path = os.path.join(self.test_dir, assistant.utils.DAEMON_SOCKET)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(path)  # bound but never listening, like a crashed daemon
+        with self.assertRaises(DaemonUnavailable):
+            DaemonClient(path)
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(call('safe_calc', assistant.utils.safe_calc, '2 * 4'), 8)
+
+    def test_disabled_by_environment(self):
+        open(os.path.join(self.test_dir, assistant.utils.DAEMON_SOCKET), 'w').close()
+        with patch.dict(os.environ, {'ASSISTANT_DAEMON': 'off'}):
+            self.assertIsNone(daemon_socket_path())
+
+class TestServeCommand(unittest.TestCase):
+    def test_serve_and_terminate(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data', assistant.utils.DAEMON_SOCKET)
+            proc = subprocess.Popen([sys.executable, '-m', 'assistant.cli', 'serve', '--workers', '2'], cwd=tmp,
+                                    env=dict(os.environ, PYTHONPATH=root),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                deadline = time.monotonic() + 10
+                while not os.path.exists(path) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                with DaemonClient(path) as client:
+                    self.assertEqual(client.call('ping'), proc.pid)
+                proc.terminate()
+                self.assertEqual(proc.wait(timeout=10), 0)
+                self.assertFalse(os.path.exists(path))
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+
+if __name__ == '__main__':
+    unittest.main()
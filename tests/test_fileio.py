@@ -0,0 +1,83 @@
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+from unittest.mock import patch
+from assistant import fileio
+from assistant.fileio import FileLock, atomic_write, fsync_enabled
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'data.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_replaces_contents(self):
+        atomic_write(self.path, 'old')
+        atomic_write(self.path, 'new ✓')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'new ✓')
+        self.assertEqual(os.listdir(self.test_dir), ['data.json'])
+
+    def test_failed_write_keeps_old_version(self):
+        atomic_write(self.path, 'old')
+        with patch('assistant.fileio.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                atomic_write(self.path, 'new')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.test_dir), ['data.json'])
+
+    def test_fsync_env(self):
+        with patch.dict(os.environ, {'ASSISTANT_FSYNC': '0'}):
+            self.assertFalse(fsync_enabled())
+            with patch('assistant.fileio.os.fsync') as mock_fsync:
+                atomic_write(self.path, 'fast')
+            mock_fsync.assert_not_called()
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertTrue(fsync_enabled())
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'data.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_exclusive_between_threads(self):
+        counter = {'value': 0}
+
+        def bump():
+            for _ in range(50):
+                with FileLock(self.path):
+                    value = counter['value']
+                    threading.Event().wait(0.0001)
+                    counter['value'] = value + 1
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(counter['value'], 200)
+
+    @unittest.skipIf(fileio.fcntl is None, "shared locks need fcntl")
+    def test_shared_readers(self):
+        with FileLock(self.path, shared=True):
+            acquired = threading.Event()
+
+            def read():
+                with FileLock(self.path, shared=True):
+                    acquired.set()
+
+            reader = threading.Thread(target=read)
+            reader.start()
+            self.assertTrue(acquired.wait(2))
+            reader.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import os
+import json
+import tempfile
+import shutil
+import threading
+from unittest.mock import patch
+from assistant.journal import GroupCommit, NoteJournal
+
+class TestNoteJournal(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.journal = NoteJournal(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def read_snapshot(self):
+        with open(os.path.join(self.test_dir, 'notes.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_append_replay(self):
+        self.journal.append('first')
+        self.journal.append('second\nline')
+        self.assertEqual(list(self.journal.replay()), ['first', 'second\nline'])
+
+    def test_append_does_not_touch_snapshot(self):
+        self.journal.append('note')
+        self.assertFalse(os.path.exists(self.journal.snapshot_path))
+
+    def test_compact(self):
+        with open(self.journal.snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump({'notes': ['old']}, f)
+        self.journal.append('new')
+        self.assertEqual(self.journal.compact(), 1)
+        snapshot = self.read_snapshot()
+        self.assertEqual(snapshot['notes'], ['old', 'new'])
+        self.assertEqual(list(self.journal.replay(snapshot['compacted'])), [])
+        # Only the snapshot (and the journal's lock files) remain
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['notes.journal.lock', 'notes.journal.sync.lock', 'notes.json'])
+
+    def test_interrupted_compaction_not_replayed_twice(self):
+        self.journal.append('a')
+        rotated = self.journal.journal_path + '.1'
+        os.rename(self.journal.journal_path, rotated)
+        # Snapshot written, rotated file not yet deleted.
+        with open(self.journal.snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump({'notes': ['a'], 'compacted': ['notes.journal.1']}, f)
+        self.journal.append('b')
+        self.assertEqual(list(self.journal.replay(['notes.journal.1'])), ['b'])
+        self.journal.compact()
+        self.assertEqual(self.read_snapshot()['notes'], ['a', 'b'])
+        self.assertFalse(os.path.exists(rotated))
+
+    def test_torn_record_skipped(self):
+        self.journal.append('ok')
+        with open(self.journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "add", "no')
+        self.assertEqual(list(self.journal.replay()), ['ok'])
+
+    def test_needs_compaction(self):
+        self.assertFalse(self.journal.needs_compaction())
+        self.journal.append('x' * 100)
+        self.assertTrue(self.journal.needs_compaction(threshold=10))
+        self.assertFalse(self.journal.needs_compaction(threshold=10_000))
+
+class TestGroupCommit(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'log')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_concurrent_writers_share_batches(self):
+        committer = GroupCommit(self.path, window=0.01)
+        threads = [threading.Thread(target=committer.append, args=(f"{i}\n",)) for i in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(sorted(f.read().split()), sorted(str(i) for i in range(40)))
+        self.assertLess(committer.batches, 40)
+
+    def test_fsync_shared_across_processes(self):
+        # Two committers stand in for two processes appending to one journal
+        first, second = GroupCommit(self.path), GroupCommit(self.path)
+        with patch.dict(os.environ, {'ASSISTANT_FSYNC': '1'}):
+            f, end = first._append('a\n')
+            second.append('b\n')
+            # The second process's fsync covered the first one's bytes
+            first._sync(f, end)
+            f.close()
+            self.assertEqual((first.fsyncs, second.fsyncs), (0, 1))
+            first.append('c\n')
+            self.assertEqual(first.fsyncs, 1)
+
+    def test_rotated_file_not_trusted(self):
+        committer = GroupCommit(self.path)
+        with patch.dict(os.environ, {'ASSISTANT_FSYNC': '1'}):
+            committer.append('a\n' * 10)
+            os.replace(self.path, self.path + '.1')
+            committer.reset()
+            committer.append('b\n')
+            self.assertEqual(committer.fsyncs, 2)
+
+    def test_write_error_reaches_writer(self):
+        committer = GroupCommit(os.path.join(self.test_dir, 'missing', 'log'))
+        with self.assertRaises(OSError):
+            committer.append('x\n')
+        # A later batch isn't poisoned by the earlier failure
+        os.mkdir(os.path.join(self.test_dir, 'missing'))
+        committer.append('y\n')
+
+if __name__ == '__main__':
+    unittest.main()
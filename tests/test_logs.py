@@ -0,0 +1,107 @@
+import os
+import sys
+import logging
+import unittest
+import tempfile
+import subprocess
+from assistant.logs import SAMPLED, SamplingFilter, configure_logging, parse_levels, shutdown_logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestSamplingFilter(unittest.TestCase):
+    def record(self, msg, level=logging.INFO, name='assistant.utils', sampled=True):
+        record = logging.LogRecord(name, level, __file__, 1, msg, ('x',), None)
+        if sampled:
+            record.__dict__.update(SAMPLED)
+        return record
+
+    def test_keeps_one_in_n_per_message(self):
+        sampler = SamplingFilter(every=10)
+        kept = [sampler.filter(self.record('Data saved to %s')) for _ in range(25)]
+        self.assertEqual(sum(kept), 3)
+        self.assertTrue(kept[0])
+        self.assertTrue(sampler.filter(self.record('Data loaded from %s')))
+
+    def test_unmarked_messages_never_sampled(self):
+        sampler = SamplingFilter(every=10)
+        self.assertTrue(all(sampler.filter(self.record('Reminder triggered: %s', sampled=False)) for _ in range(25)))
+
+    def test_sampled_loggers(self):
+        sampler = SamplingFilter(every=10, loggers=['assistant.journal'])
+        kept = [sampler.filter(self.record('Appended %s', name='assistant.journal.x', sampled=False)) for _ in range(25)]
+        self.assertEqual(sum(kept), 3)
+        self.assertTrue(sampler.filter(self.record('Appended %s', name='assistant.journalist', sampled=False)))
+
+    def test_warnings_never_sampled(self):
+        sampler = SamplingFilter(every=10)
+        self.assertTrue(all(sampler.filter(self.record('Failed %s', logging.WARNING)) for _ in range(5)))
+
+class TestConfigureLogging(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'assistant.log')
+        self.saved_level = logging.getLogger().level
+
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger().setLevel(self.saved_level)
+        logging.getLogger('assistant.router').setLevel(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def read_log(self):
+        shutdown_logging()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_writes_through_queue(self):
+        configure_logging('INFO', {}, sample=1, filename=self.path)
+        logging.getLogger('assistant.utils').info("Data saved to %s", 'notes.json')
+        logging.getLogger('assistant.utils').debug("hidden")
+        log = self.read_log()
+        self.assertIn('INFO - Data saved to notes.json', log)
+        self.assertNotIn('hidden', log)
+
+    def test_per_logger_levels(self):
+        configure_logging('WARNING', parse_levels('assistant.router=DEBUG'), sample=1, filename=self.path)
+        logging.getLogger('assistant.router').debug("routed")
+        logging.getLogger('assistant.utils').info("quiet")
+        log = self.read_log()
+        self.assertIn('routed', log)
+        self.assertNotIn('quiet', log)
+
+    def test_sampling(self):
+        configure_logging('INFO', {}, sample=100, filename=self.path, sampled=['assistant.journal'])
+        for i in range(250):
+            logging.getLogger('assistant.journal').info("Appended note %d", i)
+            logging.getLogger('assistant.utils').info("Read %d", i, extra=SAMPLED)
+            logging.getLogger('assistant.utils').info("Reminder triggered: %d", i)
+        log = self.read_log()
+        self.assertEqual(log.count('Appended note'), 3)
+        self.assertEqual(log.count('Read'), 3)
+        self.assertEqual(log.count('Reminder triggered'), 250)
+
+    def test_reconfigure_replaces_handler(self):
+        root = logging.getLogger()
+        handlers = len(root.handlers)
+        configure_logging('INFO', {}, filename=self.path)
+        configure_logging('INFO', {}, filename=self.path)
+        self.assertEqual(len(root.handlers), handlers + 1)
+        shutdown_logging()
+        self.assertEqual(len(root.handlers), handlers)
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels('a=debug, b.c=WARNING'), {'a': logging.DEBUG, 'b.c': logging.WARNING})
+        with self.assertRaises(ValueError):
+            parse_levels('a')
+        with self.assertRaises(ValueError):
+            parse_levels('a=LOUD')
+
+class TestImportLeavesLoggingAlone(unittest.TestCase):
+    def test_no_handlers_installed(self):
+        code = ("import logging, assistant.utils, assistant.ai_module, assistant.daemon; "
+                "root = logging.getLogger(); print(len(root.handlers), root.level)")
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split(), ['0', str(logging.WARNING)])
+
+if __name__ == '__main__':
+    unittest.main()
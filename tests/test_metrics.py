@@ -0,0 +1,73 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stderr
+from unittest.mock import patch
+from assistant import metrics
+from assistant.cli import main
+from tests.test_providers import FakeProvider
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.was_enabled = metrics.enabled()
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.enable(self.was_enabled)
+        metrics.reset()
+
+    def test_disabled_records_nothing(self):
+        metrics.enable(False)
+        metrics.inc('calls_total')
+        with metrics.timer('block_seconds'):
+            pass
+        metrics.timed('func_seconds')(lambda: None)()
+        self.assertEqual(metrics.snapshot(), {'counters': [], 'histograms': []})
+
+    def test_counters_and_timers(self):
+        metrics.enable()
+        metrics.inc('calls_total', provider='openai')
+        metrics.inc('calls_total', 2, provider='openai')
+        with metrics.timer('block_seconds'):
+            pass
+        add = metrics.timed('add_seconds')(lambda a, b: a + b)
+        self.assertEqual(add(2, 3), 5)
+        metrics.observe('size_seconds', 0.003)
+        data = metrics.snapshot()
+        self.assertEqual(data['counters'], [{'name': 'calls_total', 'labels': {'provider': 'openai'}, 'value': 3.0}])
+        histograms = {h['name']: h for h in data['histograms']}
+        self.assertEqual(histograms['add_seconds']['count'], 1)
+        self.assertEqual(histograms['size_seconds']['buckets']['0.005'], 1)
+        self.assertEqual(json.loads(metrics.to_json()), data)
+
+    def test_prometheus_format(self):
+        metrics.enable()
+        metrics.inc('errors_total', provider='gemini')
+        metrics.observe('request_seconds', 0.2)
+        metrics.observe('request_seconds', 40)
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE errors_total counter\nerrors_total{provider="gemini"} 1\n', text)
+        self.assertIn('request_seconds_bucket{le="0.25"} 1\n', text)
+        self.assertIn('request_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('request_seconds_count 2\n', text)
+
+    @patch('assistant.providers.time.sleep')
+    def test_provider_calls_instrumented(self, mock_sleep):
+        metrics.enable()
+        FakeProvider('key', 'm', failures=1, max_retries=1).complete('q', {})
+        data = metrics.snapshot()
+        counters = {c['name']: c['value'] for c in data['counters']}
+        self.assertEqual(counters, {'assistant_provider_errors_total': 1, 'assistant_provider_retries_total': 1})
+        self.assertEqual(data['histograms'][0]['name'], 'assistant_provider_request_seconds')
+        self.assertEqual(data['histograms'][0]['count'], 2)
+
+    @patch('assistant.cli.print_success')
+    def test_cli_profile(self, mock_print):
+        with patch('sys.argv', ['cli.py', '--profile', 'calc', '2+3']), redirect_stderr(io.StringIO()) as err:
+            main()
+        report = err.getvalue()
+        self.assertIn('assistant_command_seconds{command=calc}', report)
+        self.assertIn('assistant_safe_calc_seconds', report)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import json
+import tempfile
+import shutil
+from unittest.mock import patch
+from assistant.notefile import NoteFile, binary_to_json, json_to_binary
+
+class TestNoteFile(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.notes = NoteFile(self.test_dir)
+
+    def tearDown(self):
+        self.notes.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_empty(self):
+        self.assertEqual(len(self.notes), 0)
+        self.assertEqual(list(self.notes.iter_notes()), [])
+        with self.assertRaises(IndexError):
+            self.notes.get(1)
+
+    def test_append_and_random_access(self):
+        self.notes.append('first')
+        self.assertEqual(self.notes.extend(['naïve café ☕', '', 'multi\nline']), 3)
+        self.assertEqual(len(self.notes), 4)
+        self.assertEqual(self.notes.get(2), 'naïve café ☕')
+        self.assertEqual(self.notes.get(3), '')
+        self.assertEqual(self.notes.get(4), 'multi\nline')
+        # Another instance (or process) sees the same notes
+        self.assertEqual(NoteFile(self.test_dir).get(1), 'first')
+
+    def test_iter_notes_batches(self):
+        notes = [f"note {i}" for i in range(10)]
+        self.notes.extend(notes)
+        with patch('assistant.notefile.READ_BATCH', 3):
+            self.assertEqual([n for n, _ in self.notes.iter_notes(offset=2, limit=5)], [3, 4, 5, 6, 7])
+            self.assertEqual([n for n, _ in self.notes.iter_notes(offset=1, limit=5, reverse=True)], [9, 8, 7, 6, 5])
+            self.assertEqual([note for _, note in self.notes.iter_notes(reverse=True)], notes[::-1])
+            self.assertEqual(list(self.notes.iter_notes(offset=20)), [])
+
+    def test_sees_appends_after_mapping(self):
+        self.notes.append('a')
+        self.assertEqual(self.notes.get(1), 'a')
+        NoteFile(self.test_dir).append('b')
+        self.assertEqual([note for _, note in self.notes.iter_notes()], ['a', 'b'])
+
+    def test_interrupted_append_overwritten(self):
+        self.notes.extend(['a', 'b'])
+        # Records written but the index entry never was
+        with open(self.notes.data_path, 'ab') as f:
+            f.write(b'\x05\x00\x00\x00tor')
+        self.assertEqual(len(self.notes), 2)
+        self.notes.append('c')
+        self.assertEqual([note for _, note in self.notes.iter_notes()], ['a', 'b', 'c'])
+        self.assertEqual(os.path.getsize(self.notes.data_path), 3 * 5)
+
+class TestConverters(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.test_dir, 'notes.json')
+        self.notes = NoteFile(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'notes': ['one', 'twö']}, f)
+        self.assertEqual(json_to_binary(self.json_path, self.notes), 2)
+        os.remove(self.json_path)
+        self.assertEqual(binary_to_json(self.notes, self.json_path), 2)
+        with open(self.json_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {'notes': ['one', 'twö']})
+
+    def test_missing_json(self):
+        self.assertEqual(json_to_binary(self.json_path, self.notes), 0)
+
+if __name__ == '__main__':
+    unittest.main()
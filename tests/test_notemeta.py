@@ -0,0 +1,167 @@
+import os
+import datetime
+import sys
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+import assistant.utils
+from assistant.notemeta import NoteMetadata, iter_bits, normalize_tag, _bitmap
+from assistant.utils import add_note, add_notes, add_note_records, iter_notes, iter_note_records, note_tags, save_data, close_storage, get_note_metadata
+
+class TestBitmaps(unittest.TestCase):
+    def test_iter_bits(self):
+        ids = [1, 5, 63, 64, 65, 200, 1000]
+        bitmap = _bitmap(ids)
+        self.assertEqual(list(iter_bits(bitmap)), ids)
+        self.assertEqual(list(iter_bits(bitmap, reverse=True)), ids[::-1])
+        self.assertEqual(list(iter_bits(0)), [])
+
+    def test_normalize_tag(self):
+        self.assertEqual(normalize_tag(' Work '), 'work')
+        self.assertEqual(normalize_tag('follow-up'), 'follow-up')
+        for bad in ('', 'two words', 'a,b'):
+            with self.assertRaises(ValueError):
+                normalize_tag(bad)
+
+class TestNoteMetadata(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.test_dir, 'meta')
+        self.meta = NoteMetadata(self.prefix)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_select_intersects_tags(self):
+        self.meta.add([1], ['work'], created=100)
+        self.meta.add([2], ['home'], created=200)
+        self.meta.add([3, 4], ['work', 'urgent'], created=300)
+        self.assertEqual(list(self.meta.select(['work'])), [1, 3, 4])
+        self.assertEqual(list(self.meta.select(['Work', 'urgent'], reverse=True)), [4, 3])
+        self.assertEqual(list(self.meta.select(['work', 'home'])), [])
+        self.assertEqual(list(self.meta.select(['missing'])), [])
+        self.assertEqual(self.meta.tags_of(3), ['urgent', 'work'])
+        self.assertEqual(self.meta.tag_counts(), {'home': 1, 'urgent': 2, 'work': 3})
+
+    def test_select_since(self):
+        self.meta.add([1], created=100)
+        self.meta.add([2], ['work'], created=200)
+        self.meta.add([3], created=300)
+        self.assertEqual(list(self.meta.select(since=200)), [2, 3])
+        self.assertEqual(list(self.meta.select(since=200, reverse=True)), [3, 2])
+        self.assertEqual(list(self.meta.select(['work'], since=250)), [])
+        self.assertEqual(list(self.meta.select(since=1000)), [])
+
+    def test_times_never_decrease(self):
+        self.meta.add([1], created=300)
+        self.meta.add([2], created=100)
+        self.assertEqual(self.meta.created(2), 300)
+
+    def test_gaps_and_sync(self):
+        self.meta.sync(2)
+        self.assertIsNone(self.meta.created(1))
+        self.meta.add([5], ['work'], created=100)
+        self.assertEqual(len(self.meta), 5)
+        self.assertIsNone(self.meta.created(4))
+        self.assertEqual(list(self.meta.select(['work'])), [5])
+        with self.assertRaises(ValueError):
+            self.meta.add([3])
+
+    def test_reload_and_other_writers(self):
+        self.meta.add([1, 2], ['work'], created=100)
+        other = NoteMetadata(self.prefix)
+        self.assertEqual(list(other.select(['work'])), [1, 2])
+        other.add([3], ['work'], created=200)
+        self.assertEqual(list(self.meta.select(['work'], since=150)), [3])
+        self.assertEqual(self.meta.created(3), 200)
+
+    def test_extend(self):
+        self.meta.add([1], ['home'], created=500)
+        other = NoteMetadata(os.path.join(self.test_dir, 'other'))
+        other.add([1], ['work'], created=100)
+        other.add([2, 3], ['work', 'urgent'], created=600)
+        self.assertEqual(self.meta.extend(other, count=2), 2)
+        self.assertEqual(len(self.meta), 3)
+        self.assertEqual(list(self.meta.select(['work'])), [2, 3])
+        self.assertEqual(list(self.meta.select(['urgent'])), [3])
+        self.assertEqual(self.meta.created(2), 500)
+        self.assertEqual(list(NoteMetadata(self.prefix).select(['work'], since=550)), [3])
+
+class TestTaggedNotes(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.saved_dir = assistant.utils.DATA_DIR
+        assistant.utils.DATA_DIR = self.test_dir
+
+    def tearDown(self):
+        close_storage()
+        assistant.utils.DATA_DIR = self.saved_dir
+        shutil.rmtree(self.test_dir)
+
+    def test_add_and_filter(self):
+        add_note('Plan sprint', tags=['Work'])
+        add_note('Buy milk', tags=['home'])
+        add_notes(['Untagged one', 'Untagged two'])
+        add_note('Ship release', tags=['work', 'urgent'])
+        self.assertEqual(list(iter_notes(tags=['work'])), [(1, 'Plan sprint'), (5, 'Ship release')])
+        self.assertEqual(list(iter_notes(tags=['work'], reverse=True, limit=1)), [(5, 'Ship release')])
+        self.assertEqual(list(iter_notes(tags=['work'], offset=1)), [(5, 'Ship release')])
+        self.assertEqual(len(list(iter_notes(since='2000-01-01'))), 5)
+        self.assertEqual(list(iter_notes(since='2999-01-01')), [])
+        self.assertEqual(note_tags(), {'home': 1, 'urgent': 1, 'work': 2})
+
+    def test_filtered_bodies_come_from_storage(self):
+        add_note('Plan sprint', tags=['work'])
+        add_note('Buy milk')
+        with patch('assistant.search.SearchIndex.get_many', side_effect=AssertionError('read from the index')):
+            self.assertEqual(list(iter_notes(tags=['work'])), [(1, 'Plan sprint')])
+
+    def test_records_keep_tags_and_times(self):
+        add_note_records([{'note': 'Old', 'tags': ['work'], 'created': 100.0},
+                          {'note': 'Older', 'tags': [], 'created': 50.0},
+                          {'note': 'New', 'tags': ['Work', 'home']}])
+        records = list(iter_note_records())
+        self.assertEqual([r['tags'] for r in records], [['work'], [], ['home', 'work']])
+        # Times never decrease, so the older one takes its predecessor's
+        self.assertEqual(get_note_metadata().created(2), 100.0)
+        self.assertEqual(records[0]['created'], datetime.datetime.fromtimestamp(100).isoformat(timespec='seconds'))
+        self.assertEqual(list(iter_note_records(tags=['home'])), records[2:])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            add_note('Bad', tags=['two words'])
+        self.assertEqual(list(iter_notes()), [])
+        with self.assertRaises(ValueError):
+            iter_notes(since='last week')
+
+    def test_concurrent_tagged_writers(self):
+        writer = ("import sys\n"
+                  "import assistant.utils as utils\n"
+                  "utils.DATA_DIR = sys.argv[1]\n"
+                  "for i in range(30):\n"
+                  "    utils.add_note(f'{sys.argv[2]}-{i}', tags=[sys.argv[2]])\n")
+        env = dict(os.environ, ASSISTANT_FSYNC='0')
+        writers = [subprocess.Popen([sys.executable, '-c', writer, self.test_dir, f"p{n}"], env=env)
+                   for n in range(4)]
+        for process in writers:
+            self.assertEqual(process.wait(timeout=60), 0)
+        for n in range(4):
+            self.assertEqual([note for _, note in iter_notes(tags=[f"p{n}"])], [f"p{n}-{i}" for i in range(30)])
+        self.assertEqual(len(get_note_metadata()), 120)
+
+    def test_existing_notes_migrate(self):
+        save_data('notes.json', {'notes': ['Legacy one', 'Legacy two']})
+        add_note('New', tags=['work'])
+        self.assertEqual(list(iter_notes(tags=['work'])), [(3, 'New')])
+        # Notes from before metadata existed have no known date
+        self.assertEqual(list(iter_notes(since='2000-01-01')), [(3, 'New')])
+        self.assertEqual([n for _, n in iter_notes()], ['Legacy one', 'Legacy two', 'New'])
+        self.assertIsNone(get_note_metadata().created(1))
+
+        close_storage()
+        self.assertEqual(list(iter_notes(tags=['work'])), [(3, 'New')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import os
+from unittest.mock import patch
+from assistant.providers import (
+    Provider, OpenAIProvider, ProviderUnavailable, get_provider, register_provider,
+    reset_providers, module_available, PROVIDER_FACTORIES
+)
+from assistant.ai_module import get_online_answer, stream_online_answer
+from tests.fake_server import FakeOpenAIServer
+
+class FakeProvider(Provider):
+    name = 'fake'
+    label = 'Fake'
+
+    def __init__(self, *args, failures=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.clients_created = 0
+        self.requests = 0
+
+    def create_client(self):
+        self.clients_created += 1
+        return object()
+
+    def request(self, question, params):
+        self.client
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise ConnectionError('boom')
+        return f"fake: {question}"
+
+class TestProviderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(PROVIDER_FACTORIES)
+        reset_providers()
+
+    def tearDown(self):
+        PROVIDER_FACTORIES.clear()
+        PROVIDER_FACTORIES.update(self.saved)
+        reset_providers()
+
+    def test_client_created_once(self):
+        register_provider('fake', lambda model: FakeProvider('key', model))
+        with patch('assistant.ai_module.REQUESTS_AVAILABLE', True):
+            self.assertEqual(get_online_answer('one', 'fake'), 'fake: one')
+            self.assertEqual(get_online_answer('two', 'fake'), 'fake: two')
+        provider = get_provider('fake', 'm')
+        self.assertEqual(provider.clients_created, 1)
+        self.assertEqual(provider.requests, 2)
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ProviderUnavailable):
+            get_provider('nope', 'm')
+
+    def test_missing_api_key(self):
+        with patch('assistant.providers.module_available', return_value=True), \
+                patch.dict(os.environ, {}, clear=True):
+            with self.assertRaises(ProviderUnavailable) as ctx:
+                get_provider('openai', 'gpt-4o-mini')
+        self.assertIn('OPENAI_API_KEY', str(ctx.exception))
+
+    def test_settings_from_environment(self):
+        env = {'OPENAI_API_KEY': 'k', 'ASSISTANT_TIMEOUT': '5', 'ASSISTANT_MAX_RETRIES': '4',
+               'OPENAI_BASE_URL': 'http://127.0.0.1:1/v1'}
+        with patch('assistant.providers.module_available', return_value=True), \
+                patch.dict(os.environ, env, clear=True):
+            provider = get_provider('openai', 'gpt-4o-mini')
+        self.assertIsInstance(provider, OpenAIProvider)
+        self.assertEqual((provider.timeout, provider.max_retries, provider.base_url),
+                         (5.0, 4, 'http://127.0.0.1:1/v1'))
+
+class StreamingProvider(FakeProvider):
+    def request_stream(self, question, params):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise ConnectionError('boom')
+        for word in ['Hello', ', ', 'world']:
+            yield word
+
+class TestStreaming(unittest.TestCase):
+    def test_default_stream_is_single_chunk(self):
+        provider = FakeProvider('key', 'm')
+        self.assertEqual(list(provider.stream('q', {})), ['fake: q'])
+
+    @patch('assistant.providers.time.sleep')
+    def test_stream_retries_before_first_chunk(self, mock_sleep):
+        provider = StreamingProvider('key', 'm', failures=1, max_retries=1)
+        self.assertEqual(list(provider.stream('q', {})), ['Hello', ', ', 'world'])
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_stream_online_answer(self):
+        saved = dict(PROVIDER_FACTORIES)
+        try:
+            register_provider('fake', lambda model: StreamingProvider('key', model))
+            with patch('assistant.ai_module.REQUESTS_AVAILABLE', True):
+                self.assertEqual(list(stream_online_answer('q', 'fake')), ['Hello', ', ', 'world'])
+                self.assertEqual(list(stream_online_answer('q', 'missing')),
+                                 ['Online provider not available or not supported.'])
+        finally:
+            PROVIDER_FACTORIES.clear()
+            PROVIDER_FACTORIES.update(saved)
+            reset_providers()
+
+class TestRetries(unittest.TestCase):
+    @patch('assistant.providers.time.sleep')
+    def test_retries_with_backoff(self, mock_sleep):
+        provider = FakeProvider('key', 'm', failures=2, max_retries=2, backoff=1.0)
+        self.assertEqual(provider.complete('q', {}), 'fake: q')
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(1.0 <= delays[0] < 1.2 and 2.0 <= delays[1] < 2.4)
+
+    @patch('assistant.providers.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        provider = FakeProvider('key', 'm', failures=5, max_retries=1)
+        with self.assertRaises(ConnectionError):
+            provider.complete('q', {})
+        self.assertEqual(provider.requests, 2)
+
+@unittest.skipUnless(module_available('openai'), "OpenAI not available")
+class TestOpenAIAgainstFakeServer(unittest.TestCase):
+    def test_connection_reused(self):
+        params = {'max_tokens': 10, 'temperature': 0}
+        with FakeOpenAIServer() as server:
+            provider = OpenAIProvider('key', 'gpt-4o-mini', timeout=5, base_url=server.base_url)
+            self.assertEqual(provider.complete('one', params), 'Echo: one')
+            self.assertEqual(provider.complete('two', params), 'Echo: two')
+            self.assertEqual(server.requests, 2)
+            self.assertEqual(server.connections, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import time
+import unittest
+import threading
+from unittest.mock import patch
+from assistant.providers import Provider, ProviderUnavailable, PROVIDER_FACTORIES, register_provider, reset_providers
+from assistant.router import ProviderHealth, ProviderRouter, CLOSED, OPEN, HALF_OPEN
+import assistant.ai_module as ai_module
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class SlowProvider(Provider):
+    def __init__(self, name, delay=0.0, fail=False):
+        super().__init__('key', 'model', max_retries=0)
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def request(self, question, params):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} down")
+        return f"{self.name}: {question}"
+
+    def request_stream(self, question, params):
+        if self.fail:
+            raise ConnectionError(f"{self.name} down")
+        yield f"{self.name}: "
+        yield question
+
+class TestProviderHealth(unittest.TestCase):
+    def test_percentiles_and_error_rate(self):
+        health = ProviderHealth(window=10)
+        self.assertIsNone(health.percentile(50))
+        for latency in range(1, 11):
+            health.record(True, latency / 10)
+        self.assertEqual(health.percentile(50), 0.6)
+        self.assertEqual(health.percentile(95), 1.0)
+        health.record(False)
+        self.assertAlmostEqual(health.error_rate(), 0.1)
+
+    def test_opens_after_consecutive_failures(self):
+        clock = FakeClock()
+        health = ProviderHealth(failure_threshold=3, reset_timeout=30, clock=clock)
+        for _ in range(3):
+            self.assertTrue(health.allow())
+            health.record(False)
+        self.assertEqual(health.state, OPEN)
+        self.assertFalse(health.allow())
+
+        # After the timeout one trial goes through; its failure reopens the circuit
+        clock.now += 30
+        self.assertTrue(health.allow())
+        self.assertEqual(health.state, HALF_OPEN)
+        self.assertFalse(health.allow())
+        health.record(False)
+        self.assertEqual(health.state, OPEN)
+
+        clock.now += 30
+        self.assertTrue(health.allow())
+        health.record(True, 0.1)
+        self.assertEqual(health.state, CLOSED)
+        self.assertEqual(health.error_rate(), 0.0)
+
+    def test_opens_on_error_rate(self):
+        health = ProviderHealth(failure_threshold=100, max_error_rate=0.5)
+        for _ in range(5):
+            health.record(True, 0.1)
+            health.record(False)
+        self.assertEqual(health.state, OPEN)
+
+class TestProviderRouter(unittest.TestCase):
+    def make_router(self, **providers):
+        self.providers = providers
+        router = ProviderRouter(list(providers), providers.__getitem__, deadline=2.0, hedge_delay=0.05)
+        self.addCleanup(router.close)
+        return router
+
+    def test_prefers_faster_provider(self):
+        router = self.make_router(a=SlowProvider('a'), b=SlowProvider('b'))
+        self.assertEqual(router.ranked(), ['a', 'b'])
+        for latency in (0.5, 0.6, 0.7):
+            router.health['a'].record(True, latency)
+        for latency in (0.1, 0.2):
+            router.health['b'].record(True, latency)
+        self.assertEqual(router.ranked(), ['b', 'a'])
+        self.assertEqual(router.complete('q', {}), ('b', 'b: q'))
+
+    def test_hedges_slow_request(self):
+        router = self.make_router(a=SlowProvider('a', delay=0.5), b=SlowProvider('b'))
+        started = time.monotonic()
+        self.assertEqual(router.complete('q', {}), ('b', 'b: q'))
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual((self.providers['a'].requests, self.providers['b'].requests), (1, 1))
+
+    def test_no_hedge_when_fast(self):
+        router = self.make_router(a=SlowProvider('a'), b=SlowProvider('b'))
+        self.assertEqual(router.complete('q', {}), ('a', 'a: q'))
+        self.assertEqual(self.providers['b'].requests, 0)
+
+    def test_fails_over_immediately(self):
+        router = self.make_router(a=SlowProvider('a', fail=True), b=SlowProvider('b'))
+        self.assertEqual(router.complete('q', {}), ('b', 'b: q'))
+        self.assertEqual(router.health['a'].error_rate(), 1.0)
+
+    def test_fails_over_without_provider_retries(self):
+        failing = SlowProvider('a', fail=True)
+        failing.max_retries, failing.backoff = 2, 0.5
+        router = self.make_router(a=failing, b=SlowProvider('b'))
+        started = time.monotonic()
+        self.assertEqual(router.complete('q', {}), ('b', 'b: q'))
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertEqual(failing.requests, 1)
+        self.assertEqual(list(router.stream('q', {})), ['b: ', 'q'])
+        self.assertLess(time.monotonic() - started, 0.3)
+
+    def test_open_circuit_is_skipped(self):
+        router = self.make_router(a=SlowProvider('a', fail=True), b=SlowProvider('b'))
+        self.assertEqual(router.complete('q', {}), ('b', 'b: q'))
+        for _ in range(router.health['a'].failure_threshold - 1):
+            router.health['a'].record(False)
+        self.assertEqual(router.health['a'].state, OPEN)
+        for _ in range(router.health['b'].failure_threshold):
+            router.health['b'].record(False)
+        with self.assertRaises(ProviderUnavailable) as ctx:
+            router.complete('q', {})
+        self.assertIn('circuit open', str(ctx.exception))
+        self.assertEqual(self.providers['a'].requests, 1)
+
+    def test_all_failing(self):
+        router = self.make_router(a=SlowProvider('a', fail=True), b=SlowProvider('b', fail=True))
+        with self.assertRaises(ConnectionError):
+            router.complete('q', {})
+
+    def test_unavailable(self):
+        def resolve(name):
+            raise ProviderUnavailable(f"{name} API key not set.")
+        router = ProviderRouter(['a'], resolve)
+        with self.assertRaises(ProviderUnavailable) as ctx:
+            router.complete('q', {})
+        self.assertIn('a API key not set', str(ctx.exception))
+
+    def test_deadline(self):
+        router = self.make_router(a=SlowProvider('a', delay=1.0), b=SlowProvider('b', delay=1.0))
+        router.deadline = 0.2
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            router.complete('q', {})
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_stream_fails_over_before_first_chunk(self):
+        router = self.make_router(a=SlowProvider('a', fail=True), b=SlowProvider('b'))
+        self.assertEqual(list(router.stream('q', {})), ['b: ', 'q'])
+        self.assertEqual(router.health['a'].error_rate(), 1.0)
+
+class TestRoutedAnswers(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(PROVIDER_FACTORIES)
+        self.fast = SlowProvider('fast')
+        self.broken = SlowProvider('broken', fail=True)
+        register_provider('broken', lambda model: self.broken)
+        register_provider('fast', lambda model: self.fast)
+        patcher = patch.multiple(ai_module, ONLINE_PROVIDERS=('broken', 'fast'), REQUESTS_AVAILABLE=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ai_module.reset_router()
+
+    def tearDown(self):
+        ai_module.reset_router()
+        PROVIDER_FACTORIES.clear()
+        PROVIDER_FACTORIES.update(self.saved)
+        reset_providers()
+
+    def test_get_online_answer_routes(self):
+        self.assertEqual(ai_module.get_online_answer('q'), 'fast: q')
+        self.assertEqual(ai_module.get_online_answer('q', 'broken'), 'Error querying Provider: broken down')
+
+    def test_get_answer_uses_router(self):
+        self.assertEqual(ai_module.get_answer('q', online=True, use_cache=False), '[ONLINE] fast: q')
+        self.assertEqual(''.join(ai_module.stream_answer('q', online=True, use_cache=False)), '[ONLINE] fast: q')
+
+    def test_failing_route_falls_back_offline(self):
+        self.fast.fail = True
+        self.assertTrue(ai_module.get_answer('Tell me a joke', online=True, use_cache=False).startswith('[OFFLINE]'))
+
+if __name__ == '__main__':
+    unittest.main()
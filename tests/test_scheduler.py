@@ -0,0 +1,127 @@
+import unittest
+import os
+import datetime
+import tempfile
+import shutil
+import time
+import socket
+import threading
+from unittest.mock import patch
+from assistant.storage import SQLiteStorage
+from assistant.scheduler import ReminderScheduler, get_active_scheduler, notify_scheduler, WAKE_SOCKET
+
+class TestReminderScheduler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = SQLiteStorage(self.test_dir)
+        self.fired = []
+        self.done = threading.Event()
+        self.scheduler = ReminderScheduler(self.storage, notify=self.record)
+
+    def tearDown(self):
+        self.scheduler.stop(timeout=1)
+        self.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def record(self, reminder):
+        self.fired.append(reminder['message'])
+        if len(self.fired) >= self.expected:
+            self.done.set()
+
+    def add(self, message, seconds):
+        when = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+        return self.storage.add_reminder(message, when.strftime('%H:%M'), when)
+
+    def test_loads_pending_at_startup(self):
+        self.expected = 2
+        self.add('second', 0.2)
+        self.add('first', 0.05)
+        self.add('later', 3600)
+        self.scheduler.start()
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.fired, ['first', 'second'])
+        self.assertEqual([r['message'] for r in self.storage.list_reminders()], ['later'])
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_add_wakes_scheduler(self):
+        self.expected = 1
+        self.add('far', 3600)
+        self.scheduler.start()
+        self.assertIs(get_active_scheduler(), self.scheduler)
+        self.scheduler.add(self.add('soon', 0.05))
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.fired, ['soon'])
+
+    def test_many_pending(self):
+        self.expected = 1
+        base = datetime.datetime.now() + datetime.timedelta(hours=1)
+        for i in range(10000):
+            self.storage.add_reminder(f'r{i}', '00:00', base + datetime.timedelta(seconds=i))
+        self.scheduler.start()
+        self.assertEqual(len(self.scheduler), 10000)
+        self.scheduler.add(self.add('now', 0))
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.fired, ['now'])
+
+    def test_stop(self):
+        self.scheduler.start()
+        self.scheduler.stop(timeout=1)
+        self.assertIsNone(get_active_scheduler())
+        self.assertFalse(self.scheduler._thread.is_alive())
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix sockets')
+class TestNotifyScheduler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = SQLiteStorage(self.test_dir)
+        self.fired = threading.Event()
+        self.scheduler = ReminderScheduler(self.storage, notify=lambda reminder: self.fired.set())
+
+    def tearDown(self):
+        self.scheduler.stop(timeout=1)
+        self.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_no_scheduler(self):
+        self.assertFalse(notify_scheduler(self.test_dir))
+
+    def test_pushes_new_reminders(self):
+        self.scheduler.start(self.test_dir)
+        # Saved by another process; only the new entry is pushed, storage isn't reloaded
+        when = datetime.datetime.now() + datetime.timedelta(seconds=0.05)
+        reminder = self.storage.add_reminder('soon', when.strftime('%H:%M'), when)
+        with patch.object(self.scheduler, 'reload', side_effect=AssertionError):
+            self.assertTrue(notify_scheduler(self.test_dir, [reminder]))
+            self.assertTrue(self.fired.wait(2))
+
+    def test_reload_request(self):
+        self.scheduler.start(self.test_dir)
+        self.storage.add_reminder('later', '00:00', datetime.datetime.now() + datetime.timedelta(hours=1))
+        with patch.object(self.scheduler, 'reload', wraps=self.scheduler.reload) as reload:
+            self.assertTrue(notify_scheduler(self.test_dir))
+            deadline = time.monotonic() + 2
+            while not reload.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(reload.called)
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_stale_socket(self):
+        path = os.path.join(self.test_dir, WAKE_SOCKET)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(path)
+        # Nobody is listening any more: nothing is woken, and a new scheduler takes the path over
+        self.assertFalse(notify_scheduler(self.test_dir))
+        self.scheduler.start(self.test_dir)
+        self.assertTrue(notify_scheduler(self.test_dir))
+        self.scheduler.stop(timeout=1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_second_scheduler_leaves_socket(self):
+        self.scheduler.start(self.test_dir)
+        other = ReminderScheduler(self.storage, notify=lambda reminder: None)
+        other.start(self.test_dir)
+        other.stop(timeout=1)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, WAKE_SOCKET)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest.mock import patch
+import assistant.utils
+from assistant.utils import add_note, search_notes, retrieve_notes, reindex_notes, save_data, close_storage
+from assistant.search import NUMPY_AVAILABLE, SearchIndex, parse_query, tokenize
+
+class TestQueryParsing(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Buy MILK, eggs!'), ['buy', 'milk', 'eggs'])
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query('buy milk OR groc*'), [['buy', 'milk'], ['groc*']])
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.test_dir, 'search.db'))
+        self.index.add_many([
+            'Buy milk and eggs',
+            'Call mom about milk milk milk',
+            'Groceries: bread',
+            'Meeting notes',
+        ])
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.test_dir)
+
+    def ids(self, query):
+        return [note_id for note_id, _, _ in self.index.search(query)]
+
+    def test_and(self):
+        self.assertEqual(self.ids('milk eggs'), [1])
+
+    def test_or(self):
+        self.assertEqual(sorted(self.ids('eggs OR bread')), [1, 3])
+
+    def test_prefix(self):
+        self.assertEqual(self.ids('groc*'), [3])
+        self.assertEqual(self.ids('me*'), [4])
+
+    def test_ranking(self):
+        self.assertEqual(self.ids('milk'), [2, 1])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('unknownword'), [])
+        self.assertEqual(self.index.search('milk unknownword'), [])
+
+    def test_persistent(self):
+        self.index.close()
+        self.index = SearchIndex(os.path.join(self.test_dir, 'search.db'))
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.ids('bread'), [3])
+
+class TestRanking(unittest.TestCase):
+    NOTES = [
+        'Dentist appointment on Friday at 3pm',
+        'The wifi password is hunter2',
+        'Buy milk and eggs',
+        'Dentist is Dr. Smith on Main Street',
+        'Call mom about the dentist bill',
+    ]
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.test_dir, 'search.db'))
+        self.index.add_many(self.NOTES)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.test_dir)
+
+    def ranked(self, text, limit=3):
+        return [note_id for note_id, _, _ in self.index.rank(text, limit)]
+
+    def test_best_match_first(self):
+        self.assertEqual(self.ranked('What is the wifi password?')[0], 2)
+        self.assertEqual(self.ranked('When is my dentist appointment?')[0], 1)
+
+    def test_any_term_matches(self):
+        self.assertEqual(sorted(self.ranked('dentist', limit=10)), [1, 4, 5])
+
+    def test_stopwords_only(self):
+        self.assertEqual(self.index.rank('what is the'), [])
+
+    def test_sees_notes_added_later(self):
+        self.ranked('dentist')
+        self.index.add('Renew passport before the trip')
+        self.assertEqual(self.ranked('passport'), [6])
+        self.index.clear()
+        self.assertEqual(self.index.rank('passport'), [])
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not installed")
+    def test_numpy_matches_python(self):
+        question = 'dentist bill for mom on Friday'
+        vectorized = self.index.rank(question, limit=5)
+        with patch('assistant.search.NUMPY_AVAILABLE', False):
+            self.assertEqual(self.index.rank(question, limit=5), vectorized)
+
+class TestNoteSearch(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        assistant.utils.load_data.cache_clear()
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_existing_notes_indexed_on_first_use(self):
+        save_data('notes.json', {'notes': ['legacy reminder text']})
+        add_note('fresh note')
+        self.assertEqual(search_notes('legacy')[0][:2], (1, 'legacy reminder text'))
+        self.assertEqual(search_notes('fresh')[0][:2], (2, 'fresh note'))
+
+    def test_reindex(self):
+        add_note('alpha')
+        add_note('beta')
+        self.assertEqual(reindex_notes(), 2)
+        self.assertEqual(search_notes('beta')[0][0], 2)
+
+    def test_retrieve_notes(self):
+        add_note('Locker code is 4512')
+        add_note('Buy milk')
+        self.assertEqual(retrieve_notes('what is my locker code?')[0][:2], (1, 'Locker code is 4512'))
+
+if __name__ == '__main__':
+    unittest.main()
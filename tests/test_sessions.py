@@ -0,0 +1,112 @@
+import unittest
+import threading
+from assistant.sessions import SessionStore, SessionContext
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_get_set_discard(self):
+        store = SessionStore(clock=self.clock)
+        self.assertIsNone(store.get('a', 'last_topic'))
+        store.set('a', 'last_topic', 'time')
+        store.set('b', 'last_topic', 'date')
+        self.assertEqual(store.get('a', 'last_topic'), 'time')
+        self.assertEqual(store.context('b'), {'last_topic': 'date'})
+        store.discard('a', 'last_topic')
+        self.assertEqual(store.get('a', 'last_topic', 'none'), 'none')
+        self.assertEqual(len(store), 2)
+        store.end('a')
+        self.assertEqual(len(store), 1)
+        store.clear()
+        self.assertEqual(store.stats(), {'sessions': 0, 'bytes': 0})
+
+    def test_ttl(self):
+        store = SessionStore(ttl=60, clock=self.clock)
+        store.set('a', 'last_topic', 'time')
+        self.clock.now += 30
+        self.assertEqual(store.get('a', 'last_topic'), 'time')
+        # Reading refreshes the session
+        self.clock.now += 45
+        self.assertEqual(store.get('a', 'last_topic'), 'time')
+        self.clock.now += 61
+        self.assertIsNone(store.get('a', 'last_topic'))
+        self.assertEqual(len(store), 0)
+
+    def test_expired_sessions_swept_on_write(self):
+        store = SessionStore(ttl=60, shards=1, clock=self.clock)
+        for i in range(5):
+            store.set(f"s{i}", 'last_topic', 'time')
+        self.clock.now += 61
+        store.set('new', 'last_topic', 'date')
+        self.assertEqual(len(store), 1)
+
+    def test_lru_eviction(self):
+        store = SessionStore(max_sessions=3, shards=1, clock=self.clock)
+        for name in ('a', 'b', 'c'):
+            store.set(name, 'last_topic', 'time')
+        store.get('a', 'last_topic')
+        store.set('d', 'last_topic', 'time')
+        self.assertEqual(len(store), 3)
+        self.assertIsNone(store.get('b', 'last_topic'))
+        self.assertEqual(store.get('a', 'last_topic'), 'time')
+
+    def test_memory_cap(self):
+        store = SessionStore(max_bytes=64 * 1024, shards=1, clock=self.clock)
+        for i in range(100):
+            store.set(f"s{i}", 'history', 'x' * 4096)
+        stats = store.stats()
+        self.assertLessEqual(stats['bytes'], 64 * 1024)
+        self.assertLess(stats['sessions'], 100)
+        self.assertEqual(store.get('s99', 'history'), 'x' * 4096)
+
+    def test_replacing_value_updates_size(self):
+        store = SessionStore(clock=self.clock)
+        store.set('a', 'history', 'x' * 10000)
+        large = store.stats()['bytes']
+        store.set('a', 'history', 'x')
+        self.assertLess(store.stats()['bytes'], large - 9000)
+
+    def test_concurrent_sessions(self):
+        store = SessionStore(max_sessions=100000)
+        errors = []
+
+        def converse(worker):
+            for i in range(200):
+                session = f"w{worker}-{i % 20}"
+                store.set(session, 'last_topic', f"{worker}:{i}")
+                if store.get(session, 'last_topic') != f"{worker}:{i}":
+                    errors.append(session)
+
+        threads = [threading.Thread(target=converse, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(store), 160)
+
+class TestSessionContext(unittest.TestCase):
+    def test_mapping(self):
+        store = SessionStore()
+        context = SessionContext(store, 'a')
+        context['last_topic'] = 'time'
+        self.assertIn('last_topic', context)
+        self.assertEqual(dict(context), {'last_topic': 'time'})
+        self.assertEqual(context.pop('last_topic'), 'time')
+        self.assertNotIn('last_topic', context)
+        with self.assertRaises(KeyError):
+            del context['last_topic']
+        context['last_topic'] = 'date'
+        context.clear()
+        self.assertEqual(len(store), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import io
+import unittest
+import tempfile
+import shutil
+from contextlib import redirect_stdout, redirect_stderr
+import assistant.utils
+from assistant.utils import close_storage
+from assistant import metrics
+from assistant.cli import build_parser, print_profile, run_command
+from assistant.shell import Shell
+
+class TestShell(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        self.shell = Shell(build_parser(), run_command)
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def run_lines(self, *lines):
+        output = io.StringIO()
+        with redirect_stdout(output), redirect_stderr(io.StringIO()):
+            results = [self.shell.execute(line) for line in lines]
+        return results, output.getvalue()
+
+    def test_commands_share_state(self):
+        results, output = self.run_lines('note add "Buy milk"', 'note add "Call mom"', 'note list', 'calc "2 + 3"')
+        self.assertEqual(results, [True] * 4)
+        self.assertIn('Call mom', output)
+        self.assertIn('Result: 5', output)
+        self.assertEqual(assistant.utils.list_notes(), ['Buy milk', 'Call mom'])
+
+    def test_latency_recorded_per_command(self):
+        self.run_lines('calc 1+1', 'calc 2+2', 'note list')
+        stats = self.shell.stats()
+        self.assertEqual(stats['calc']['count'], 2)
+        self.assertEqual(stats['note list']['count'], 1)
+        self.assertLessEqual(stats['calc']['p50'], stats['calc']['max'])
+
+    def test_errors_do_not_leave_the_shell(self):
+        results, output = self.run_lines('bogus', 'remind "x" --time 25:99', 'note add "unterminated', '--help')
+        self.assertEqual(results, [True] * 4)
+        self.assertIn('Invalid time format', output)
+        self.assertEqual(self.shell.stats(), {})
+
+    def test_per_line_global_flags(self):
+        self.shell.print_profile = print_profile
+        errors = io.StringIO()
+        with redirect_stdout(io.StringIO()), redirect_stderr(errors):
+            self.shell.execute('--timings calc 1+1')
+            self.shell.execute('--profile --profile-format json calc 2+2')
+        self.assertIn('calc: ', errors.getvalue())
+        self.assertIn('assistant_command_seconds', errors.getvalue())
+        self.assertFalse(metrics.enabled())
+        # Only that line was timed or profiled
+        results, output = self.run_lines('--log-level DEBUG calc 3+3')
+        self.assertEqual(results, [True])
+        self.assertIn("pass them before 'shell'", output)
+        self.assertEqual(self.shell.stats()['calc']['count'], 2)
+
+    def test_builtins(self):
+        results, output = self.run_lines('', 'stats', 'scheduler', 'exit')
+        self.assertEqual(results, [True, True, True, False])
+        self.assertIn('No commands run yet', output)
+        self.assertIn('not available inside the shell', output)
+
+    def test_loop_until_eof(self):
+        lines = iter(['calc 6*7'])
+
+        def read(prompt):
+            try:
+                return next(lines)
+            except StopIteration:
+                raise EOFError
+
+        self.shell.input = read
+        with redirect_stdout(io.StringIO()) as output:
+            self.shell.loop()
+        self.assertIn('Result: 42', output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,279 @@
+import unittest
+import os
+import datetime
+import tempfile
+import shutil
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+import assistant.utils
+from assistant.utils import get_storage, close_storage, migrate_to_sqlite, convert_notes, add_note, list_notes, iter_notes, search_notes, save_data, load_data
+from assistant.storage import BinaryStorage, JSONStorage, SQLiteStorage
+
+class StorageContract:
+    """Behaviour every storage engine must share."""
+
+    backend = ''
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        assistant.utils.load_data.cache_clear()
+        self.store = get_storage(self.backend)
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_notes(self):
+        self.store.add_note('one')
+        self.store.add_note('two')
+        self.assertEqual(self.store.list_notes(), ['one', 'two'])
+
+    def test_iter_notes_pages(self):
+        for i in range(1, 8):
+            self.store.add_note(f'n{i}')
+        self.assertEqual(list(self.store.iter_notes()), [(i, f'n{i}') for i in range(1, 8)])
+        self.assertEqual(list(self.store.iter_notes(offset=2, limit=3)), [(3, 'n3'), (4, 'n4'), (5, 'n5')])
+        self.assertEqual(list(self.store.iter_notes(offset=1, limit=2, reverse=True)), [(6, 'n6'), (5, 'n5')])
+        self.assertEqual([n for n, _ in self.store.iter_notes(reverse=True)], list(range(7, 0, -1)))
+        self.assertEqual(list(self.store.iter_notes(offset=10)), [])
+
+    def test_get_notes(self):
+        self.store.add_notes([f'n{i}' for i in range(1, 6)])
+        self.assertEqual(self.store.get_notes([4, 1, 9, 2]), [(4, 'n4'), (1, 'n1'), (2, 'n2')])
+        self.assertEqual(self.store.get_notes([]), [])
+
+    def test_pop_due_reminders(self):
+        base = datetime.datetime(2023, 1, 1, 10, 0)
+        self.store.add_reminder('late', '11:00', base + datetime.timedelta(hours=1))
+        self.store.add_reminder('early', '10:05', base + datetime.timedelta(minutes=5))
+        due = self.store.pop_due_reminders(base + datetime.timedelta(minutes=30))
+        self.assertEqual([r['message'] for r in due], ['early'])
+        self.assertEqual([r['message'] for r in self.store.list_reminders()], ['late'])
+
+    def test_reminder_ids_unique(self):
+        when = datetime.datetime(2023, 1, 1, 10, 0)
+        self.store.add_reminder('a', '10:00', when)
+        self.store.add_reminder('b', '10:00', when + datetime.timedelta(hours=1))
+        self.store.pop_due_reminders(when)
+        third = self.store.add_reminder('c', '10:00', when)
+        ids = [r['id'] for r in self.store.list_reminders()]
+        self.assertEqual(len(set(ids)), 2)
+        self.assertIn(third['id'], ids)
+
+class TestJSONStorage(StorageContract, unittest.TestCase):
+    backend = 'json'
+
+    def test_engine_type(self):
+        self.assertIsInstance(self.store, JSONStorage)
+
+    def test_iter_notes_spans_snapshot_and_journal(self):
+        for note in ('a', 'b', 'c'):
+            self.store.add_note(note)
+        self.store.compact()
+        self.store.add_note('d')
+        self.assertEqual(list(self.store.iter_notes(offset=2, limit=2)), [(3, 'c'), (4, 'd')])
+        self.assertEqual(list(self.store.iter_notes(limit=2, reverse=True)), [(4, 'd'), (3, 'c')])
+
+    def test_iter_notes_survives_compaction(self):
+        self.store.add_note('a')
+        self.store.add_note('b')
+        notes = self.store.iter_notes()
+        self.assertEqual(next(notes), (1, 'a'))
+        self.store.compact()
+        self.assertEqual(list(notes), [(2, 'b')])
+
+    def test_firing_reminders_leaves_tombstones(self):
+        base = datetime.datetime(2023, 1, 1, 10, 0)
+        self.store.add_reminders([(f"r{i}", '10:00', base + datetime.timedelta(minutes=i)) for i in range(5)])
+        path = os.path.join(self.test_dir, 'reminders.json')
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual([r['message'] for r in self.store.pop_due_reminders(base)], ['r0'])
+        self.assertEqual([r['message'] for r in self.store.pop_due_reminders(base + datetime.timedelta(minutes=2))], ['r1', 'r2'])
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        # Another process's store sees the same tombstones
+        other = JSONStorage(self.test_dir, load_data, save_data)
+        self.assertEqual([r['message'] for r in other.list_reminders()], ['r3', 'r4'])
+        self.assertEqual(other.pop_due_reminders(base + datetime.timedelta(minutes=2)), [])
+        self.assertEqual(self.store.compact(), 3)
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, 'reminders.done')))
+        self.assertEqual([r['message'] for r in load_data('reminders.json')['reminders']], ['r3', 'r4'])
+
+    def test_stale_tombstones_ignored(self):
+        when = datetime.datetime(2023, 1, 1, 10, 0)
+        self.store.add_reminder('a', '10:00', when)
+        self.store.pop_due_reminders(when)
+        # reminders.json replaced behind the store's back, e.g. by a crash before the tombstones were dropped
+        save_data('reminders.json', {'reminders': [{'id': 1, 'message': 'b', 'time': '10:00', 'scheduled_at': when.isoformat()}]})
+        self.assertEqual([r['message'] for r in self.store.list_reminders()], ['b'])
+        self.assertEqual([r['message'] for r in self.store.pop_due_reminders(when)], ['b'])
+
+class TestJSONStoreSharing(unittest.TestCase):
+    """Several processes writing to one JSON store."""
+
+    WRITER = (
+        "import sys, datetime\n"
+        "import assistant.utils as utils\n"
+        "utils.DATA_DIR = sys.argv[1]\n"
+        "store = utils.get_storage('json')\n"
+        "for i in range(int(sys.argv[3])):\n"
+        "    store.add_note(f'{sys.argv[2]}-{i}')\n"
+        "    store.add_reminder(f'{sys.argv[2]}-{i}', '10:00', datetime.datetime(2030, 1, 1))\n"
+    )
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        load_data.cache_clear()
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_concurrent_processes_lose_nothing(self):
+        env = dict(os.environ, ASSISTANT_FSYNC='0')
+        writers = [subprocess.Popen([sys.executable, '-c', self.WRITER, self.test_dir, f"p{n}", '25'], env=env)
+                   for n in range(4)]
+        for writer in writers:
+            self.assertEqual(writer.wait(timeout=60), 0)
+        expected = sorted(f"p{n}-{i}" for n in range(4) for i in range(25))
+        store = get_storage('json')
+        self.assertEqual(sorted(store.list_notes()), expected)
+        reminders = store.list_reminders()
+        self.assertEqual(sorted(r['message'] for r in reminders), expected)
+        self.assertEqual(len({r['id'] for r in reminders}), 100)
+        self.assertFalse([name for name in os.listdir(self.test_dir) if name.endswith('.tmp')])
+
+    NOTE_WRITER = (
+        "import sys\n"
+        "import assistant.utils as utils\n"
+        "utils.DATA_DIR = sys.argv[1]\n"
+        "for i in range(int(sys.argv[3])):\n"
+        "    utils.add_note(f'{sys.argv[2]}-{i}')\n"
+    )
+
+    def test_concurrent_add_note_keeps_search_ids(self):
+        env = dict(os.environ, ASSISTANT_FSYNC='0')
+        writers = [subprocess.Popen([sys.executable, '-c', self.NOTE_WRITER, self.test_dir, f"p{n}", '40'], env=env)
+                   for n in range(4)]
+        for writer in writers:
+            self.assertEqual(writer.wait(timeout=60), 0)
+        notes = list_notes()
+        self.assertEqual(len(notes), 160)
+        # Search ids must be the positions shown by 'note list'
+        index = assistant.utils.get_search_index()
+        self.assertEqual(index.get_many(range(1, 161)), list(enumerate(notes, 1)))
+
+    def test_cache_sees_other_writers(self):
+        save_data('reminders.json', {'reminders': []})
+        self.assertEqual(load_data('reminders.json'), {'reminders': []})
+        # Another process replaces the file behind the cache's back
+        path = os.path.join(self.test_dir, 'reminders.json')
+        with open(path + '.other', 'w', encoding='utf-8') as f:
+            json.dump({'reminders': [{'id': 1}]}, f)
+        os.replace(path + '.other', path)
+        self.assertEqual(load_data('reminders.json'), {'reminders': [{'id': 1}]})
+
+    def test_corrupt_file_quarantined(self):
+        with open(os.path.join(self.test_dir, 'reminders.json'), 'w', encoding='utf-8') as f:
+            f.write('{"reminders": [')
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(load_data('reminders.json'), {})
+        names = os.listdir(self.test_dir)
+        self.assertNotIn('reminders.json', names)
+        self.assertTrue([name for name in names if name.startswith('reminders.json.corrupt-')])
+
+class TestBinaryStorage(StorageContract, unittest.TestCase):
+    backend = 'binary'
+
+    def test_engine_type(self):
+        self.assertIsInstance(self.store, BinaryStorage)
+        self.store.add_note('x')
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'notes.idx')))
+
+class TestSQLiteStorage(StorageContract, unittest.TestCase):
+    backend = 'sqlite'
+
+    def test_iter_notes_across_pages(self):
+        with patch('assistant.storage.NOTES_PAGE_SIZE', 2):
+            for i in range(1, 6):
+                self.store.add_note(f'n{i}')
+            self.assertEqual([n for n, _ in self.store.iter_notes(offset=1)], [2, 3, 4, 5])
+            self.assertEqual([n for n, _ in self.store.iter_notes(offset=1, limit=3, reverse=True)], [4, 3, 2])
+
+    def test_wal_mode(self):
+        mode = self.store._conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_scheduled_at_index(self):
+        plan = self.store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM reminders WHERE scheduled_at <= '2023'"
+        ).fetchall()
+        self.assertIn('reminders_scheduled_at', str(plan))
+
+class TestStorageSelection(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        assistant.utils.DATA_DIR = self.test_dir
+        assistant.utils.load_data.cache_clear()
+
+    def tearDown(self):
+        close_storage()
+        shutil.rmtree(self.test_dir)
+
+    def test_env_switch(self):
+        with patch.dict(os.environ, {'ASSISTANT_STORAGE': 'sqlite'}):
+            add_note('in sqlite')
+            self.assertIsInstance(get_storage(), SQLiteStorage)
+        self.assertEqual(list_notes(), [])
+        self.assertEqual(get_storage('sqlite').list_notes(), ['in sqlite'])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_storage('nope')
+
+    def test_convert_notes(self):
+        save_data('notes.json', {'notes': ['legacy']})
+        add_note('journaled')
+        self.assertEqual(convert_notes('binary'), 2)
+        self.assertEqual(get_storage('binary').list_notes(), ['legacy', 'journaled'])
+        with self.assertRaises(ValueError):
+            convert_notes('binary')
+        # Back again, into an empty JSON store
+        close_storage()
+        for name in os.listdir(self.test_dir):
+            if name.startswith('notes.json') or name.startswith('notes.journal'):
+                os.remove(os.path.join(self.test_dir, name))
+        self.assertEqual(convert_notes('json'), 2)
+        self.assertEqual(list_notes(), ['legacy', 'journaled'])
+        with self.assertRaises(ValueError):
+            convert_notes('yaml')
+
+    def test_migrate_once(self):
+        save_data('notes.json', {'notes': ['legacy']})
+        add_note('journaled')
+        save_data('reminders.json', {'reminders': [
+            {'message': 'r', 'time': '10:00', 'scheduled_at': '2023-01-01T10:00:00', 'id': 1}
+        ]})
+        self.assertEqual(migrate_to_sqlite(), {'notes': 2, 'reminders': 1})
+        self.assertEqual(migrate_to_sqlite(), {'notes': 0, 'reminders': 0})
+        sqlite_store = get_storage('sqlite')
+        self.assertEqual(sqlite_store.list_notes(), ['legacy', 'journaled'])
+        self.assertEqual(sqlite_store.list_reminders()[0]['message'], 'r')
+
+    def test_migrate_into_non_empty_sqlite(self):
+        add_note('json one', tags=['work'])
+        add_note('json two')
+        with patch.dict(os.environ, {'ASSISTANT_STORAGE': 'sqlite'}):
+            add_note('sqlite first', tags=['home'])
+            self.assertEqual(migrate_to_sqlite()['notes'], 2)
+            self.assertEqual(list_notes(), ['sqlite first', 'json one', 'json two'])
+            self.assertEqual([r[:2] for r in search_notes('json')], [(2, 'json one'), (3, 'json two')])
+            self.assertEqual(list(iter_notes(tags=['work'])), [(2, 'json one')])
+            self.assertEqual(list(iter_notes(tags=['home'])), [(1, 'sqlite first')])
+            self.assertEqual(len(list(iter_notes(since='2000-01-01'))), 3)
+
+if __name__ == '__main__':
+    unittest.main()
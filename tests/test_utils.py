@@ -2,7 +2,7 @@ import unittest
 import os
 import tempfile
 import shutil
-from assistant.utils import save_data, load_data, add_note, list_notes, safe_calc, schedule_reminder, check_reminders
+from assistant.utils import save_data, load_data, add_note, list_notes, compact_notes, safe_calc, schedule_reminder, check_reminders
 
 class TestUtils(unittest.TestCase):
     def setUp(self):
@@ -29,6 +29,15 @@ class TestUtils(unittest.TestCase):
         notes = list_notes()
         self.assertIn('Test note', notes)
 
+    def test_list_notes_after_compaction(self):
+        save_data('notes.json', {'notes': ['Legacy note']})
+        add_note('First')
+        add_note('Second')
+        self.assertEqual(list_notes(), ['Legacy note', 'First', 'Second'])
+        self.assertEqual(compact_notes(), 2)
+        self.assertEqual(list_notes(), ['Legacy note', 'First', 'Second'])
+        self.assertEqual(load_data('notes.json')['notes'], ['Legacy note', 'First', 'Second'])
+
     def test_safe_calc_valid(self):
         result = safe_calc('2 + 3')
         self.assertEqual(result, 5)